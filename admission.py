@@ -0,0 +1,274 @@
+#!/usr/bin/env python3
+"""
+Admission control and load shedding
+Bounds the number of requests worked on concurrently (a configured limit or
+an AIMD-adapted one), keeps a bounded FIFO wait queue, and gives every
+request a deadline. Requests that cannot start in time are rejected up front
+with 429/503 and Retry-After instead of piling up behind the upstream.
+"""
+
+import asyncio
+import contextvars
+import json
+import math
+import os
+import time
+from collections import deque
+from typing import Any, Deque, Dict, Iterable, Optional
+
+# "auto" adapts the limit between the bounds below; a number fixes it;
+# "off" disables admission control
+ADMISSION_CONCURRENCY = os.getenv("ADMISSION_CONCURRENCY", "auto").lower()
+ADMISSION_QUEUE_SIZE = int(os.getenv("ADMISSION_QUEUE_SIZE", "64"))
+# Default (and maximum) time a request may take, queueing included; clients
+# may ask for less with an X-Request-Timeout header (seconds)
+REQUEST_DEADLINE_SECONDS = float(os.getenv("REQUEST_DEADLINE_SECONDS", "10"))
+
+INITIAL_LIMIT = 32
+MIN_LIMIT = 4
+MAX_LIMIT = 256
+# Multiplicative decrease applied when a request overruns or fails
+BACKOFF_RATIO = 0.9
+
+# Recent queue waits kept for percentiles
+WAIT_SAMPLES = 1024
+
+_deadline: contextvars.ContextVar[Optional[float]] = contextvars.ContextVar("request_deadline", default=None)
+
+
+class Overloaded(Exception):
+    """Raised when a request is shed instead of admitted"""
+
+    def __init__(self, reason: str, status_code: int, retry_after: int):
+        super().__init__(f"Server overloaded ({reason}), retry in {retry_after}s")
+        self.reason = reason
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+
+class DeadlineExceeded(Exception):
+    """Raised when work is about to start after the request deadline passed"""
+
+
+def remaining_time() -> Optional[float]:
+    """Seconds left before the current request's deadline (None without one)"""
+    deadline = _deadline.get()
+    return None if deadline is None else deadline - time.monotonic()
+
+
+def check_deadline(what: str) -> None:
+    remaining = remaining_time()
+    if remaining is not None and remaining <= 0:
+        raise DeadlineExceeded(f"Request deadline exceeded before {what}")
+
+
+class AdmissionController:
+    """Concurrency limit plus bounded wait queue.
+
+    The adaptive limit grows by about one per limit's worth of successful
+    completions while requests are queueing, and shrinks by BACKOFF_RATIO
+    when a request fails or misses its deadline (AIMD).
+    """
+
+    def __init__(self, limit: int = INITIAL_LIMIT, max_queue: int = ADMISSION_QUEUE_SIZE,
+                 adaptive: bool = True, min_limit: int = MIN_LIMIT, max_limit: int = MAX_LIMIT,
+                 enabled: bool = True):
+        self.limit = float(limit)
+        self.max_queue = max_queue
+        self.adaptive = adaptive
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.enabled = enabled
+        self.inflight = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+        self.service_time = 0.05
+        self.admitted = 0
+        self.rejected: Dict[str, int] = {"queue_full": 0, "deadline": 0, "expired_in_queue": 0}
+        self.overruns = 0
+        self._waits: Deque[float] = deque(maxlen=WAIT_SAMPLES)
+
+    @classmethod
+    def from_env(cls) -> "AdmissionController":
+        if ADMISSION_CONCURRENCY == "off":
+            return cls(enabled=False)
+        if ADMISSION_CONCURRENCY == "auto":
+            return cls()
+        return cls(limit=int(ADMISSION_CONCURRENCY), adaptive=False)
+
+    def retry_after(self) -> int:
+        """Seconds until the current backlog is expected to drain"""
+        backlog = len(self._waiters) + 1
+        return max(1, math.ceil(self.service_time * backlog / max(self.limit, 1)))
+
+    async def acquire(self, deadline: float) -> None:
+        """Wait for a slot, or raise Overloaded if none frees up before the deadline"""
+        if not self.enabled:
+            return
+        start = time.monotonic()
+        if self.inflight < int(self.limit) and not self._waiters:
+            self._admit(0.0)
+            return
+        if len(self._waiters) >= self.max_queue:
+            self.rejected["queue_full"] += 1
+            raise Overloaded("queue full", 429, self.retry_after())
+
+        # Shed now if the queue ahead cannot drain in time for this request
+        expected_wait = self.service_time * (len(self._waiters) + 1) / max(self.limit, 1)
+        budget = deadline - start - self.service_time
+        if expected_wait > budget:
+            self.rejected["deadline"] += 1
+            raise Overloaded("deadline", 503, self.retry_after())
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter), timeout=max(budget, 0.0))
+        except asyncio.TimeoutError:
+            if waiter.done() and not waiter.cancelled():
+                # Granted just as the timer fired: hand the slot on
+                self.inflight -= 1
+                self._wake()
+            else:
+                waiter.cancel()
+            self.rejected["expired_in_queue"] += 1
+            raise Overloaded("deadline", 503, self.retry_after())
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                self.inflight -= 1
+                self._wake()
+            else:
+                waiter.cancel()
+            raise
+        self._admit(time.monotonic() - start, counted=True)
+
+    def release(self, elapsed: float, ok: bool) -> None:
+        """Return a slot and feed the outcome to the limit"""
+        if not self.enabled:
+            return
+        self.inflight -= 1
+        self.service_time += 0.1 * (elapsed - self.service_time)
+        if self.adaptive:
+            if not ok:
+                self.overruns += 1
+                self.limit = max(self.min_limit, self.limit * BACKOFF_RATIO)
+            elif self._waiters:
+                self.limit = min(self.max_limit, self.limit + 1.0 / self.limit)
+        self._wake()
+
+    def _admit(self, waited: float, counted: bool = False) -> None:
+        if not counted:
+            self.inflight += 1
+        self.admitted += 1
+        self._waits.append(waited)
+
+    def _wake(self) -> None:
+        while self._waiters and self.inflight < int(self.limit):
+            waiter = self._waiters.popleft()
+            if waiter.done():
+                continue
+            # The slot is taken on the waiter's behalf so nobody can jump in
+            self.inflight += 1
+            waiter.set_result(None)
+
+    def stats(self) -> Dict[str, Any]:
+        waits = sorted(self._waits)
+
+        def wait_ms(q: float) -> float:
+            return round(waits[min(len(waits) - 1, int(q * len(waits)))] * 1000, 2) if waits else 0.0
+
+        return {
+            "enabled": self.enabled,
+            "adaptive": self.adaptive,
+            "limit": int(self.limit),
+            "inflight": self.inflight,
+            "queued": len(self._waiters),
+            "max_queue": self.max_queue,
+            "admitted": self.admitted,
+            "rejected": dict(self.rejected),
+            "overruns": self.overruns,
+            "service_time_ms": round(self.service_time * 1000, 2),
+            "queue_wait_ms": {"p50": wait_ms(0.5), "p99": wait_ms(0.99)},
+        }
+
+
+# Shared by whichever app runs in this process
+controller = AdmissionController.from_env()
+
+
+class AdmissionMiddleware:
+    """ASGI middleware putting POST requests through the admission controller.
+
+    ``exempt_paths`` are passed straight through (e.g. the MCP SSE message
+    endpoint); rejections on ``tool_result_paths`` are shaped like a failed
+    /mcp/call_tool result so MCP-style clients see an error result.
+    """
+
+    def __init__(self, app, controller: AdmissionController = controller,
+                 exempt_paths: Iterable[str] = (), tool_result_paths: Iterable[str] = ()):
+        self.app = app
+        self.controller = controller
+        self.exempt_paths = set(exempt_paths)
+        self.tool_result_paths = set(tool_result_paths)
+
+    async def __call__(self, scope, receive, send):
+        if (
+            scope.get("type") != "http"
+            or scope.get("method") != "POST"
+            or scope.get("path") in self.exempt_paths
+            or not self.controller.enabled
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        start = time.monotonic()
+        deadline = start + self._timeout(scope)
+        try:
+            await self.controller.acquire(deadline)
+        except Overloaded as e:
+            await self._reject(scope, send, e)
+            return
+
+        status = 500
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        token = _deadline.set(deadline)
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _deadline.reset(token)
+            finished = time.monotonic()
+            self.controller.release(finished - start, ok=status < 500 and finished <= deadline)
+
+    @staticmethod
+    def _timeout(scope) -> float:
+        for name, value in scope.get("headers", []):
+            if name == b"x-request-timeout":
+                try:
+                    requested = float(value)
+                except ValueError:
+                    break
+                if requested > 0:
+                    return min(requested, REQUEST_DEADLINE_SECONDS)
+        return REQUEST_DEADLINE_SECONDS
+
+    async def _reject(self, scope, send, error: Overloaded) -> None:
+        if scope.get("path") in self.tool_result_paths:
+            payload: Dict[str, Any] = {"content": [f"Error: {error}"], "isError": True}
+        else:
+            payload = {"detail": str(error)}
+        body = json.dumps(payload).encode("utf-8")
+        await send({
+            "type": "http.response.start",
+            "status": error.status_code,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode("latin-1")),
+                (b"retry-after", str(error.retry_after).encode("latin-1")),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
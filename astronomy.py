@@ -0,0 +1,305 @@
+#!/usr/bin/env python3
+"""
+Local astronomical computations
+Sunrise/sunset (NOAA solar algorithm), moonrise/moonset, moon phase and
+illumination (low-precision lunar theory with the main perturbation terms),
+so get_astronomy_data does not need an upstream call per location and date.
+
+Accuracy is about a minute for both sun and moon, in line with what the
+upstream API reports (minute resolution); only days right at a polar
+day/night transition can disagree. Output uses the
+same strings as the upstream astro block ("05:43 AM", "No moonrise", ...).
+"""
+
+import math
+from datetime import date, datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+try:
+    from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+except ImportError:  # Python < 3.9
+    ZoneInfo = None
+    ZoneInfoNotFoundError = Exception
+
+# Apparent altitude of the sun's upper limb at rise/set (refraction + semidiameter)
+SUN_HORIZON_DEG = -0.833
+
+# Half-width (degrees of sun-moon elongation) of the four principal phases
+# (New Moon, First Quarter, Full Moon, Last Quarter)
+PRINCIPAL_PHASE_WIDTH = 12.0
+
+_RAD = math.pi / 180.0
+
+
+class AstronomyUnavailable(Exception):
+    """Local computation is not possible (e.g. unknown time zone)"""
+
+
+def _sin(deg: float) -> float:
+    return math.sin(deg * _RAD)
+
+
+def _cos(deg: float) -> float:
+    return math.cos(deg * _RAD)
+
+
+def julian_day(moment: datetime) -> float:
+    """Julian day of a timezone-aware datetime"""
+    utc = moment.astimezone(timezone.utc)
+    return utc.timestamp() / 86400.0 + 2440587.5
+
+
+def _time_zone(tz_id: str):
+    if ZoneInfo is None:
+        raise AstronomyUnavailable("zoneinfo is not available")
+    try:
+        return ZoneInfo(tz_id)
+    except (ZoneInfoNotFoundError, ValueError) as e:
+        raise AstronomyUnavailable(f"Unknown time zone {tz_id}: {e}")
+
+
+# --- Sun ---------------------------------------------------------------------
+
+def _sun(jd: float) -> Tuple[float, float, float]:
+    """(apparent ecliptic longitude, declination, equation of time in minutes)"""
+    jc = (jd - 2451545.0) / 36525.0
+    mean_long = (280.46646 + jc * (36000.76983 + jc * 0.0003032)) % 360.0
+    mean_anom = 357.52911 + jc * (35999.05029 - 0.0001537 * jc)
+    ecc = 0.016708634 - jc * (0.000042037 + 0.0000001267 * jc)
+    center = (
+        _sin(mean_anom) * (1.914602 - jc * (0.004817 + 0.000014 * jc))
+        + _sin(2 * mean_anom) * (0.019993 - 0.000101 * jc)
+        + _sin(3 * mean_anom) * 0.000289
+    )
+    omega = 125.04 - 1934.136 * jc
+    app_long = mean_long + center - 0.00569 - 0.00478 * _sin(omega)
+    mean_obliq = 23.0 + (26.0 + (21.448 - jc * (46.815 + jc * (0.00059 - jc * 0.001813))) / 60.0) / 60.0
+    obliq = mean_obliq + 0.00256 * _cos(omega)
+    decl = math.degrees(math.asin(_sin(obliq) * _sin(app_long)))
+    y = math.tan(obliq / 2 * _RAD) ** 2
+    eq_time = 4 * math.degrees(
+        y * _sin(2 * mean_long)
+        - 2 * ecc * _sin(mean_anom)
+        + 4 * ecc * y * _sin(mean_anom) * _cos(2 * mean_long)
+        - 0.5 * y * y * _sin(4 * mean_long)
+        - 1.25 * ecc * ecc * _sin(2 * mean_anom)
+    )
+    return app_long % 360.0, decl, eq_time
+
+
+def _sun_events(lat: float, lon: float, local_noon_utc: datetime) -> Tuple[Optional[datetime], Optional[datetime]]:
+    """UTC sunrise and sunset of the solar day nearest to the given local noon"""
+    noon = local_noon_utc
+    rise_set: List[Optional[datetime]] = [None, None]
+    # Two passes: the second evaluates the sun at the computed solar noon
+    for _ in range(2):
+        _, decl, eq_time = _sun(julian_day(noon))
+        midnight = noon.replace(hour=0, minute=0, second=0, microsecond=0)
+        solar_noon_min = 720.0 - 4.0 * lon - eq_time
+        solar_noon = midnight + timedelta(minutes=solar_noon_min)
+        # Pick the solar noon closest to local noon (matters near the date line)
+        while solar_noon - local_noon_utc > timedelta(hours=12):
+            solar_noon -= timedelta(days=1)
+        while local_noon_utc - solar_noon > timedelta(hours=12):
+            solar_noon += timedelta(days=1)
+        noon = solar_noon
+
+        cos_ha = (_cos(90.0 - SUN_HORIZON_DEG) / (_cos(lat) * _cos(decl))) - math.tan(lat * _RAD) * math.tan(decl * _RAD)
+        if cos_ha > 1.0 or cos_ha < -1.0:
+            rise_set = [None, None]
+            continue
+        half_day = timedelta(minutes=4.0 * math.degrees(math.acos(cos_ha)))
+        rise_set = [solar_noon - half_day, solar_noon + half_day]
+    return rise_set[0], rise_set[1]
+
+
+# --- Moon --------------------------------------------------------------------
+
+def _moon(jd: float) -> Tuple[float, float, float]:
+    """Geocentric (ecliptic longitude, ecliptic latitude, distance in Earth radii)"""
+    d = jd - 2451543.5
+    node = 125.1228 - 0.0529538083 * d
+    incl = 5.1454
+    peri = 318.0634 + 0.1643573223 * d
+    a = 60.2666
+    e = 0.054900
+    m = (115.3654 + 13.0649929509 * d) % 360.0
+
+    ecc_anom = m + math.degrees(e * _sin(m) * (1.0 + e * _cos(m)))
+    for _ in range(3):
+        ecc_anom -= (ecc_anom - math.degrees(e * _sin(ecc_anom)) - m) / (1.0 - e * _cos(ecc_anom))
+    xv = a * (_cos(ecc_anom) - e)
+    yv = a * math.sqrt(1.0 - e * e) * _sin(ecc_anom)
+    v = math.degrees(math.atan2(yv, xv))
+    r = math.hypot(xv, yv)
+
+    xh = r * (_cos(node) * _cos(v + peri) - _sin(node) * _sin(v + peri) * _cos(incl))
+    yh = r * (_sin(node) * _cos(v + peri) + _cos(node) * _sin(v + peri) * _cos(incl))
+    zh = r * (_sin(v + peri) * _sin(incl))
+    lon = math.degrees(math.atan2(yh, xh))
+    lat = math.degrees(math.atan2(zh, math.hypot(xh, yh)))
+
+    # Main perturbations
+    sun_m = 356.0470 + 0.9856002585 * d
+    sun_l = sun_m + 282.9404 + 4.70935e-5 * d
+    moon_l = node + peri + m
+    elong = moon_l - sun_l
+    arg_lat = moon_l - node
+    lon += (
+        -1.274 * _sin(m - 2 * elong)
+        + 0.658 * _sin(2 * elong)
+        - 0.186 * _sin(sun_m)
+        - 0.059 * _sin(2 * m - 2 * elong)
+        - 0.057 * _sin(m - 2 * elong + sun_m)
+        + 0.053 * _sin(m + 2 * elong)
+        + 0.046 * _sin(2 * elong - sun_m)
+        + 0.041 * _sin(m - sun_m)
+        - 0.035 * _sin(elong)
+        - 0.031 * _sin(m + sun_m)
+        - 0.015 * _sin(2 * arg_lat - 2 * elong)
+        + 0.011 * _sin(m - 4 * elong)
+    )
+    lat += (
+        -0.173 * _sin(arg_lat - 2 * elong)
+        - 0.055 * _sin(m - arg_lat - 2 * elong)
+        - 0.046 * _sin(m + arg_lat - 2 * elong)
+        + 0.033 * _sin(arg_lat + 2 * elong)
+        + 0.017 * _sin(2 * m + arg_lat)
+    )
+    r += -0.58 * _cos(m - 2 * elong) - 0.46 * _cos(2 * elong)
+    return lon % 360.0, lat, r
+
+
+def _moon_altitude_offset(jd: float, lat: float, lon: float) -> float:
+    """Moon's geocentric altitude minus its rise/set altitude (positive = up)"""
+    ecl_lon, ecl_lat, dist = _moon(jd)
+    d = jd - 2451543.5
+    obliq = 23.4393 - 3.563e-7 * d
+    xe = _cos(ecl_lon) * _cos(ecl_lat)
+    ye = _sin(ecl_lon) * _cos(ecl_lat) * _cos(obliq) - _sin(ecl_lat) * _sin(obliq)
+    ze = _sin(ecl_lon) * _cos(ecl_lat) * _sin(obliq) + _sin(ecl_lat) * _cos(obliq)
+    ra = math.degrees(math.atan2(ye, xe))
+    dec = math.degrees(math.atan2(ze, math.hypot(xe, ye)))
+
+    gmst = 280.46061837 + 360.98564736629 * (jd - 2451545.0)
+    hour_angle = gmst + lon - ra
+    altitude = math.degrees(math.asin(_sin(lat) * _sin(dec) + _cos(lat) * _cos(dec) * _cos(hour_angle)))
+    parallax = math.degrees(math.asin(1.0 / dist))
+    return altitude - (0.7275 * parallax - 0.5667)
+
+
+def _moon_phase(jd: float) -> Tuple[str, int]:
+    """Upstream-style phase name and illuminated percentage"""
+    moon_lon, moon_lat, _ = _moon(jd)
+    sun_lon, _, _ = _sun(jd)
+    delta = (moon_lon - sun_lon) % 360.0
+    elongation = math.degrees(math.acos(_cos(delta) * _cos(moon_lat)))
+    illumination = int(round((1.0 - _cos(elongation)) / 2.0 * 100))
+
+    w = PRINCIPAL_PHASE_WIDTH
+    if delta < w or delta > 360.0 - w:
+        name = "New Moon"
+    elif delta < 90.0 - w:
+        name = "Waxing Crescent"
+    elif delta <= 90.0 + w:
+        name = "First Quarter"
+    elif delta < 180.0 - w:
+        name = "Waxing Gibbous"
+    elif delta <= 180.0 + w:
+        name = "Full Moon"
+    elif delta < 270.0 - w:
+        name = "Waning Gibbous"
+    elif delta <= 270.0 + w:
+        name = "Last Quarter"
+    else:
+        name = "Waning Crescent"
+    return name, illumination
+
+
+def _crossings(samples: List[Tuple[float, float]], lat: float, lon: float,
+               start_jd: float, end_jd: float) -> Tuple[Optional[float], Optional[float]]:
+    """First rising and setting Julian days in [start_jd, end_jd) from (jd, offset) samples"""
+    rise = set_ = None
+    for (jd0, h0), (jd1, h1) in zip(samples, samples[1:]):
+        if (h0 < 0.0) == (h1 < 0.0):
+            continue
+        # Secant refinement of the linear estimate
+        jd_a, h_a, jd_b, h_b = jd0, h0, jd1, h1
+        for _ in range(2):
+            jd_x = jd_a - h_a * (jd_b - jd_a) / (h_b - h_a)
+            h_x = _moon_altitude_offset(jd_x, lat, lon)
+            if (h_x < 0.0) == (h_a < 0.0):
+                jd_a, h_a = jd_x, h_x
+            else:
+                jd_b, h_b = jd_x, h_x
+        jd_x = jd_a - h_a * (jd_b - jd_a) / (h_b - h_a)
+        if not start_jd <= jd_x < end_jd:
+            continue
+        if h0 < 0.0 and rise is None:
+            rise = jd_x
+        elif h0 >= 0.0 and set_ is None:
+            set_ = jd_x
+    return rise, set_
+
+
+# --- Public API --------------------------------------------------------------
+
+def _format_time(moment: Optional[datetime], tz, missing: str) -> str:
+    if moment is None:
+        return missing
+    return moment.astimezone(tz).strftime("%I:%M %p")
+
+
+def _from_jd(jd: float) -> datetime:
+    return datetime.fromtimestamp((jd - 2440587.5) * 86400.0, tz=timezone.utc)
+
+
+def compute_range(lat: float, lon: float, tz_id: str, start: date, end: date) -> List[Dict[str, Any]]:
+    """Astro blocks for every local date from start to end (inclusive).
+
+    Moon altitude is sampled hourly once for the whole range and each day's
+    rise/set is found in its slice of the shared series.
+    """
+    tz = _time_zone(tz_id)
+    n_days = (end - start).days + 1
+    if n_days <= 0:
+        return []
+
+    midnights = [
+        datetime.combine(start + timedelta(days=i), datetime.min.time(), tzinfo=tz)
+        for i in range(n_days + 1)
+    ]
+    first_jd = julian_day(midnights[0])
+    # Hourly samples covering every local day (DST days are 23-25 hours long)
+    total_hours = int(math.ceil((julian_day(midnights[-1]) - first_jd) * 24)) + 1
+    samples = [
+        (first_jd + h / 24.0, _moon_altitude_offset(first_jd + h / 24.0, lat, lon))
+        for h in range(total_hours + 1)
+    ]
+
+    days = []
+    for i in range(n_days):
+        day_start, day_end = julian_day(midnights[i]), julian_day(midnights[i + 1])
+        first = int(math.floor((day_start - first_jd) * 24 + 1e-6))
+        last = int(math.ceil((day_end - first_jd) * 24 - 1e-6))
+        moonrise, moonset = _crossings(samples[first:last + 1], lat, lon, day_start, day_end)
+
+        local_noon = (midnights[i] + timedelta(hours=12)).astimezone(timezone.utc)
+        sunrise, sunset = _sun_events(lat, lon, local_noon)
+        phase, illumination = _moon_phase(julian_day(local_noon))
+
+        days.append({
+            "date": (start + timedelta(days=i)).isoformat(),
+            "sunrise": _format_time(sunrise, tz, "No sunrise"),
+            "sunset": _format_time(sunset, tz, "No sunset"),
+            "moonrise": _format_time(_from_jd(moonrise) if moonrise else None, tz, "No moonrise"),
+            "moonset": _format_time(_from_jd(moonset) if moonset else None, tz, "No moonset"),
+            "moon_phase": phase,
+            "moon_illumination": illumination,
+        })
+    return days
+
+
+def compute_day(lat: float, lon: float, tz_id: str, day: date) -> Dict[str, Any]:
+    """Astro block for a single local date"""
+    return compute_range(lat, lon, tz_id, day, day)[0]
@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+Memory benchmark for cached weather responses
+Builds synthetic WeatherAPI-shaped responses (current conditions plus a
+multi-day hourly forecast) for many locations and measures, with
+tracemalloc, the bytes held per cached location as plain upstream dicts and
+in the compact weather_model representation.
+
+Usage: python bench_cache_memory.py [--locations 500] [--days 3] [--output bench.jsonl]
+"""
+
+import argparse
+import gc
+import json
+import random
+import time
+import tracemalloc
+from datetime import date, timedelta
+from typing import Any, Callable, Dict, List
+
+from weather_model import compact
+
+CONDITIONS = [
+    {"text": "Sunny", "icon": "//cdn.weatherapi.com/weather/64x64/day/113.png", "code": 1000},
+    {"text": "Partly cloudy", "icon": "//cdn.weatherapi.com/weather/64x64/day/116.png", "code": 1003},
+    {"text": "Overcast", "icon": "//cdn.weatherapi.com/weather/64x64/day/122.png", "code": 1009},
+    {"text": "Patchy rain nearby", "icon": "//cdn.weatherapi.com/weather/64x64/day/176.png", "code": 1063},
+    {"text": "Light rain", "icon": "//cdn.weatherapi.com/weather/64x64/day/296.png", "code": 1183},
+]
+WIND_DIRS = ["N", "NNE", "NE", "E", "SE", "S", "SW", "W", "NW", "WSW", "SSW"]
+
+
+def hour(rng: random.Random, day: str, h: int) -> Dict[str, Any]:
+    temp = round(rng.uniform(-5, 30), 1)
+    wind = round(rng.uniform(0, 40), 1)
+    return {
+        "time_epoch": 1760000000 + h * 3600, "time": f"{day} {h:02d}:00",
+        "temp_c": temp, "temp_f": round(temp * 1.8 + 32, 1), "is_day": int(6 <= h < 19),
+        "condition": dict(rng.choice(CONDITIONS)),
+        "wind_mph": round(wind / 1.609, 1), "wind_kph": wind, "wind_degree": rng.randrange(360),
+        "wind_dir": rng.choice(WIND_DIRS), "pressure_mb": float(rng.randrange(990, 1030)),
+        "pressure_in": round(rng.uniform(29.2, 30.4), 2), "precip_mm": round(rng.uniform(0, 3), 2),
+        "precip_in": round(rng.uniform(0, 0.1), 2), "snow_cm": 0.0, "humidity": rng.randrange(30, 100),
+        "cloud": rng.randrange(0, 100), "feelslike_c": temp - 1.5, "feelslike_f": round(temp * 1.8 + 29, 1),
+        "windchill_c": temp - 2.0, "windchill_f": round(temp * 1.8 + 28, 1), "heatindex_c": temp + 0.5,
+        "heatindex_f": round(temp * 1.8 + 33, 1), "dewpoint_c": temp - 4.0, "dewpoint_f": round(temp * 1.8 + 25, 1),
+        "will_it_rain": rng.randrange(2), "chance_of_rain": rng.randrange(100), "will_it_snow": 0,
+        "chance_of_snow": 0, "vis_km": 10.0, "vis_miles": 6.0, "gust_mph": round(wind / 1.2, 1),
+        "gust_kph": round(wind * 1.3, 1), "uv": round(rng.uniform(0, 6), 1),
+    }
+
+
+def location(i: int) -> Dict[str, Any]:
+    return {"name": f"Town {i}", "region": f"Region {i % 50}", "country": "Country", "lat": 40 + i * 0.01,
+            "lon": -3 + i * 0.01, "tz_id": "Europe/London", "localtime_epoch": 1760000000,
+            "localtime": "2026-10-19 10:00"}
+
+
+def responses(i: int, days: int) -> List[Dict[str, Any]]:
+    """current.json and forecast.json responses for one location"""
+    rng = random.Random(i)
+    start = date(2026, 10, 19)
+    forecast_days = []
+    for d in range(days):
+        day = (start + timedelta(days=d)).isoformat()
+        hours = [hour(rng, day, h) for h in range(24)]
+        temps = [h["temp_c"] for h in hours]
+        forecast_days.append({
+            "date": day, "date_epoch": 1760000000 + d * 86400,
+            "day": {"maxtemp_c": max(temps), "maxtemp_f": max(temps) * 1.8 + 32, "mintemp_c": min(temps),
+                    "mintemp_f": min(temps) * 1.8 + 32, "avgtemp_c": 12.3, "avgtemp_f": 54.1, "maxwind_mph": 12.0,
+                    "maxwind_kph": 19.3, "totalprecip_mm": 4.2, "totalprecip_in": 0.17, "totalsnow_cm": 0.0,
+                    "avgvis_km": 9.8, "avgvis_miles": 6.0, "avghumidity": 78, "daily_will_it_rain": 1,
+                    "daily_chance_of_rain": 86, "daily_will_it_snow": 0, "daily_chance_of_snow": 0,
+                    "condition": dict(rng.choice(CONDITIONS)), "uv": 1.0},
+            "astro": {"sunrise": "07:30 AM", "sunset": "06:00 PM", "moonrise": "10:00 AM", "moonset": "07:00 PM",
+                      "moon_phase": "Waxing Crescent", "moon_illumination": 20, "is_moon_up": 0, "is_sun_up": 0},
+            "hour": hours,
+        })
+    current = {k: v for k, v in hour(rng, "2026-10-19", 10).items() if k not in ("time", "time_epoch")}
+    current.update({"last_updated_epoch": 1760000000, "last_updated": "2026-10-19 10:00"})
+    return [
+        {"location": location(i), "current": current},
+        {"location": location(i), "forecast": {"forecastday": forecast_days}},
+    ]
+
+
+def measure(build: Callable[[int], Any], count: int) -> Dict[str, float]:
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    kept = [build(i) for i in range(count)]
+    elapsed = time.perf_counter() - start
+    gc.collect()
+    used, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del kept
+    return {"bytes_per_location": round(used / count), "build_ms_per_location": round(elapsed * 1000 / count, 3)}
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--locations", type=int, default=500)
+    parser.add_argument("--days", type=int, default=3, help="Forecast days per location")
+    parser.add_argument("--output", help="Append the summary as a JSON line to this file")
+    args = parser.parse_args()
+
+    # Responses are generated outside the measured section and deep-copied
+    # back in, so both variants start from identical freshly parsed JSON
+    raw = [json.dumps(responses(i, args.days)) for i in range(args.locations)]
+    summary = {
+        "locations": args.locations,
+        "forecast_days": args.days,
+        "dict": measure(lambda i: json.loads(raw[i]), args.locations),
+        "compact": measure(lambda i: [compact(r) for r in json.loads(raw[i])], args.locations),
+    }
+    summary["ratio"] = round(summary["dict"]["bytes_per_location"] / summary["compact"]["bytes_per_location"], 2)
+    print(json.dumps(summary, indent=2))
+    if args.output:
+        with open(args.output, "a", encoding="utf-8") as f:
+            f.write(json.dumps(summary) + "\n")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Cold-start benchmark for the HTTP servers
+Starts the server in a fresh process, measures the time until the first
+successful /healthz response, and collects the server's own /startupz
+timings. Results can be appended to a JSON-lines file to track regressions.
+
+Usage: python bench_cold_start.py [--runs 5] [--app main.py] [--output bench.jsonl]
+"""
+
+import argparse
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+from typing import Any, Dict, List, Optional
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def get_json(url: str) -> Optional[Dict[str, Any]]:
+    try:
+        with urllib.request.urlopen(url, timeout=1) as response:
+            return json.loads(response.read())
+    except (urllib.error.URLError, ConnectionError, OSError, ValueError):
+        return None
+
+
+def build_command(app: str, port: int) -> List[str]:
+    if app.endswith(".py"):
+        return [sys.executable, os.path.join(HERE, app)]
+    # module:attribute, served by uvicorn like the Dockerfile does
+    return [sys.executable, "-m", "uvicorn", app, "--host", "127.0.0.1", "--port", str(port)]
+
+
+def run_once(app: str, fast: bool, timeout: float) -> Dict[str, Any]:
+    port = free_port()
+    env = dict(os.environ)
+    env.setdefault("WEATHER_API_KEY", "benchmark")
+    env["PORT"] = str(port)
+    env["HOST"] = "127.0.0.1"
+    env["FAST_STARTUP"] = "1" if fast else "0"
+
+    started = time.perf_counter()
+    proc = subprocess.Popen(
+        build_command(app, port), cwd=HERE, env=env,
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        base = f"http://127.0.0.1:{port}"
+        while time.perf_counter() - started < timeout:
+            if get_json(f"{base}/healthz") is not None:
+                first_response_ms = (time.perf_counter() - started) * 1000
+                return {
+                    "first_response_ms": round(first_response_ms, 1),
+                    "server": get_json(f"{base}/startupz"),
+                }
+            if proc.poll() is not None:
+                raise RuntimeError(f"server exited with code {proc.returncode}")
+            time.sleep(0.005)
+        raise RuntimeError(f"no response within {timeout}s")
+    finally:
+        proc.terminate()
+        try:
+            proc.wait(timeout=5)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--app", default="main.py", help="main.py or a module:app for uvicorn")
+    parser.add_argument("--eager", action="store_true", help="Disable FAST_STARTUP for comparison")
+    parser.add_argument("--timeout", type=float, default=30.0)
+    parser.add_argument("--output", help="Append the summary as a JSON line to this file")
+    args = parser.parse_args()
+
+    results = [run_once(args.app, not args.eager, args.timeout) for _ in range(args.runs)]
+    samples = [r["first_response_ms"] for r in results]
+    summary = {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "app": args.app,
+        "fast_startup": not args.eager,
+        "runs": args.runs,
+        "first_response_ms": {
+            "min": min(samples),
+            "median": round(statistics.median(samples), 1),
+            "max": max(samples),
+        },
+        "last_server_report": results[-1]["server"],
+    }
+    print(json.dumps(summary, indent=2))
+
+    if args.output:
+        with open(args.output, "a", encoding="utf-8") as f:
+            f.write(json.dumps(summary) + "\n")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
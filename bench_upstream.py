@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Tail latency benchmark for upstream retries and hedging
+Sends requests through UpstreamClient to an in-process fake upstream
+(httpx.MockTransport, no network) that answers most requests in 20-60 ms,
+fails a share with 503 and stalls another share for a long time, and reports
+latency percentiles and failures with no retries, with budgeted retries,
+and with retries plus hedging after the endpoint's p95.
+
+Usage: python bench_upstream.py [--requests 2000] [--concurrency 20] [--error-rate 0.05]
+                                [--stall-rate 0.05] [--stall 1.5] [--seed 1] [--output bench.jsonl]
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import time
+from typing import Any, Dict, List
+
+import httpx
+
+from upstream import UpstreamClient, UpstreamError
+
+CONFIGS = {
+    "no_retries": {"retries": 0, "hedging": False},
+    "retries": {"retries": 2, "hedging": False},
+    "retries_hedging": {"retries": 2, "hedging": True},
+}
+
+
+def fake_upstream(rng: random.Random, error_rate: float, stall_rate: float, stall: float) -> httpx.MockTransport:
+    async def handler(request: httpx.Request) -> httpx.Response:
+        roll = rng.random()
+        if roll < error_rate:
+            await asyncio.sleep(0.01)
+            return httpx.Response(503, json={"error": {"code": 9999, "message": "Service unavailable"}})
+        await asyncio.sleep(stall if roll < error_rate + stall_rate else rng.uniform(0.02, 0.06))
+        return httpx.Response(200, json={"location": {"name": "London"}, "current": {"temp_c": 12.0}})
+
+    return httpx.MockTransport(handler)
+
+
+def percentile(ordered: List[float], q: float) -> float:
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+async def run(config: Dict[str, Any], args: argparse.Namespace) -> Dict[str, Any]:
+    rng = random.Random(args.seed)
+    client = UpstreamClient("http://upstream.test", transport=fake_upstream(
+        rng, args.error_rate, args.stall_rate, args.stall), **config)
+    latencies: List[float] = []
+    failures = 0
+    semaphore = asyncio.Semaphore(args.concurrency)
+
+    async def one() -> None:
+        nonlocal failures
+        async with semaphore:
+            start = time.perf_counter()
+            try:
+                await client.get("current.json", {"q": "London"})
+            except UpstreamError:
+                failures += 1
+            latencies.append(time.perf_counter() - start)
+
+    await asyncio.gather(*(one() for _ in range(args.requests)))
+    await client.close()
+    latencies.sort()
+    counters = client.stats()
+    return {
+        "p50_ms": round(percentile(latencies, 0.5) * 1000, 1),
+        "p95_ms": round(percentile(latencies, 0.95) * 1000, 1),
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 1),
+        "failures": failures,
+        "attempts": counters.get("attempts", 0),
+        "retries": counters.get("retries", 0),
+        "retries_denied": counters.get("retries_denied", 0),
+        "hedges": counters.get("hedges", 0),
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--error-rate", type=float, default=0.05, help="Share of requests answered with 503")
+    parser.add_argument("--stall-rate", type=float, default=0.05, help="Share of requests that stall")
+    parser.add_argument("--stall", type=float, default=1.5, help="Stall duration in seconds")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", help="Append the summary as a JSON line to this file")
+    args = parser.parse_args()
+
+    summary: Dict[str, Any] = {
+        "requests": args.requests,
+        "concurrency": args.concurrency,
+        "error_rate": args.error_rate,
+        "stall_rate": args.stall_rate,
+        "stall_seconds": args.stall,
+    }
+    for name, config in CONFIGS.items():
+        summary[name] = asyncio.run(run(config, args))
+    print(json.dumps(summary, indent=2))
+    if args.output:
+        with open(args.output, "a", encoding="utf-8") as f:
+            f.write(json.dumps(summary) + "\n")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,39 @@
+#!/usr/bin/env python3
+"""
+Precompute the OpenAPI documents at build time
+Writes openapi/<module>.json for each app so the running server can serve a
+static document instead of generating it on first access.
+
+Usage: python build_openapi.py [output_dir]
+"""
+
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import coldstart
+
+APPS = ["http_bridge", "mcp_http_bridge"]
+
+
+def main() -> int:
+    out_dir = sys.argv[1] if len(sys.argv) > 1 else coldstart.OPENAPI_DIR
+    os.makedirs(out_dir, exist_ok=True)
+
+    for module_name in APPS:
+        module = __import__(module_name)
+        app = module.app
+        # Always regenerate rather than reading a previously built file
+        app.openapi_schema = None
+        schema = app.state.generate_openapi()
+        path = os.path.join(out_dir, f"{module_name}.json")
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(schema, f, separators=(",", ":"))
+        print(f"Wrote {path} ({len(schema.get('paths', {}))} paths)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""
+Climate aggregation over historical weather
+Reduces the per-day hourly data returned by history.json to a small set of
+statistics, so only aggregates have to be sent back to the caller.
+
+Hourly values are gathered into flat typed columns (array('d')) and reduced
+with single-pass builtins; numpy is deliberately not a dependency.
+"""
+
+import math
+from array import array
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+
+# Default thresholds for "hours above/below" counts
+DEFAULT_THRESHOLDS = {
+    "temp_above_c": 25.0,
+    "temp_below_c": 0.0,
+    "wind_above_kph": 40.0,
+    "precip_above_mm": 0.1,
+}
+
+PERCENTILES = (10, 25, 50, 75, 90)
+
+# Hourly fields collected into columns: output name -> upstream hour field
+HOURLY_COLUMNS = {
+    "temp_c": "temp_c",
+    "feelslike_c": "feelslike_c",
+    "precip_mm": "precip_mm",
+    "wind_kph": "wind_kph",
+    "gust_kph": "gust_kph",
+    "humidity": "humidity",
+    "cloud": "cloud",
+    "uv": "uv",
+}
+
+
+def percentile(sorted_values: Sequence[float], pct: float) -> Optional[float]:
+    """Linearly interpolated percentile of already sorted values"""
+    if not sorted_values:
+        return None
+    rank = (len(sorted_values) - 1) * pct / 100.0
+    low = math.floor(rank)
+    high = math.ceil(rank)
+    if low == high:
+        return sorted_values[low]
+    return sorted_values[low] + (sorted_values[high] - sorted_values[low]) * (rank - low)
+
+
+def describe(values: Sequence[float]) -> Dict[str, Any]:
+    """min/max/mean and percentiles of a numeric column"""
+    if not values:
+        return {"count": 0}
+    ordered = sorted(values)
+    summary: Dict[str, Any] = {
+        "count": len(ordered),
+        "min": ordered[0],
+        "max": ordered[-1],
+        "mean": round(math.fsum(ordered) / len(ordered), 2),
+    }
+    for pct in PERCENTILES:
+        summary[f"p{pct}"] = round(percentile(ordered, pct), 2)
+    return summary
+
+
+def count_at_least(values: Iterable[float], threshold: float) -> int:
+    return sum(1 for v in values if v >= threshold)
+
+
+def count_at_most(values: Iterable[float], threshold: float) -> int:
+    return sum(1 for v in values if v <= threshold)
+
+
+def hourly_columns(days: Iterable[Dict[str, Any]]) -> Dict[str, array]:
+    """Flatten the hourly rows of every day into one typed column per field"""
+    columns = {name: array("d") for name in HOURLY_COLUMNS}
+    for day in days:
+        hours = day.get("hour", [])
+        if hasattr(hours, "column"):
+            # Compact cached days already hold typed columns
+            stored = {name: hours.column(field) for name, field in HOURLY_COLUMNS.items()}
+            if all(isinstance(column, array) for column in stored.values()):
+                for name, column in stored.items():
+                    if column.typecode != "d":
+                        column = map(float, column)
+                    elif any(v != v for v in column):
+                        column = [v for v in column if v == v]
+                    columns[name].extend(column)
+                continue
+        for hour in hours:
+            for name, field in HOURLY_COLUMNS.items():
+                value = hour.get(field)
+                # Gaps arrive as None or NaN; neither counts as a reading
+                if value is not None and value == value:
+                    columns[name].append(value)
+    return columns
+
+
+def daily_column(days: Iterable[Dict[str, Any]], field: str) -> array:
+    column = array("d")
+    for day in days:
+        value = day.get("day", {}).get(field)
+        if value is not None and value == value:
+            column.append(value)
+    return column
+
+
+def summarize(days: List[Dict[str, Any]], thresholds: Optional[Dict[str, float]] = None) -> Dict[str, Any]:
+    """Aggregate statistics over a list of upstream ``forecastday`` entries"""
+    limits = dict(DEFAULT_THRESHOLDS)
+    limits.update({k: v for k, v in (thresholds or {}).items() if v is not None})
+
+    columns = hourly_columns(days)
+    daily_precip = daily_column(days, "totalprecip_mm")
+    daily_max = daily_column(days, "maxtemp_c")
+    daily_min = daily_column(days, "mintemp_c")
+
+    return {
+        "period": {
+            "start_date": days[0].get("date") if days else None,
+            "end_date": days[-1].get("date") if days else None,
+            "days": len(days),
+            "hours": len(columns["temp_c"]),
+        },
+        "temperature_c": {
+            "hourly": describe(columns["temp_c"]),
+            "daily_max_mean": round(math.fsum(daily_max) / len(daily_max), 2) if daily_max else None,
+            "daily_min_mean": round(math.fsum(daily_min) / len(daily_min), 2) if daily_min else None,
+        },
+        "feels_like_c": describe(columns["feelslike_c"]),
+        "precipitation": {
+            "total_mm": round(math.fsum(daily_precip), 2),
+            "max_daily_mm": max(daily_precip) if daily_precip else None,
+            "wet_days": count_at_least(daily_precip, 1.0),
+            "hourly_mm": describe(columns["precip_mm"]),
+        },
+        "wind_kph": describe(columns["wind_kph"]),
+        "gust_kph": describe(columns["gust_kph"]),
+        "humidity": describe(columns["humidity"]),
+        "cloud_cover": describe(columns["cloud"]),
+        "uv_index": describe(columns["uv"]),
+        "hours": {
+            "thresholds": limits,
+            "temp_above": count_at_least(columns["temp_c"], limits["temp_above_c"]),
+            "temp_below": count_at_most(columns["temp_c"], limits["temp_below_c"]),
+            "wind_above": count_at_least(columns["wind_kph"], limits["wind_above_kph"]),
+            "precip_above": count_at_least(columns["precip_mm"], limits["precip_above_mm"]),
+        },
+    }
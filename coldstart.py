@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Startup instrumentation for fast cold starts
+Records import/startup timings and serves an OpenAPI document precomputed at
+build time (see build_openapi.py) instead of generating it on first access.
+
+Only the standard library is imported here so that it can be loaded first
+and time everything that follows.
+"""
+
+import json
+import os
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, Optional
+
+# Reference point for all startup timings
+PROCESS_START = time.perf_counter()
+
+# Directory holding prebuilt OpenAPI documents (written by build_openapi.py)
+OPENAPI_DIR = os.getenv("OPENAPI_PREBUILT_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "openapi"))
+
+_imports: Dict[str, float] = {}
+_marks: Dict[str, float] = {}
+
+
+def fast_startup_enabled() -> bool:
+    """Whether the startup-optimized mode (FAST_STARTUP=1) is active"""
+    return os.getenv("FAST_STARTUP", "0").lower() in ("1", "true", "yes")
+
+
+def _elapsed_ms(since: float) -> float:
+    return round((time.perf_counter() - since) * 1000, 2)
+
+
+@contextmanager
+def timed_import(label: str) -> Iterator[None]:
+    """Record how long the wrapped import block takes"""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        _imports[label] = _elapsed_ms(started)
+
+
+def mark(label: str) -> None:
+    """Record the time since process start for a milestone (first call wins)"""
+    if label not in _marks:
+        _marks[label] = _elapsed_ms(PROCESS_START)
+
+
+def report() -> Dict[str, Any]:
+    """Startup timings collected so far"""
+    return {
+        "fast_startup": fast_startup_enabled(),
+        "uptime_ms": _elapsed_ms(PROCESS_START),
+        "imports_ms": dict(_imports),
+        "milestones_ms": dict(_marks),
+    }
+
+
+class FirstResponseTimer:
+    """ASGI middleware marking when the first HTTP response starts.
+
+    After the first response it is a single attribute check per request.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self.seen = False
+
+    async def __call__(self, scope, receive, send):
+        if self.seen or scope.get("type") != "http":
+            await self.app(scope, receive, send)
+            return
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start" and not self.seen:
+                self.seen = True
+                mark("first_response")
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
+
+
+def install_prebuilt_openapi(app, name: str) -> None:
+    """Serve ``openapi/<name>.json`` when present, else generate as usual.
+
+    The original generator stays available as ``app.state.generate_openapi``
+    so build_openapi.py can always produce a fresh document.
+    """
+    generate: Callable[[], Dict[str, Any]] = app.openapi
+    path = os.path.join(OPENAPI_DIR, f"{name}.json")
+
+    def openapi() -> Dict[str, Any]:
+        if app.openapi_schema:
+            return app.openapi_schema
+        schema: Optional[Dict[str, Any]] = None
+        if os.path.exists(path):
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    schema = json.load(f)
+            except (OSError, ValueError):
+                schema = None
+        if schema is None:
+            return generate()
+        app.openapi_schema = schema
+        return schema
+
+    app.state.generate_openapi = generate
+    app.openapi = openapi
@@ -0,0 +1,260 @@
+#!/usr/bin/env python3
+"""
+Event-loop lag monitoring and on-demand profiling
+A heartbeat task measures how late the event loop wakes up and keeps lag
+percentiles; a watchdog thread notices when the loop stops ticking and
+captures the loop thread's stack at that moment, so blocking calls (big
+json.dumps, synchronous logging, formatting) show up with their call site.
+
+Profiles of the running process are taken on demand, either with cProfile
+(exact call counts, noticeable overhead) or by sampling the loop thread's
+stack from another thread (low overhead, collapsed stacks for flame graphs).
+"""
+
+import asyncio
+import cProfile
+import hmac
+import io
+import logging
+import os
+import pstats
+import sys
+import threading
+import time
+import traceback
+from collections import Counter, deque
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Token required by the /admin endpoints; unset disables them
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN", "")
+
+LOOP_MONITOR = os.getenv("LOOP_MONITOR", "1").lower() in ("1", "true", "yes")
+LOOP_LAG_INTERVAL_SECONDS = float(os.getenv("LOOP_LAG_INTERVAL_SECONDS", "0.1"))
+# A loop that has not ticked for this long past its heartbeat is stalled
+LOOP_STALL_SECONDS = float(os.getenv("LOOP_STALL_SECONDS", "0.25"))
+
+# Lag samples kept for percentiles, stalls kept with their stacks
+LAG_SAMPLES = 3000
+MAX_STALLS = 50
+STACK_DEPTH = 20
+
+MAX_PROFILE_SECONDS = 60.0
+SAMPLE_INTERVAL_SECONDS = 0.005
+PROFILE_MODES = ("sample", "cprofile")
+
+
+def check_admin_token(provided: Optional[str]) -> bool:
+    """Constant-time comparison against ADMIN_TOKEN (always False when unset)"""
+    return bool(ADMIN_TOKEN) and provided is not None and hmac.compare_digest(provided, ADMIN_TOKEN)
+
+
+def _percentile(ordered: List[float], q: float) -> float:
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))] if ordered else 0.0
+
+
+def _stack(frame, depth: int = STACK_DEPTH) -> List[str]:
+    lines = traceback.format_stack(frame)[-depth:]
+    return [line.rstrip() for line in lines]
+
+
+class LoopLagMonitor:
+    """Heartbeat lag percentiles plus stack captures of loop stalls"""
+
+    def __init__(self, interval: float = LOOP_LAG_INTERVAL_SECONDS, stall: float = LOOP_STALL_SECONDS):
+        self.interval = interval
+        self.stall = stall
+        self.lags: Deque[float] = deque(maxlen=LAG_SAMPLES)
+        self.stalls: Deque[Dict[str, Any]] = deque(maxlen=MAX_STALLS)
+        self.stall_count = 0
+        self.max_lag = 0.0
+        self._last_beat = 0.0
+        self._open_stall: Optional[Dict[str, Any]] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_thread: Optional[int] = None
+        self._task: Optional[asyncio.Task] = None
+        self._watchdog: Optional[threading.Thread] = None
+        self._stopped = threading.Event()
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start(self) -> None:
+        """Start monitoring the running loop (no-op if already running there)"""
+        loop = asyncio.get_running_loop()
+        if self.running and self._loop is loop:
+            return
+        self.stop()
+        self._loop = loop
+        self._loop_thread = threading.get_ident()
+        self._last_beat = time.monotonic()
+        self._stopped = threading.Event()
+        self._task = loop.create_task(self._heartbeat())
+        self._watchdog = threading.Thread(target=self._watch, args=(self._stopped,),
+                                          name="loop-watchdog", daemon=True)
+        self._watchdog.start()
+
+    def stop(self) -> None:
+        self._stopped.set()
+        if self._task is not None and not self._task.done():
+            self._task.cancel()
+        self._task = None
+
+    async def _heartbeat(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            expected = loop.time() + self.interval
+            await asyncio.sleep(self.interval)
+            lag = max(0.0, loop.time() - expected)
+            self.lags.append(lag)
+            self.max_lag = max(self.max_lag, lag)
+            self._last_beat = time.monotonic()
+            stall = self._open_stall
+            if stall is not None:
+                # The stall is over: record how long the loop was blocked
+                stall["blocked_ms"] = round(lag * 1000, 1)
+                self._open_stall = None
+
+    def _watch(self, stopped: threading.Event) -> None:
+        check_every = max(self.stall / 4, 0.01)
+        reported_beat = None
+        while not stopped.wait(check_every):
+            beat = self._last_beat
+            late = time.monotonic() - beat - self.interval
+            if late < self.stall or beat == reported_beat:
+                continue
+            reported_beat = beat
+            frame = sys._current_frames().get(self._loop_thread)
+            stall = {
+                "at": round(time.time(), 3),
+                "blocked_ms": round(late * 1000, 1),
+                "stack": _stack(frame) if frame is not None else [],
+            }
+            self.stalls.append(stall)
+            self.stall_count += 1
+            self._open_stall = stall
+            logger.warning(f"Event loop blocked for {late * 1000:.0f} ms at: "
+                           f"{stall['stack'][-1].strip() if stall['stack'] else '?'}")
+
+    def stats(self, stacks: bool = False) -> Dict[str, Any]:
+        """Lag percentiles in ms; with stacks=True also the recent stalls"""
+        ordered = sorted(self.lags)
+        result: Dict[str, Any] = {
+            "running": self.running,
+            "interval_ms": round(self.interval * 1000, 1),
+            "samples": len(ordered),
+            "lag_ms": {f"p{int(q * 100)}": round(_percentile(ordered, q) * 1000, 2) for q in (0.5, 0.9, 0.99)},
+            "max_lag_ms": round(self.max_lag * 1000, 2),
+            "stall_threshold_ms": round(self.stall * 1000, 1),
+            "stalls": self.stall_count,
+        }
+        if stacks:
+            result["recent_stalls"] = list(self.stalls)
+        return result
+
+
+class StackSampler:
+    """Samples one thread's stack at a fixed interval"""
+
+    def __init__(self, thread_id: int, interval: float = SAMPLE_INTERVAL_SECONDS):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self.samples = 0
+
+    def run(self, seconds: float) -> None:
+        deadline = time.monotonic() + seconds
+        while time.monotonic() < deadline:
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is not None:
+                self.stacks[self._key(frame)] += 1
+                self.samples += 1
+            time.sleep(self.interval)
+
+    @staticmethod
+    def _key(frame) -> Tuple[str, ...]:
+        names = []
+        while frame is not None:
+            code = frame.f_code
+            names.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+            frame = frame.f_back
+        return tuple(reversed(names))
+
+    def report(self, limit: int) -> Dict[str, Any]:
+        own: Counter = Counter()
+        total: Counter = Counter()
+        polling = 0
+        for stack, count in self.stacks.items():
+            leaf = stack[-1]
+            own[leaf] += count
+            for name in set(stack):
+                total[name] += count
+            # Time in the selector is mostly the loop waiting for I/O
+            if leaf.startswith(("select (", "poll (")):
+                polling += count
+        samples = max(self.samples, 1)
+        return {
+            "samples": self.samples,
+            "interval_ms": self.interval * 1000,
+            "selector_fraction": round(polling / samples, 3),
+            "self": [{"function": f, "fraction": round(c / samples, 4)} for f, c in own.most_common(limit)],
+            "total": [{"function": f, "fraction": round(c / samples, 4)} for f, c in total.most_common(limit)],
+            # "frame;frame;frame count" lines, the input format of flame graph tools
+            "collapsed": [f"{';'.join(s)} {c}" for s, c in self.stacks.most_common(limit)],
+        }
+
+
+_profile_lock = threading.Lock()
+
+
+class ProfileBusy(Exception):
+    """Another profile is already being taken"""
+
+
+async def profile(seconds: float, mode: str = "sample", limit: int = 40) -> Dict[str, Any]:
+    """Profile the event loop thread for ``seconds`` while it keeps serving"""
+    if mode not in PROFILE_MODES:
+        raise ValueError(f"mode must be one of {', '.join(PROFILE_MODES)}")
+    seconds = min(max(seconds, 0.1), MAX_PROFILE_SECONDS)
+    if not _profile_lock.acquire(blocking=False):
+        raise ProfileBusy("A profile is already running")
+    try:
+        if mode == "cprofile":
+            result = await _cprofile(seconds, limit)
+        else:
+            sampler = StackSampler(threading.get_ident())
+            await asyncio.get_running_loop().run_in_executor(None, sampler.run, seconds)
+            result = sampler.report(limit)
+    finally:
+        _profile_lock.release()
+    return {"mode": mode, "seconds": seconds, **result}
+
+
+async def _cprofile(seconds: float, limit: int) -> Dict[str, Any]:
+    # cProfile follows the thread that enables it, which is the loop thread,
+    # so everything the loop runs in the meantime is captured
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        await asyncio.sleep(seconds)
+    finally:
+        profiler.disable()
+    out = io.StringIO()
+    stats = pstats.Stats(profiler, stream=out)
+    stats.sort_stats("cumulative").print_stats(limit)
+    top = []
+    for (filename, line, name), (_, calls, tottime, cumtime, _) in stats.stats.items():
+        top.append({
+            "function": f"{name} ({os.path.basename(filename)}:{line})",
+            "calls": calls,
+            "tottime_ms": round(tottime * 1000, 3),
+            "cumtime_ms": round(cumtime * 1000, 3),
+        })
+    top.sort(key=lambda entry: entry["tottime_ms"], reverse=True)
+    return {"top": top[:limit], "text": out.getvalue()}
+
+
+# Shared by whichever app runs in this process
+monitor = LoopLagMonitor()
@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""
+Local gazetteer for search_locations autocomplete
+A sorted prefix array over location records (the same fields the
+search_locations tool returns), loaded from an optional bundled dataset and
+extended with every upstream search result.
+"""
+
+import json
+import logging
+import os
+from bisect import bisect_left
+from typing import Any, Dict, List, Optional, Tuple
+
+from location_resolver import normalize_query
+
+logger = logging.getLogger(__name__)
+
+RECORD_FIELDS = ("id", "name", "region", "country", "lat", "lon", "url")
+
+# Answer locally when at least this many records match, or the query names
+# one record in full ("name, region" or "name, country"). A bare name is not
+# enough on its own: a learned "Paris, Texas" says nothing about the Paris
+# upstream knows and the index has not seen yet.
+MIN_CONFIDENT_RESULTS = int(os.getenv("GAZETTEER_MIN_RESULTS", "3"))
+
+# Most matching terms a prefix search looks at; a broad prefix ("a") is
+# confident long before its whole run is scored
+MAX_PREFIX_SCAN = 500
+
+
+def record_key(record: Dict[str, Any]) -> str:
+    if record.get("id") is not None:
+        return f"id:{record['id']}"
+    return normalize_query(f"{record.get('name')},{record.get('region')},{record.get('country')}")
+
+
+class Gazetteer:
+    """Prefix search over known locations.
+
+    ``_terms`` is a sorted list of (search term, record key) pairs, so a
+    prefix search is one bisect plus a scan over the matching run.
+    """
+
+    def __init__(self, path: Optional[str] = None, bundled_path: Optional[str] = None):
+        self.path = path
+        self.bundled_path = bundled_path
+        self._records: Dict[str, Dict[str, Any]] = {}
+        self._terms: List[Tuple[str, str]] = []
+        self._loaded = False
+        self.local_answers = 0
+        self.upstream_fallbacks = 0
+
+    def __len__(self) -> int:
+        self._ensure_loaded()
+        return len(self._records)
+
+    def add(self, records: List[Dict[str, Any]]) -> None:
+        """Add (or refresh) location records"""
+        self._ensure_loaded()
+        new_terms: List[Tuple[str, str]] = []
+        for record in records:
+            if not record.get("name"):
+                continue
+            key = record_key(record)
+            is_new = key not in self._records
+            self._records[key] = {field: record.get(field) for field in RECORD_FIELDS}
+            if not is_new:
+                continue
+            name = normalize_query(record["name"])
+            terms = {name}
+            for qualifier in ("region", "country"):
+                if record.get(qualifier):
+                    terms.add(normalize_query(f"{record['name']},{record[qualifier]}"))
+            new_terms.extend((term, key) for term in terms)
+        if new_terms:
+            # One sort per batch: Timsort merges the sorted run with the new
+            # terms, where an insort per term made bulk loads quadratic
+            self._terms.extend(new_terms)
+            self._terms.sort()
+
+    def search(self, query: str, limit: int = 10) -> Tuple[List[Dict[str, Any]], bool]:
+        """Return (matching records best first, whether the answer is confident)"""
+        self._ensure_loaded()
+        q = normalize_query(query)
+        if not q:
+            return [], False
+
+        scores: Dict[str, float] = {}
+        qualified_match = False
+        terms = self._terms
+        i = bisect_left(terms, (q, ""))
+        end = min(len(terms), i + MAX_PREFIX_SCAN)
+        while i < end and terms[i][0].startswith(q):
+            term, key = terms[i]
+            i += 1
+            if term == q and "," in term:
+                qualified_match = True
+            score = 0.6 + 0.4 * len(q) / len(term)
+            if score > scores.get(key, 0.0):
+                scores[key] = score
+
+        # No fuzzy fallback: misspellings go upstream, whose search handles
+        # them, instead of scanning every name here first
+        ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)[:limit]
+        results = [dict(self._records[key]) for key, _ in ranked]
+        confident = bool(ranked) and (len(ranked) >= MIN_CONFIDENT_RESULTS or qualified_match)
+        return results, confident
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "records": len(self._records),
+            "local_answers": self.local_answers,
+            "upstream_fallbacks": self.upstream_fallbacks,
+        }
+
+    def save(self) -> None:
+        """Persist learned records"""
+        if not self.path:
+            return
+        self._ensure_loaded()
+        tmp_path = f"{self.path}.tmp"
+        try:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(list(self._records.values()), f, separators=(",", ":"))
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            logger.error(f"Failed to write gazetteer {self.path}: {e}")
+
+    def _ensure_loaded(self) -> None:
+        if self._loaded:
+            return
+        self._loaded = True
+        for path in (self.bundled_path, self.path):
+            if not path or not os.path.exists(path):
+                continue
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    records = json.load(f)
+            except (OSError, ValueError) as e:
+                logger.warning(f"Ignoring unreadable gazetteer {path}: {e}")
+                continue
+            self.add(records)
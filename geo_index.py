@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+Geospatial proximity index over cached responses
+Lets a coordinate query ("lat,lon") be answered from a cached response for a
+nearby point instead of going upstream.
+"""
+
+import math
+import re
+import time
+from typing import Dict, List, Optional, Tuple
+
+COORDINATE_PATTERN = re.compile(r"^\s*(-?\d{1,3}(?:\.\d+)?)\s*,\s*(-?\d{1,3}(?:\.\d+)?)\s*$")
+
+EARTH_RADIUS_KM = 6371.0
+KM_PER_DEGREE = 111.32
+
+# Sweep stale entries once the index grows past this many points
+MAX_INDEXED_POINTS = 5000
+
+
+def parse_coordinates(query) -> Optional[Tuple[float, float]]:
+    """Return (lat, lon) if the query is a valid coordinate pair"""
+    if not isinstance(query, str):
+        return None
+    match = COORDINATE_PATTERN.match(query)
+    if not match:
+        return None
+    lat, lon = float(match.group(1)), float(match.group(2))
+    if not (-90.0 <= lat <= 90.0 and -180.0 <= lon <= 180.0):
+        return None
+    return lat, lon
+
+
+def haversine_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    """Great-circle distance between two points"""
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    dphi = phi2 - phi1
+    dlambda = math.radians(lon2 - lon1)
+    a = math.sin(dphi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlambda / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+class ProximityIndex:
+    """Fixed-size lat/lon grid of cached response locations.
+
+    Points are bucketed per request variant (endpoint plus every parameter
+    except the location), so a 3-day forecast is never served for a 7-day
+    query. Cells are ``radius_km`` wide, so a lookup only scans the
+    neighbouring cells (more of them in longitude towards the poles).
+    """
+
+    def __init__(self, radius_km: float, max_age: float):
+        self.radius_km = radius_km
+        self.max_age = max_age
+        self.cell_deg = max(radius_km, 0.01) / KM_PER_DEGREE
+        # (variant, cell_x, cell_y) -> {cache_key: (lat, lon, stored_at)}
+        self._cells: Dict[Tuple[str, int, int], Dict[str, Tuple[float, float, float]]] = {}
+        self._points = 0
+        self.lookups = 0
+        self.hits = 0
+        self._hit_distance_km = 0.0
+
+    @property
+    def enabled(self) -> bool:
+        return self.radius_km > 0 and self.max_age > 0
+
+    def _cell(self, lat: float, lon: float) -> Tuple[int, int]:
+        return int(math.floor(lon / self.cell_deg)), int(math.floor(lat / self.cell_deg))
+
+    def add(self, variant: str, lat: float, lon: float, cache_key: str) -> None:
+        """Index a freshly cached response at the location it resolved to"""
+        if not self.enabled:
+            return
+        cx, cy = self._cell(lat, lon)
+        bucket = self._cells.setdefault((variant, cx, cy), {})
+        if cache_key not in bucket:
+            self._points += 1
+        bucket[cache_key] = (lat, lon, time.time())
+        if self._points > MAX_INDEXED_POINTS:
+            self._sweep()
+
+    def candidates(self, variant: str, lat: float, lon: float) -> List[Tuple[float, str]]:
+        """Fresh indexed entries within the radius, nearest first"""
+        self.lookups += 1
+        if not self.enabled:
+            return []
+        cx, cy = self._cell(lat, lon)
+        cos_lat = max(math.cos(math.radians(lat)), 0.01)
+        span_x = min(int(math.ceil(1 / cos_lat)), 64)
+        oldest = time.time() - self.max_age
+
+        found = []
+        for dx in range(-span_x, span_x + 1):
+            for dy in (-1, 0, 1):
+                bucket = self._cells.get((variant, cx + dx, cy + dy))
+                if not bucket:
+                    continue
+                for cache_key, (plat, plon, stored_at) in bucket.items():
+                    if stored_at < oldest:
+                        continue
+                    distance = haversine_km(lat, lon, plat, plon)
+                    if distance <= self.radius_km:
+                        found.append((distance, cache_key))
+        found.sort()
+        return found
+
+    def record_hit(self, distance_km: float) -> None:
+        self.hits += 1
+        self._hit_distance_km += distance_km
+
+    def discard(self, cache_key: str) -> None:
+        """Drop a key whose cache entry is gone"""
+        for cell_key in [k for k, bucket in self._cells.items() if cache_key in bucket]:
+            del self._cells[cell_key][cache_key]
+            self._points -= 1
+            if not self._cells[cell_key]:
+                del self._cells[cell_key]
+
+    def _sweep(self) -> None:
+        oldest = time.time() - self.max_age
+        for cell_key in list(self._cells):
+            bucket = self._cells[cell_key]
+            for cache_key in [k for k, (_, _, stored_at) in bucket.items() if stored_at < oldest]:
+                del bucket[cache_key]
+                self._points -= 1
+            if not bucket:
+                del self._cells[cell_key]
+
+    def stats(self) -> Dict[str, object]:
+        return {
+            "radius_km": self.radius_km,
+            "max_age_seconds": self.max_age,
+            "indexed_points": self._points,
+            "coordinate_lookups": self.lookups,
+            "hits": self.hits,
+            "upstream_calls_saved": self.hits,
+            "hit_ratio": round(self.hits / self.lookups, 4) if self.lookups else 0.0,
+            "avg_hit_distance_km": round(self._hit_distance_km / self.hits, 3) if self.hits else None,
+        }
@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+"""
+Hourly time-window queries over a cached forecast
+Answers "what is it like at 15:30 tomorrow" or "the next 6 hours" from the
+hourly rows of forecast.json without sending every row back: the requested
+fields are gathered into typed columns, the target times are mapped to
+(hour index, weight) pairs once, and that plan is applied to every column.
+Numeric fields are interpolated linearly, categorical ones take the nearest
+hour.
+
+Times are local to the location ("YYYY-MM-DD HH:MM"), on the same axis as
+the upstream "time" strings; a day's rows are midnight plus one hour each.
+"""
+
+import math
+from array import array
+from bisect import bisect_right
+from datetime import date, datetime, timezone
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+try:
+    from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+except ImportError:  # Python < 3.9
+    ZoneInfo = None
+    ZoneInfoNotFoundError = Exception
+
+# Fields that can be requested; True means interpolated, False nearest hour
+FIELDS = {
+    "temp_c": True,
+    "temp_f": True,
+    "feelslike_c": True,
+    "feelslike_f": True,
+    "dewpoint_c": True,
+    "precip_mm": True,
+    "snow_cm": True,
+    "chance_of_rain": True,
+    "chance_of_snow": True,
+    "wind_kph": True,
+    "wind_mph": True,
+    "gust_kph": True,
+    "wind_degree": False,
+    "wind_dir": False,
+    "humidity": True,
+    "cloud": True,
+    "pressure_mb": True,
+    "vis_km": True,
+    "uv": True,
+    "is_day": False,
+    "condition": False,
+}
+DEFAULT_FIELDS = ("temp_c", "precip_mm", "chance_of_rain", "wind_kph", "condition")
+
+# Most points a single query may return
+MAX_POINTS = 240
+
+HOUR_SECONDS = 3600
+DAY_SECONDS = 86400
+_EPOCH = date(1970, 1, 1)
+TIME_FORMAT = "%Y-%m-%d %H:%M"
+
+
+def parse_local_time(text: str) -> int:
+    """Seconds on the local axis for a "YYYY-MM-DD HH:MM" time"""
+    moment = datetime.strptime(text.strip(), TIME_FORMAT)
+    return (moment.date() - _EPOCH).days * DAY_SECONDS + moment.hour * HOUR_SECONDS + moment.minute * 60
+
+
+def format_local_time(seconds: int) -> str:
+    days, rest = divmod(int(seconds), DAY_SECONDS)
+    day = date.fromordinal(_EPOCH.toordinal() + days)
+    return f"{day.isoformat()} {rest // HOUR_SECONDS:02d}:{rest % HOUR_SECONDS // 60:02d}"
+
+
+def local_now(location: Dict[str, Any]) -> int:
+    """Current time on the local axis at a response's location.
+
+    Taken from the location's tz_id, so a cached forecast (or one from a
+    provider without "localtime") still gives the real current time; the
+    upstream "localtime" is the fallback.
+    """
+    tz_id = location.get("tz_id")
+    if tz_id and ZoneInfo is not None:
+        try:
+            return parse_local_time(datetime.now(ZoneInfo(tz_id)).strftime(TIME_FORMAT))
+        except (ZoneInfoNotFoundError, ValueError):
+            pass
+    if location.get("localtime"):
+        return parse_local_time(location["localtime"])
+    raise ValueError("The location's local time is unknown; give a start time")
+
+
+def _condition_text(value: Any) -> Any:
+    # Compact rows hold Condition tuples, plain rows dicts
+    if isinstance(value, tuple):
+        return value[0]
+    if isinstance(value, dict):
+        return value.get("text")
+    return value
+
+
+def hourly_columns(days: Iterable[Dict[str, Any]], fields: Sequence[str]) -> Tuple[array, Dict[str, Any]]:
+    """Local time axis plus one column per field across all days.
+
+    Numeric fields become array('d') (NaN for gaps), others lists.
+    """
+    axis = array("q")
+    columns: Dict[str, Any] = {name: array("d") if FIELDS[name] else [] for name in fields}
+    for day in days:
+        hours = day.get("hour") or []
+        midnight = (date.fromisoformat(day["date"]) - _EPOCH).days * DAY_SECONDS
+        axis.extend(range(midnight, midnight + len(hours) * HOUR_SECONDS, HOUR_SECONDS))
+        for name in fields:
+            stored = hours.column(name) if hasattr(hours, "column") else None
+            if stored is None:
+                stored = [hour.get(name) for hour in hours]
+            column = columns[name]
+            if FIELDS[name]:
+                if isinstance(stored, array) and stored.typecode == "d":
+                    column.extend(stored)
+                else:
+                    column.extend(math.nan if v is None else float(v) for v in stored)
+            elif name == "condition":
+                column.extend(_condition_text(v) for v in stored)
+            else:
+                column.extend(stored)
+    return axis, columns
+
+
+def _plan(axis: array, times: Sequence[int]) -> List[Tuple[int, float]]:
+    """(lower hour index, weight of the next hour) for each target time"""
+    last = len(axis) - 1
+    plan = []
+    for t in times:
+        i = min(max(bisect_right(axis, t) - 1, 0), last)
+        if i == last:
+            plan.append((i, 0.0))
+        else:
+            plan.append((i, (t - axis[i]) / (axis[i + 1] - axis[i])))
+    return plan
+
+
+def _apply(column: Any, plan: List[Tuple[int, float]], interpolate: bool) -> List[Any]:
+    if interpolate:
+        values = [column[i] if w == 0.0 else column[i] + (column[i + 1] - column[i]) * w for i, w in plan]
+        return [None if math.isnan(v) else round(v, 2) for v in values]
+    return [column[i + 1] if w >= 0.5 else column[i] for i, w in plan]
+
+
+def window(days: Sequence[Dict[str, Any]], start: int, end: int, fields: Optional[Sequence[str]] = None,
+           step_minutes: Optional[int] = None) -> Dict[str, Any]:
+    """Points between start and end (local axis seconds, inclusive).
+
+    Without a step the forecast's own hours inside the window are returned
+    (or the single interpolated instant when start == end); with a step,
+    points every step_minutes from start, interpolated as needed.
+    """
+    fields = tuple(fields or DEFAULT_FIELDS)
+    unknown = [name for name in fields if name not in FIELDS]
+    if unknown:
+        raise ValueError(f"Unknown hourly fields: {', '.join(unknown)}")
+    if end < start:
+        raise ValueError("end must not be before start")
+
+    axis, columns = hourly_columns(days, fields)
+    if not axis:
+        raise ValueError("No hourly forecast available")
+    if start < axis[0] or end > axis[-1]:
+        raise ValueError(
+            f"Window must lie within the forecast, {format_local_time(axis[0])} to {format_local_time(axis[-1])}"
+        )
+
+    if step_minutes:
+        times: Sequence[int] = range(start, end + 1, step_minutes * 60)
+    elif start == end:
+        times = [start]
+    else:
+        times = axis[bisect_right(axis, start - 1):bisect_right(axis, end)]
+    if len(times) > MAX_POINTS:
+        raise ValueError(f"Window has {len(times)} points; at most {MAX_POINTS} are returned")
+
+    plan = _plan(axis, times)
+    values = {name: _apply(columns[name], plan, FIELDS[name]) for name in fields}
+    interpolated = any(w for _, w in plan)
+    points = [
+        {"time": format_local_time(t), **{name: values[name][n] for name in fields}}
+        for n, t in enumerate(times)
+    ]
+    return {"fields": list(fields), "interpolated": interpolated, "points": points}
@@ -8,26 +8,44 @@ formatting logic from WeatherMCPServer.
 """
 
 import os
+import json
 import asyncio
 import logging
-from typing import Any, Dict, Optional
+from typing import Any, Dict, List, Optional
 from pydantic import BaseModel, Field
 
 import httpx
-from fastapi import FastAPI, HTTPException, Query, Body
-from fastapi.responses import JSONResponse
+from fastapi import FastAPI, HTTPException, Query, Body, Request
+from fastapi.responses import JSONResponse, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
 
+import admission
+import coldstart
+import diagnostics
+import log_pipeline
+from http_responses import CompressionMiddleware, ResponseRenderer, conditional_response
+from tool_validation import InvalidArguments
+from upstream import UpstreamHTTPError, UpstreamTimeout
+
 # Configure logging
-logging.basicConfig(level=logging.INFO)
+log_pipeline.configure_logging()
 logger = logging.getLogger(__name__)
 
 # Try to import weather server - delay import to avoid startup errors
 try:
-    from weather_mcp_server import WeatherMCPServer  # type: ignore
+    from weather_mcp_server import CACHE_TTLS, WeatherMCPServer  # type: ignore
 except ImportError as e:
     logger.error(f"Failed to import WeatherMCPServer: {e}")
     WeatherMCPServer = None
+    CACHE_TTLS = {}
+
+# Rendered JSON bodies (with ETags), kept on the cache entries they came from
+renderer = ResponseRenderer()
+
+# Comment line sent on idle subscription streams so proxies keep them open
+SUBSCRIPTION_KEEPALIVE_SECONDS = 15
+# Pending updates kept per slow subscriber; older ones are dropped
+SUBSCRIPTION_QUEUE_SIZE = 4
 
 
 def get_api_key() -> str:
@@ -87,6 +105,9 @@ def custom_openapi():
 
 app.openapi = custom_openapi
 
+# Admission control sits inside CORS so shed responses still carry CORS headers
+app.add_middleware(admission.AdmissionMiddleware)
+
 # Add CORS middleware for OpenAI Agent Builder
 app.add_middleware(
     CORSMiddleware,
@@ -95,6 +116,11 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(coldstart.FirstResponseTimer)
+app.add_middleware(CompressionMiddleware)
+# Outermost, so the record carries the final status and the full duration
+app.add_middleware(log_pipeline.AccessLogMiddleware)
+coldstart.install_prebuilt_openapi(app, "http_bridge")
 
 # Request/Response models for OpenAI Agent Builder
 class WeatherRequest(BaseModel):
@@ -109,7 +135,16 @@ class ForecastRequest(BaseModel):
 class HistoryRequest(BaseModel):
     location: str = Field(..., description="City name, coordinates (lat,lon), or postal code")
     date: str = Field(..., description="Date in YYYY-MM-DD format")
-    end_date: Optional[str] = Field(None, description="End date in YYYY-MM-DD format (optional)")
+    end_date: Optional[str] = Field(None, description="End date in YYYY-MM-DD format (optional, at most 30 days after date)")
+
+class StatisticsRequest(BaseModel):
+    location: str = Field(..., description="City name, coordinates (lat,lon), or postal code")
+    start_date: str = Field(..., description="Start date in YYYY-MM-DD format")
+    end_date: str = Field(..., description="End date in YYYY-MM-DD format (inclusive, at most 366 days after start_date)")
+    temp_above_c: Optional[float] = Field(None, description="Count hours with temperature at or above this value (default 25)")
+    temp_below_c: Optional[float] = Field(None, description="Count hours with temperature at or below this value (default 0)")
+    wind_above_kph: Optional[float] = Field(None, description="Count hours with wind speed at or above this value (default 40)")
+    precip_above_mm: Optional[float] = Field(None, description="Count hours with precipitation at or above this value (default 0.1)")
 
 class SearchRequest(BaseModel):
     query: str = Field(..., description="Location name to search for")
@@ -117,6 +152,55 @@ class SearchRequest(BaseModel):
 class AstronomyRequest(BaseModel):
     location: str = Field(..., description="City name, coordinates (lat,lon), or postal code")
     date: Optional[str] = Field(None, description="Date in YYYY-MM-DD format (optional, defaults to today)")
+    end_date: Optional[str] = Field(None, description="End date in YYYY-MM-DD format to get every day from date to end_date (optional, at most 366 days after date)")
+
+class HourlyWindowRequest(BaseModel):
+    location: str = Field(..., description="City name, coordinates (lat,lon), or postal code")
+    start: Optional[str] = Field(None, description="Local time at the location in YYYY-MM-DD HH:MM format (optional, defaults to now)")
+    end: Optional[str] = Field(None, description="End of the window, local time in YYYY-MM-DD HH:MM format (optional; without end or hours a single time is returned)")
+    hours: Optional[int] = Field(None, ge=1, le=240, description="Window length in hours from start (alternative to end)")
+    step_minutes: Optional[int] = Field(None, ge=10, le=360, description="Return a point every N minutes, interpolated, instead of the forecast's own hours (optional)")
+    fields: Optional[List[str]] = Field(None, description="Hourly fields to return (default temp_c, precip_mm, chance_of_rain, wind_kph, condition)")
+
+class CompareRequest(BaseModel):
+    locations: List[str] = Field(..., description="Locations to compare: city names, coordinates (lat,lon) or postal codes (2-50)")
+    start_date: Optional[str] = Field(None, description="First local date of the window in YYYY-MM-DD format (optional, defaults to now through the end of the 3-day forecast)")
+    end_date: Optional[str] = Field(None, description="Last local date of the window in YYYY-MM-DD format (optional, defaults to start_date, at most 10 days after it)")
+    from_hour: Optional[int] = Field(None, ge=0, le=23, description="Only count hours of the day from this hour (0-23, optional)")
+    to_hour: Optional[int] = Field(None, ge=0, le=23, description="Only count hours of the day up to this hour (0-23, optional)")
+    criteria: Optional[List[str]] = Field(None, description="What to rank on: precipitation, temperature, wind, uv (default precipitation, temperature, wind)")
+    comfort_min_c: Optional[float] = Field(None, description="Lower end of the comfortable temperature band (default 18)")
+    comfort_max_c: Optional[float] = Field(None, description="Upper end of the comfortable temperature band (default 26)")
+
+
+def http_error(exc: Exception) -> HTTPException:
+    """Map a failed upstream call to the HTTP error returned to the client"""
+    if isinstance(exc, (admission.DeadlineExceeded, UpstreamTimeout)):
+        return HTTPException(status_code=504, detail=str(exc))
+    if isinstance(exc, UpstreamHTTPError) and exc.status_code == 400:
+        # e.g. no matching location: the request itself was bad
+        return HTTPException(status_code=400, detail=str(exc))
+    return HTTPException(status_code=502, detail=str(exc))
+
+
+def request_arguments(request: BaseModel) -> Dict[str, Any]:
+    """Tool arguments from a request model (pydantic v1 or v2)"""
+    return request.model_dump() if hasattr(request, "model_dump") else request.dict()
+
+
+def check_arguments(server, tool: str, request: BaseModel) -> None:
+    """Reject arguments the tool's schema rules out before anything goes upstream"""
+    log_pipeline.note(tool=tool)
+    try:
+        server.validator.validate(tool, request_arguments(request))
+    except InvalidArguments as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+
+
+def client_max_age(server, endpoint: str, data: Any) -> int:
+    """What is left of the cached response's TTL, so clients never hold it longer than the cache"""
+    remaining = server.cache.remaining_ttl(data)
+    return int(CACHE_TTLS.get(endpoint, 0) if remaining is None else remaining)
 
 
 async def fetch(server, endpoint: str, params: Dict[str, Any]) -> Dict[str, Any]:
@@ -129,18 +213,32 @@ async def fetch(server, endpoint: str, params: Dict[str, Any]) -> Dict[str, Any]
     try:
         return await server._make_api_request(endpoint, params)  # noqa: SLF001
     except Exception as exc:  # pragma: no cover - passthrough to HTTP error
-        raise HTTPException(status_code=502, detail=str(exc))
+        raise http_error(exc)
+
+
+# Shared server instance so the response cache is reused across requests
+_server: Optional["WeatherMCPServer"] = None
+
+
+def set_server(server: "WeatherMCPServer") -> None:
+    """Use an existing server instance (e.g. the one owned by mcp_http_bridge)"""
+    global _server
+    _server = server
 
 
 def create_server() -> WeatherMCPServer:
-    """Create weather server instance, with error handling"""
+    """Get the shared weather server instance, creating it on first use"""
+    global _server
+    if _server is not None:
+        return _server
     if WeatherMCPServer is None:
         raise HTTPException(
             status_code=503,
             detail="Weather server module not available. Check server logs."
         )
     try:
-        return WeatherMCPServer(api_key=get_api_key())
+        _server = WeatherMCPServer(api_key=get_api_key())
+        return _server
     except RuntimeError as e:
         logger.error(f"Failed to create server: {e}")
         raise HTTPException(
@@ -149,6 +247,22 @@ def create_server() -> WeatherMCPServer:
         )
 
 
+@app.on_event("startup")
+async def on_startup() -> None:
+    if diagnostics.LOOP_MONITOR:
+        diagnostics.monitor.start()
+    coldstart.mark("app_startup")
+
+
+@app.on_event("shutdown")
+async def on_shutdown() -> None:
+    """Persist the warm-start cache snapshot and learned locations"""
+    diagnostics.monitor.stop()
+    if _server is not None:
+        _server.save_state()
+        await _server.providers.close()
+
+
 @app.get("/", include_in_schema=False)
 async def root() -> JSONResponse:
     """Root endpoint for health checks - doesn't require API key"""
@@ -167,6 +281,34 @@ async def healthz() -> JSONResponse:
     return JSONResponse({"status": "ok"})
 
 
+@app.get("/startupz", include_in_schema=False)
+async def startupz() -> JSONResponse:
+    """Import and startup timings for cold-start tracking"""
+    return JSONResponse(coldstart.report())
+
+
+@app.get("/stats", include_in_schema=False)
+async def stats() -> JSONResponse:
+    """Cache and runtime statistics - doesn't require API key"""
+    if _server is None:
+        return JSONResponse({"status": "idle"})
+    return JSONResponse({
+        **_server.stats(),
+        "rendered_responses": renderer.stats(),
+        "admission": admission.controller.stats(),
+        "event_loop": diagnostics.monitor.stats(),
+        "logging": log_pipeline.stats(),
+    })
+
+
+@app.get("/cache", include_in_schema=False)
+async def cache_info(limit: int = Query(20, ge=1, le=200)) -> JSONResponse:
+    """Response cache memory budget, usage and eviction candidates"""
+    if _server is None:
+        return JSONResponse({"status": "idle"})
+    return JSONResponse(_server.cache.describe(limit))
+
+
 @app.post(
     "/get_current_weather",
     summary="Get Current Weather",
@@ -174,13 +316,15 @@ async def healthz() -> JSONResponse:
     tags=["weather"],
     response_description="Current weather data for the specified location"
 )
-async def get_current_weather(request: WeatherRequest = Body(...)):
+async def get_current_weather(http_request: Request, request: WeatherRequest = Body(...)):
     server = create_server()
+    check_arguments(server, "get_current_weather", request)
     params: Dict[str, Any] = {"q": request.location}
     if request.include_air_quality:
         params["aqi"] = "yes"
     data = await fetch(server, "current.json", params)
-    return JSONResponse(server._format_current_weather(data))  # noqa: SLF001
+    rendered = renderer.render(server.cache, "get_current_weather", data, server._format_current_weather)  # noqa: SLF001
+    return conditional_response(http_request, rendered, client_max_age(server, "current.json", data))
 
 
 @app.post(
@@ -190,13 +334,15 @@ async def get_current_weather(request: WeatherRequest = Body(...)):
     tags=["weather"],
     response_description="Weather forecast data"
 )
-async def get_weather_forecast(request: ForecastRequest = Body(...)):
+async def get_weather_forecast(http_request: Request, request: ForecastRequest = Body(...)):
     server = create_server()
+    check_arguments(server, "get_weather_forecast", request)
     params: Dict[str, Any] = {"q": request.location, "days": request.days}
     if request.include_air_quality:
         params["aqi"] = "yes"
     data = await fetch(server, "forecast.json", params)
-    return JSONResponse(server._format_forecast(data))  # noqa: SLF001
+    rendered = renderer.render(server.cache, "get_weather_forecast", data, server._format_forecast)  # noqa: SLF001
+    return conditional_response(http_request, rendered, client_max_age(server, "forecast.json", data))
 
 
 @app.post(
@@ -208,6 +354,7 @@ async def get_weather_forecast(request: ForecastRequest = Body(...)):
 )
 async def get_weather_history(request: HistoryRequest = Body(...)):
     server = create_server()
+    check_arguments(server, "get_weather_history", request)
     params: Dict[str, Any] = {"q": request.location, "dt": request.date}
     if request.end_date:
         params["end_dt"] = request.end_date
@@ -215,6 +362,33 @@ async def get_weather_history(request: HistoryRequest = Body(...)):
     return JSONResponse(server._format_history(data))  # noqa: SLF001
 
 
+@app.post(
+    "/get_weather_statistics",
+    summary="Get Weather Statistics",
+    description="Get aggregated climate statistics (temperature percentiles, precipitation totals, hours above thresholds) over a date range",
+    tags=["weather"],
+    response_description="Aggregated statistics for the date range"
+)
+async def get_weather_statistics(request: StatisticsRequest = Body(...)):
+    server = create_server()
+    check_arguments(server, "get_weather_statistics", request)
+    args: Dict[str, Any] = {
+        "location": request.location,
+        "start_date": request.start_date,
+        "end_date": request.end_date,
+        "temp_above_c": request.temp_above_c,
+        "temp_below_c": request.temp_below_c,
+        "wind_above_kph": request.wind_above_kph,
+        "precip_above_mm": request.precip_above_mm,
+    }
+    try:
+        return JSONResponse(await server._compute_weather_statistics(args))  # noqa: SLF001
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+    except Exception as exc:  # pragma: no cover - passthrough to HTTP error
+        raise http_error(exc)
+
+
 @app.post(
     "/search_locations",
     summary="Search Locations",
@@ -224,38 +398,112 @@ async def get_weather_history(request: HistoryRequest = Body(...)):
 )
 async def search_locations(request: SearchRequest = Body(...)):
     server = create_server()
-    params: Dict[str, Any] = {"q": request.query}
-    data = await fetch(server, "search.json", params)
-    # Keep response consistent with MCP formatting for locations list
-    locations = []
-    for loc in data:
-        locations.append({
-            "id": loc.get("id"),
-            "name": loc.get("name"),
-            "region": loc.get("region"),
-            "country": loc.get("country"),
-            "lat": loc.get("lat"),
-            "lon": loc.get("lon"),
-            "url": loc.get("url"),
-        })
+    check_arguments(server, "search_locations", request)
+    # Same local-first lookup (and formatting) as the MCP tool
+    try:
+        locations = await server._find_locations(request.query)  # noqa: SLF001
+    except Exception as exc:  # pragma: no cover - passthrough to HTTP error
+        raise http_error(exc)
     return JSONResponse({"locations": locations})
 
 
 @app.post(
     "/get_astronomy_data",
     summary="Get Astronomy Data",
-    description="Get sunrise, sunset, moon phase, and other astronomy data",
+    description="Get sunrise, sunset, moon phase, and other astronomy data for a date or a date range",
     tags=["weather"],
     response_description="Astronomy data for the specified location"
 )
 async def get_astronomy_data(request: AstronomyRequest = Body(...)):
-    from datetime import datetime  # local import to avoid polluting module
+    server = create_server()
+    check_arguments(server, "get_astronomy_data", request)
+    args: Dict[str, Any] = {"location": request.location, "date": request.date, "end_date": request.end_date}
+    try:
+        return JSONResponse(await server._compute_astronomy(args))  # noqa: SLF001
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+    except Exception as exc:  # pragma: no cover - passthrough to HTTP error
+        raise http_error(exc)
 
+
+@app.post(
+    "/get_hourly_window",
+    summary="Get Hourly Window",
+    description="Get selected hourly forecast values at a local time or over a time window, interpolated between forecast hours when needed",
+    tags=["weather"],
+    response_description="Forecast values at the requested times"
+)
+async def get_hourly_window(request: HourlyWindowRequest = Body(...)):
     server = create_server()
-    actual_date = request.date or datetime.now().strftime("%Y-%m-%d")
-    params: Dict[str, Any] = {"q": request.location, "dt": actual_date}
-    data = await fetch(server, "astronomy.json", params)
-    return JSONResponse(server._format_astronomy(data))  # noqa: SLF001
+    check_arguments(server, "get_hourly_window", request)
+    try:
+        return JSONResponse(await server._compute_hourly_window(request_arguments(request)))  # noqa: SLF001
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+    except Exception as exc:  # pragma: no cover - passthrough to HTTP error
+        raise http_error(exc)
+
+
+@app.post(
+    "/compare_locations",
+    summary="Compare Locations",
+    description="Rank several locations by their forecast over a time window and return only the ranked summary",
+    tags=["weather"],
+    response_description="Locations ranked best first, with per-location metrics"
+)
+async def compare_locations(request: CompareRequest = Body(...)):
+    server = create_server()
+    check_arguments(server, "compare_locations", request)
+    try:
+        return JSONResponse(await server._compute_comparison(request_arguments(request)))  # noqa: SLF001
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+    except Exception as exc:  # pragma: no cover - passthrough to HTTP error
+        raise http_error(exc)
+
+
+@app.get(
+    "/subscribe",
+    summary="Subscribe to Weather Changes",
+    description="Server-Sent Events stream of a location's current conditions or alerts, pushed when they change",
+    tags=["weather"],
+    include_in_schema=False,
+)
+async def subscribe(
+    http_request: Request,
+    location: str = Query(..., description="City name, coordinates (lat,lon), or postal code"),
+    kind: str = Query("current", description="What to watch: current or alerts"),
+):
+    server = create_server()
+    queue: asyncio.Queue = asyncio.Queue(maxsize=SUBSCRIPTION_QUEUE_SIZE)
+
+    async def push(value: Dict[str, Any]) -> None:
+        if queue.full():
+            queue.get_nowait()
+        queue.put_nowait(value)
+
+    try:
+        subscription = server.subscriptions.subscribe(kind, location, push)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+
+    async def events():
+        try:
+            while not await http_request.is_disconnected():
+                try:
+                    value = await asyncio.wait_for(queue.get(), SUBSCRIPTION_KEEPALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    yield ": keepalive\n\n"
+                    continue
+                yield f"event: {kind}\ndata: {json.dumps(value, separators=(',', ':'))}\n\n"
+        finally:
+            server.subscriptions.unsubscribe(subscription)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
 
 # Entrypoint for local dev: uvicorn http_bridge:app --host 0.0.0.0 --port 8000
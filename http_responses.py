@@ -0,0 +1,255 @@
+#!/usr/bin/env python3
+"""
+Cacheable JSON responses for the REST endpoints
+Renders formatted weather data once per cached upstream response, tags it
+with a strong ETag (content hash) and answers If-None-Match with 304.
+
+Responses are compressed with the best encoding the client accepts (zstd,
+brotli, gzip). Rendered bodies and their compressed variants are produced
+once and attached to the response cache entry they were rendered from, so
+they are byte-accounted and evicted with it; other responses go through
+CompressionMiddleware.
+"""
+
+import gzip
+import hashlib
+import json
+import os
+import sys
+from typing import Any, Callable, Dict, List, Optional
+
+from fastapi import Request
+from fastapi.responses import Response
+
+# Optional encoders - gzip is always available
+try:
+    import brotli
+    BROTLI_AVAILABLE = True
+except ImportError:
+    BROTLI_AVAILABLE = False
+try:
+    import zstandard
+    ZSTD_AVAILABLE = True
+except ImportError:
+    ZSTD_AVAILABLE = False
+
+# Bodies smaller than this are sent uncompressed
+COMPRESSION_MIN_BYTES = int(os.getenv("COMPRESSION_MIN_BYTES", "1024"))
+
+# Server preference among the encodings a client accepts
+SUPPORTED_ENCODINGS: List[str] = (
+    (["zstd"] if ZSTD_AVAILABLE else []) + (["br"] if BROTLI_AVAILABLE else []) + ["gzip"]
+)
+
+# Compression levels: cached bodies are compressed once, so they can afford
+# a higher level than responses compressed on every request
+CACHED_LEVELS = {"gzip": 9, "br": 8, "zstd": 12}
+STREAMING_LEVELS = {"gzip": 5, "br": 4, "zstd": 3}
+
+COMPRESSIBLE_TYPES = ("application/json", "text/html", "text/plain", "application/javascript", "text/css")
+
+
+def compress(body: bytes, encoding: str, level: int) -> bytes:
+    if encoding == "gzip":
+        return gzip.compress(body, compresslevel=level, mtime=0)
+    if encoding == "br":
+        return brotli.compress(body, quality=level)
+    if encoding == "zstd":
+        return zstandard.ZstdCompressor(level=level).compress(body)
+    raise ValueError(f"Unsupported encoding: {encoding}")
+
+
+def negotiate_encoding(accept_encoding: Optional[str]) -> Optional[str]:
+    """Pick the preferred supported encoding allowed by Accept-Encoding"""
+    if not accept_encoding:
+        return None
+    accepted: Dict[str, float] = {}
+    for part in accept_encoding.split(","):
+        name, _, params = part.strip().partition(";")
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[name.strip().lower()] = quality
+    for encoding in SUPPORTED_ENCODINGS:
+        if accepted.get(encoding, accepted.get("*", 0.0)) > 0.0:
+            return encoding
+    return None
+
+
+class RenderedBody:
+    __slots__ = ("body", "etag", "encodings", "on_encoded")
+
+    def __init__(self, body: bytes, etag: str):
+        self.body = body
+        self.etag = etag
+        self.encodings: Dict[str, bytes] = {}
+        # Called after a new variant is kept (the renderer re-charges the cache)
+        self.on_encoded: Optional[Callable[[], None]] = None
+
+    def encoded(self, encoding: str) -> bytes:
+        """Compressed variant, produced on first use and then kept"""
+        data = self.encodings.get(encoding)
+        if data is None:
+            data = compress(self.body, encoding, CACHED_LEVELS[encoding])
+            self.encodings[encoding] = data
+            if self.on_encoded is not None:
+                self.on_encoded()
+        return data
+
+    def nbytes(self) -> int:
+        return (sys.getsizeof(self) + sys.getsizeof(self.body) + sys.getsizeof(self.etag)
+                + sys.getsizeof(self.encodings) + sum(sys.getsizeof(v) for v in self.encodings.values()))
+
+
+def render_json(payload: Any) -> RenderedBody:
+    """Serialize like JSONResponse does and tag the bytes with a strong ETag"""
+    body = json.dumps(payload, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode("utf-8")
+    etag = '"' + hashlib.blake2b(body, digest_size=16).hexdigest() + '"'
+    return RenderedBody(body, etag)
+
+
+class ResponseRenderer:
+    """Renders each cached upstream response once per route.
+
+    The rendered body (and each compressed variant as it is produced) is
+    attached to the response cache entry holding the source object, so it
+    counts against the cache's memory budget and goes when the entry does.
+    Sources that are not cached are rendered for the one response.
+    """
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+
+    def render(self, cache: Any, route: str, source: Any, formatter: Callable[[Any], Any]) -> RenderedBody:
+        rendered = cache.attachment(source, route)
+        if rendered is not None:
+            self.hits += 1
+            return rendered
+        self.misses += 1
+        rendered = render_json(formatter(source))
+        if cache.attach(source, route, rendered, rendered.nbytes()):
+            rendered.on_encoded = lambda: cache.attach(source, route, rendered, rendered.nbytes())
+        return rendered
+
+    def stats(self) -> Dict[str, Any]:
+        return {"hits": self.hits, "misses": self.misses}
+
+
+def variant_etag(etag: str, encoding: Optional[str]) -> str:
+    """Strong ETags must differ between encoded representations"""
+    return etag if encoding is None else f'{etag[:-1]}-{encoding}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Weak comparison as required for If-None-Match (any encoding variant matches)"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    base = etag[:-1]
+    for tag in if_none_match.split(","):
+        tag = tag.strip()
+        if tag.startswith("W/"):
+            tag = tag[2:]
+        if tag == etag or (tag.startswith(base + "-") and tag.endswith('"')):
+            return True
+    return False
+
+
+def conditional_response(request: Request, rendered: RenderedBody, max_age: int) -> Response:
+    """200 with the (compressed) body, or a header-only 304 if the client already has it.
+
+    ``max_age`` should be the remaining freshness of the cached data; both
+    responses carry it.
+    """
+    encoding = None
+    if len(rendered.body) >= COMPRESSION_MIN_BYTES:
+        encoding = negotiate_encoding(request.headers.get("accept-encoding"))
+    headers = {
+        "ETag": variant_etag(rendered.etag, encoding),
+        "Cache-Control": f"public, max-age={int(max_age)}",
+        "Vary": "Accept-Encoding",
+    }
+    if etag_matches(request.headers.get("if-none-match"), rendered.etag):
+        return Response(status_code=304, headers=headers)
+    if encoding is None:
+        return Response(content=rendered.body, media_type="application/json", headers=headers)
+    headers["Content-Encoding"] = encoding
+    return Response(content=rendered.encoded(encoding), media_type="application/json", headers=headers)
+
+
+class CompressionMiddleware:
+    """ASGI middleware compressing complete (non-streamed) responses.
+
+    Responses that already carry a Content-Encoding (e.g. pre-compressed
+    cached bodies), streamed responses such as SSE, small bodies and
+    non-text content types pass through untouched.
+    """
+
+    def __init__(self, app, minimum_size: int = COMPRESSION_MIN_BYTES):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope, receive, send):
+        if scope.get("type") != "http":
+            await self.app(scope, receive, send)
+            return
+        accept = None
+        for name, value in scope.get("headers", []):
+            if name == b"accept-encoding":
+                accept = value.decode("latin-1")
+                break
+        encoding = negotiate_encoding(accept)
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start_message = None
+        passthrough = False
+
+        async def send_wrapper(message):
+            nonlocal start_message, passthrough
+            if passthrough:
+                await send(message)
+                return
+            if message["type"] == "http.response.start":
+                headers = {k.lower(): v for k, v in message.get("headers", [])}
+                content_type = headers.get(b"content-type", b"").decode("latin-1")
+                if b"content-encoding" in headers or not content_type.startswith(COMPRESSIBLE_TYPES):
+                    # Decided from the headers alone, so event streams get
+                    # their headers right away instead of with the first event
+                    passthrough = True
+                    await send(message)
+                    return
+                start_message = message
+                return
+            if message["type"] != "http.response.body":
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            if message.get("more_body", False) or len(body) < self.minimum_size:
+                passthrough = True
+                await send(start_message)
+                await send(message)
+                return
+
+            compressed = compress(body, encoding, STREAMING_LEVELS[encoding])
+            raw_headers = [
+                (k, v) for k, v in start_message.get("headers", [])
+                if k.lower() not in (b"content-length", b"vary")
+            ]
+            raw_headers += [
+                (b"content-encoding", encoding.encode("latin-1")),
+                (b"content-length", str(len(compressed)).encode("latin-1")),
+                (b"vary", b"Accept-Encoding"),
+            ]
+            await send({**start_message, "headers": raw_headers})
+            await send({"type": "http.response.body", "body": compressed, "more_body": False})
+
+        await self.app(scope, receive, send_wrapper)
@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Multi-location comparison over a forecast window
+Reduces each location's hourly forecast inside a time window (optionally
+only certain hours of the day) to a few metrics, then ranks the locations
+on the requested criteria so only the ranked summary goes back to the
+caller instead of one full forecast per location.
+
+Each criterion turns the metrics into a penalty (lower is better); penalties
+are min-max normalized across the compared locations and averaged, and the
+result is reported as a 0-100 score (100 = best on every criterion).
+"""
+
+import math
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+from hourly_window import DAY_SECONDS, HOUR_SECONDS, hourly_columns
+
+METRIC_FIELDS = ("temp_c", "precip_mm", "chance_of_rain", "wind_kph", "gust_kph", "uv")
+
+# Comfortable temperature band used by the "temperature" criterion
+DEFAULT_COMFORT_C = (18.0, 26.0)
+
+
+def _mean(values: Sequence[float]) -> Optional[float]:
+    return math.fsum(values) / len(values) if values else None
+
+
+def window_metrics(days: Sequence[Dict[str, Any]], start: int, end: int,
+                   from_hour: int = 0, to_hour: int = 23,
+                   comfort: Sequence[float] = DEFAULT_COMFORT_C) -> Dict[str, Any]:
+    """Summary of the forecast hours in [start, end] whose hour of day is in [from_hour, to_hour]"""
+    axis, columns = hourly_columns(days, METRIC_FIELDS)
+    selected = [
+        i for i, t in enumerate(axis)
+        if start <= t <= end and from_hour <= (t % DAY_SECONDS) // HOUR_SECONDS <= to_hour
+    ]
+    if not selected:
+        raise ValueError("No forecast hours fall inside the window")
+
+    def values(field: str) -> List[float]:
+        column = columns[field]
+        return [column[i] for i in selected if not math.isnan(column[i])]
+
+    temps = values("temp_c")
+    low, high = comfort
+    # Degrees outside the comfort band, averaged over the hours
+    discomfort = _mean([max(low - t, 0.0, t - high) for t in temps])
+    metrics = {
+        "hours": len(selected),
+        "total_precip_mm": round(math.fsum(values("precip_mm")), 2),
+        "mean_chance_of_rain": _mean(values("chance_of_rain")),
+        "max_chance_of_rain": max(values("chance_of_rain"), default=None),
+        "min_temp_c": min(temps, default=None),
+        "max_temp_c": max(temps, default=None),
+        "mean_temp_c": _mean(temps),
+        "comfort_deviation_c": discomfort,
+        "mean_wind_kph": _mean(values("wind_kph")),
+        "max_gust_kph": max(values("gust_kph"), default=None),
+        "max_uv": max(values("uv"), default=None),
+    }
+    return {k: round(v, 2) if isinstance(v, float) else v for k, v in metrics.items()}
+
+
+def _precipitation(m: Dict[str, Any]) -> float:
+    # Rain amount first; chance of rain breaks ties between dry forecasts
+    return m["total_precip_mm"] + (m["mean_chance_of_rain"] or 0.0) / 100.0
+
+
+def _temperature(m: Dict[str, Any]) -> float:
+    return m["comfort_deviation_c"] or 0.0
+
+
+def _wind(m: Dict[str, Any]) -> float:
+    return (m["mean_wind_kph"] or 0.0) + 0.5 * (m["max_gust_kph"] or 0.0)
+
+
+def _uv(m: Dict[str, Any]) -> float:
+    return m["max_uv"] or 0.0
+
+
+# Criterion -> penalty (lower is better)
+CRITERIA: Dict[str, Callable[[Dict[str, Any]], float]] = {
+    "precipitation": _precipitation,
+    "temperature": _temperature,
+    "wind": _wind,
+    "uv": _uv,
+}
+DEFAULT_CRITERIA = ("precipitation", "temperature", "wind")
+
+
+def rank(results: List[Dict[str, Any]], criteria: Optional[Sequence[str]] = None) -> List[Dict[str, Any]]:
+    """Order results (each with "metrics") best first, adding "score" and "rank".
+
+    Equal scores share a rank (1, 1, 3) and keep their input order.
+    """
+    criteria = tuple(criteria or DEFAULT_CRITERIA)
+    unknown = [name for name in criteria if name not in CRITERIA]
+    if unknown:
+        raise ValueError(f"Unknown criteria: {', '.join(unknown)}")
+
+    normalized = [0.0] * len(results)
+    for name in criteria:
+        penalties = [CRITERIA[name](result["metrics"]) for result in results]
+        low, high = min(penalties, default=0.0), max(penalties, default=0.0)
+        for n, penalty in enumerate(penalties):
+            normalized[n] += (penalty - low) / (high - low) if high > low else 0.0
+
+    for n, result in enumerate(results):
+        result["score"] = round(100.0 * (1.0 - normalized[n] / len(criteria)), 1)
+    ranked = sorted(results, key=lambda result: -result["score"])
+    for position, result in enumerate(ranked, 1):
+        tied = position > 1 and result["score"] == ranked[position - 2]["score"]
+        result["rank"] = ranked[position - 2]["rank"] if tied else position
+    return ranked
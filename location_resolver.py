@@ -0,0 +1,201 @@
+#!/usr/bin/env python3
+"""
+Location resolution index
+Maps free-text location queries ("london", "London, UK", a postcode, ...) to
+one canonical form so they share cache entries. The canonical form only
+keys the cache; upstream requests keep the query as written.
+
+Mappings are learned from the location block of upstream responses and
+from search results, and can be persisted between runs.
+"""
+
+import json
+import logging
+import os
+import re
+from typing import Any, Dict, List, Optional
+
+from geo_index import parse_coordinates
+
+logger = logging.getLogger(__name__)
+
+# Upper bound on learned aliases; the oldest are dropped first
+MAX_ALIASES = 20000
+
+# Location fields kept for each canonical location
+RECORD_FIELDS = ("name", "region", "country", "lat", "lon", "tz_id")
+
+_WHITESPACE = re.compile(r"\s+")
+_COMMA = re.compile(r"\s*,\s*")
+
+
+def normalize_query(query: str) -> str:
+    """Case/whitespace/comma-insensitive form of a query string"""
+    text = _WHITESPACE.sub(" ", query.strip().lower())
+    return _COMMA.sub(",", text).strip(" ,.")
+
+
+def format_coordinates(lat: float, lon: float) -> str:
+    """Canonical query string for a coordinate pair"""
+    return f"{lat:.4f},{lon:.4f}"
+
+
+class LocationResolver:
+    """In-memory query -> canonical location dictionary.
+
+    The canonical form is the resolved location's coordinates, which also
+    feed the proximity index.
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path
+        self._aliases: Dict[str, str] = {}
+        self._records: Dict[str, Dict[str, Any]] = {}
+        # Coordinate query (canonical) -> the location upstream resolved it
+        # to, for its name and time zone; never used as a cache key
+        self._points: Dict[str, str] = {}
+        self._loaded = path is None
+        self.lookups = 0
+        self.resolved = 0
+
+    def canonical(self, query: Any) -> Any:
+        """Canonical form of a query, or the query unchanged if unknown"""
+        if not isinstance(query, str):
+            return query
+        self._ensure_loaded()
+        self.lookups += 1
+        coordinates = parse_coordinates(query)
+        if coordinates is not None:
+            return format_coordinates(*coordinates)
+        canonical = self._aliases.get(normalize_query(query))
+        if canonical is None:
+            return query
+        self.resolved += 1
+        return canonical
+
+    def record(self, canonical: str) -> Optional[Dict[str, Any]]:
+        """Known details (name, coordinates, timezone, ...) of a canonical location"""
+        self._ensure_loaded()
+        return self._records.get(canonical)
+
+    def lookup(self, query: str) -> Optional[Dict[str, Any]]:
+        """Known details of the location a query resolves to.
+
+        For a coordinate query these are the query's own lat/lon with the
+        name and time zone of the place upstream resolved it to.
+        """
+        canonical = self.canonical(query)
+        if not isinstance(canonical, str):
+            return None
+        coordinates = parse_coordinates(canonical)
+        if coordinates is not None:
+            resolved = self._records.get(self._points.get(canonical, canonical))
+            if resolved is None:
+                return None
+            return {**resolved, "lat": coordinates[0], "lon": coordinates[1]}
+        return self._records.get(canonical)
+
+    def learn(self, query: Any, location: Optional[Dict[str, Any]]) -> Optional[str]:
+        """Remember where an upstream response resolved a query to"""
+        if not isinstance(query, str) or not location:
+            return None
+        if location.get("lat") is None or location.get("lon") is None:
+            return None
+        canonical = self._remember(location)
+        # Coordinate queries are already canonical (and may resolve to a
+        # different nearby point), so only free-text queries become aliases
+        coordinates = parse_coordinates(query)
+        if coordinates is None:
+            self._alias(normalize_query(query), canonical)
+        else:
+            self._remember_point(format_coordinates(*coordinates), canonical)
+        return canonical
+
+    def learn_search(self, results: List[Dict[str, Any]]) -> None:
+        """Learn aliases ("name,region,country", "name,country") from search results.
+
+        Only forms that name a single location become aliases: several
+        "Springfield, United States of America" results mean that form is
+        ambiguous, so it is dropped rather than pointed at one of them.
+        """
+        candidates: Dict[str, set] = {}
+        for result in results:
+            if result.get("lat") is None or result.get("lon") is None:
+                continue
+            canonical = self._remember(result)
+            forms = [f"{result.get('name')}, {result.get('country')}"]
+            if result.get("region"):
+                forms.append(f"{result['name']}, {result['region']}, {result['country']}")
+            for form in forms:
+                candidates.setdefault(normalize_query(form), set()).add(canonical)
+        for key, canonicals in candidates.items():
+            known = self._aliases.get(key)
+            if len(canonicals) > 1 or (known is not None and known not in canonicals):
+                self._aliases.pop(key, None)
+            else:
+                self._alias(key, next(iter(canonicals)))
+
+    def _remember(self, location: Dict[str, Any]) -> str:
+        """Record a location's details; returns its canonical form"""
+        self._ensure_loaded()
+        canonical = format_coordinates(location["lat"], location["lon"])
+        record = self._records.setdefault(canonical, {})
+        record.update({k: location[k] for k in RECORD_FIELDS if location.get(k) is not None})
+        return canonical
+
+    def _remember_point(self, point: str, canonical: str) -> None:
+        self._points.pop(point, None)
+        self._points[point] = canonical
+        while len(self._points) > MAX_ALIASES:
+            del self._points[next(iter(self._points))]
+
+    def _alias(self, key: str, canonical: str) -> None:
+        if not key:
+            return
+        self._aliases.pop(key, None)
+        self._aliases[key] = canonical
+        while len(self._aliases) > MAX_ALIASES:
+            del self._aliases[next(iter(self._aliases))]
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "aliases": len(self._aliases),
+            "points": len(self._points),
+            "locations": len(self._records),
+            "lookups": self.lookups,
+            "resolved": self.resolved,
+        }
+
+    def save(self) -> None:
+        """Persist learned aliases and locations"""
+        if not self.path:
+            return
+        self._ensure_loaded()
+        tmp_path = f"{self.path}.tmp"
+        try:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump({"aliases": self._aliases, "points": self._points, "locations": self._records}, f, separators=(",", ":"))
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            logger.error(f"Failed to write location index {self.path}: {e}")
+
+    def _ensure_loaded(self) -> None:
+        if self._loaded:
+            return
+        self._loaded = True
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable location index {self.path}: {e}")
+            return
+        self._records.update(data.get("locations", {}))
+        for key, canonical in data.get("aliases", {}).items():
+            self._aliases.setdefault(key, canonical)
+        for point, canonical in data.get("points", {}).items():
+            self._points.setdefault(point, canonical)
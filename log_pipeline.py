@@ -0,0 +1,279 @@
+#!/usr/bin/env python3
+"""
+Queue-based logging and structured per-request records
+Log calls only put the record on a bounded in-memory queue; a listener
+thread formats and writes them in batches, so request handling never waits
+on stderr. A full queue drops records (and counts them) instead of blocking.
+
+Each HTTP request or tool call collects one access record (tool, location
+key, cache results, upstream time, status, duration) that is written when
+it finishes; successful, fast requests can be sampled.
+
+Only the standard library is used so the module can be imported early.
+"""
+
+import atexit
+import contextvars
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import sys
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional
+
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+# "text" (level:logger:message, key=value for access records) or "json"
+LOG_FORMAT = os.getenv("LOG_FORMAT", "text").lower()
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+# Lines per write, and the longest a line waits for its batch to fill
+LOG_BATCH_SIZE = int(os.getenv("LOG_BATCH_SIZE", "64"))
+LOG_FLUSH_SECONDS = float(os.getenv("LOG_FLUSH_SECONDS", "0.5"))
+# Share of successful, fast requests whose access record is written
+ACCESS_LOG_SAMPLE_RATE = float(os.getenv("ACCESS_LOG_SAMPLE_RATE", "1.0"))
+# Requests slower than this are always written
+ACCESS_LOG_SLOW_MS = float(os.getenv("ACCESS_LOG_SLOW_MS", "1000"))
+
+access_logger = logging.getLogger("access")
+
+_current: contextvars.ContextVar[Optional[Dict[str, Any]]] = contextvars.ContextVar("access_record", default=None)
+_counters = {"dropped": 0, "sampled_out": 0, "access_records": 0, "batches": 0, "lines": 0}
+_listener: Optional["BatchingQueueListener"] = None
+
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that never blocks and defers formatting to the listener"""
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Records stay in this process, so only the arguments are merged
+        # here; formatting (and tracebacks) happen on the listener thread
+        if record.args:
+            record.msg = record.getMessage()
+            record.args = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        # SimpleQueue puts are a single C call; the bound is checked here
+        if self.queue.qsize() >= LOG_QUEUE_SIZE:
+            _counters["dropped"] += 1
+            return
+        self.queue.put_nowait(record)
+
+
+class BatchingStreamHandler(logging.StreamHandler):
+    """Buffers formatted lines and writes them to the stream in one call"""
+
+    def __init__(self, stream=None, batch_size: int = LOG_BATCH_SIZE):
+        super().__init__(stream)
+        self.batch_size = batch_size
+        self._lines: List[str] = []
+
+    def emit(self, record: logging.LogRecord) -> None:
+        try:
+            self._lines.append(self.format(record))
+        except Exception:
+            self.handleError(record)
+            return
+        if len(self._lines) >= self.batch_size:
+            self.flush()
+
+    def flush(self) -> None:
+        if not self._lines:
+            return
+        lines, self._lines = self._lines, []
+        try:
+            self.stream.write("\n".join(lines) + "\n")
+            self.stream.flush()
+        except (OSError, ValueError):
+            return
+        _counters["batches"] += 1
+        _counters["lines"] += len(lines)
+
+
+class BatchingQueueListener(logging.handlers.QueueListener):
+    """QueueListener that flushes its handlers whenever the queue goes idle"""
+
+    def __init__(self, log_queue: queue.SimpleQueue, *handlers: logging.Handler, flush_seconds: float = LOG_FLUSH_SECONDS):
+        super().__init__(log_queue, *handlers, respect_handler_level=True)
+        self.flush_seconds = flush_seconds
+
+    def dequeue(self, block: bool) -> logging.LogRecord:
+        while True:
+            try:
+                return self.queue.get(block, timeout=self.flush_seconds)
+            except queue.Empty:
+                self.flush()
+
+    def flush(self) -> None:
+        for handler in self.handlers:
+            handler.flush()
+
+    def stop(self) -> None:
+        super().stop()
+        self.flush()
+
+
+class TextFormatter(logging.Formatter):
+    """logging's default layout; access records as key=value pairs"""
+
+    def __init__(self):
+        super().__init__(logging.BASIC_FORMAT)
+
+    def format(self, record: logging.LogRecord) -> str:
+        fields = getattr(record, "fields", None)
+        if fields is not None:
+            record.msg = " ".join(f"{k}={_text(v)}" for k, v in fields.items())
+        return super().format(record)
+
+
+class JSONFormatter(logging.Formatter):
+    """One JSON object per line"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry: Dict[str, Any] = {
+            "ts": round(record.created, 3),
+            "level": record.levelname,
+            "logger": record.name,
+        }
+        fields = getattr(record, "fields", None)
+        if fields is not None:
+            entry.update(fields)
+        else:
+            entry["message"] = record.getMessage()
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str, separators=(",", ":"))
+
+
+def _text(value: Any) -> str:
+    if isinstance(value, dict):
+        return ",".join(f"{k}:{v}" for k, v in value.items())
+    return str(value)
+
+
+def configure_logging(level: str = LOG_LEVEL, log_format: str = LOG_FORMAT) -> None:
+    """Route the root logger through the queue (once per process)"""
+    global _listener
+    if _listener is not None:
+        return
+    log_queue: queue.SimpleQueue = queue.SimpleQueue()
+    writer = BatchingStreamHandler(sys.stderr)
+    writer.setFormatter(JSONFormatter() if log_format == "json" else TextFormatter())
+
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(DroppingQueueHandler(log_queue))
+    root.setLevel(level)
+
+    _listener = BatchingQueueListener(log_queue, writer)
+    _listener.start()
+    atexit.register(shutdown)
+
+
+def shutdown() -> None:
+    """Write out everything still queued and stop the listener thread"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+@contextmanager
+def request_record(**fields: Any) -> Iterator[Dict[str, Any]]:
+    """Collect one access record for the enclosed request or tool call.
+
+    Nested calls (a tool call inside an HTTP request) add their fields to
+    the outer record instead of writing one of their own.
+    """
+    record = _current.get()
+    if record is not None:
+        record.update(fields)
+        yield record
+        return
+    record = dict(fields)
+    token = _current.set(record)
+    start = time.perf_counter()
+    try:
+        yield record
+    except BaseException:
+        record.setdefault("status", "error")
+        raise
+    finally:
+        _current.reset(token)
+        record["duration_ms"] = round((time.perf_counter() - start) * 1000, 2)
+        write_access(record)
+
+
+def note(**fields: Any) -> None:
+    """Set fields on the current access record (no-op outside a request)"""
+    record = _current.get()
+    if record is not None:
+        record.update(fields)
+
+
+def note_cache(result: str, location: Optional[str] = None) -> None:
+    """Count a cache result (hit, miss, nearby, unknown) for the current request.
+
+    The first location key looked up is kept as the request's location.
+    """
+    record = _current.get()
+    if record is not None:
+        if location is not None:
+            record.setdefault("location", location)
+        cache = record.setdefault("cache", {})
+        cache[result] = cache.get(result, 0) + 1
+
+
+def note_upstream(seconds: float) -> None:
+    """Add upstream time to the current request"""
+    record = _current.get()
+    if record is not None:
+        record["upstream_ms"] = round(record.get("upstream_ms", 0.0) + seconds * 1000, 2)
+
+
+def write_access(record: Dict[str, Any]) -> None:
+    status = record.get("status")
+    failed = record.get("error") or status == "error" or (isinstance(status, int) and status >= 400)
+    if (
+        not failed
+        and record.get("duration_ms", 0.0) < ACCESS_LOG_SLOW_MS
+        and ACCESS_LOG_SAMPLE_RATE < 1.0
+        and random.random() >= ACCESS_LOG_SAMPLE_RATE
+    ):
+        _counters["sampled_out"] += 1
+        return
+    _counters["access_records"] += 1
+    access_logger.info("access", extra={"fields": record})
+
+
+class AccessLogMiddleware:
+    """ASGI middleware writing one access record per HTTP request"""
+
+    def __init__(self, app, exclude_paths=("/healthz",)):
+        self.app = app
+        self.exclude_paths = set(exclude_paths)
+
+    async def __call__(self, scope, receive, send):
+        if scope.get("type") != "http" or scope.get("path") in self.exclude_paths:
+            await self.app(scope, receive, send)
+            return
+
+        with request_record(method=scope.get("method"), path=scope.get("path")) as record:
+            async def send_wrapper(message):
+                if message["type"] == "http.response.start":
+                    record["status"] = message["status"]
+                await send(message)
+
+            await self.app(scope, receive, send_wrapper)
+
+
+def stats() -> Dict[str, Any]:
+    return {
+        "queued": _listener.queue.qsize() if _listener is not None else 0,
+        "sample_rate": ACCESS_LOG_SAMPLE_RATE,
+        **_counters,
+    }
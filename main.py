@@ -10,18 +10,24 @@ import sys
 # Add current directory to path
 sys.path.insert(0, os.path.dirname(__file__))
 
+# Imported first so import timings cover everything below
+import coldstart
+
 import logging
-logging.basicConfig(level=logging.INFO)
+import log_pipeline
+log_pipeline.configure_logging()
 logger = logging.getLogger(__name__)
 
 # Import app - prefer MCP HTTP/SSE bridge to expose `/mcp` for Agent Builder
 try:
-    from mcp_http_bridge import app
+    with coldstart.timed_import("mcp_http_bridge"):
+        from mcp_http_bridge import app
     logger.info("Using MCP HTTP/SSE bridge (exposes /mcp)")
 except ImportError:
     # Fallback to simple HTTP bridge if MCP bridge not available
     try:
-        from http_bridge import app
+        with coldstart.timed_import("http_bridge"):
+            from http_bridge import app
         logger.info("Using HTTP bridge fallback (no /mcp SSE)")
     except ImportError:
         print("Error: Neither mcp_http_bridge nor http_bridge available", file=sys.stderr)
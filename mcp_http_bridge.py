@@ -8,37 +8,28 @@ import os
 import json
 import asyncio
 import logging
-from typing import Any, Dict
+from typing import Any, Dict, Optional
+
+import log_pipeline
 
 # Configure logging early so it's available for import-time warnings
-logging.basicConfig(level=logging.INFO)
+log_pipeline.configure_logging()
 logger = logging.getLogger(__name__)
 
-from fastapi import FastAPI, Request
+from fastapi import FastAPI, Query, Request
 from fastapi.responses import StreamingResponse, JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
-from mcp.server import Server
-from mcp.server.models import InitializationOptions
-# MCP SSE transport - check if available
-try:
-    from mcp.server.sse import SseServerTransport
-    SSE_AVAILABLE = True
-except ImportError:
-    SSE_AVAILABLE = False
-    logger.warning("MCP SSE transport not available, using REST endpoints only")
-from mcp.types import (
-    CallToolRequest,
-    CallToolResult,
-    ListToolsRequest,
-    ListToolsResult,
-    Tool,
-    TextContent,
-)
+from fastapi.routing import APIRoute
 
-from weather_mcp_server import WeatherMCPServer
+import admission
+import coldstart
+import diagnostics
+from http_responses import CompressionMiddleware
+from weather_mcp_server import SERVER_CAPABILITIES, WeatherMCPServer
 
 # Also import HTTP bridge endpoints for OpenAPI Actions
 try:
+    import http_bridge
     from http_bridge import app as http_app
     # Import the weather endpoints from http_bridge
     HTTP_BRIDGE_AVAILABLE = True
@@ -46,12 +37,40 @@ except ImportError:
     HTTP_BRIDGE_AVAILABLE = False
     logger.warning("HTTP bridge not available")
 
+# MCP SSE transport - imported lazily on the first /mcp connection since the
+# mcp package dominates import time. None means "not attempted yet".
+_sse_transport_cls = None
+SSE_AVAILABLE: Optional[bool] = None
+
+
+def load_sse_transport():
+    """Import SseServerTransport on first use; returns None if unavailable"""
+    global _sse_transport_cls, SSE_AVAILABLE
+    if SSE_AVAILABLE is None:
+        try:
+            from mcp.server.sse import SseServerTransport
+            _sse_transport_cls = SseServerTransport
+            SSE_AVAILABLE = True
+        except ImportError:
+            SSE_AVAILABLE = False
+            logger.warning("MCP SSE transport not available, using REST endpoints only")
+    return _sse_transport_cls
+
+
 app = FastAPI(
     title="Weather MCP Server HTTP Bridge",
     version="1.0.0",
     description="HTTP/SSE bridge for Weather MCP Server to work with OpenAI Agent Builder"
 )
 
+# Admission control for the REST tool routes; the MCP SSE message endpoint
+# is left alone, and shed /mcp/call_tool requests get an error tool result
+app.add_middleware(
+    admission.AdmissionMiddleware,
+    exempt_paths=("/mcp",),
+    tool_result_paths=("/mcp/call_tool",),
+)
+
 # Add CORS
 app.add_middleware(
     CORSMiddleware,
@@ -60,6 +79,11 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(coldstart.FirstResponseTimer)
+app.add_middleware(CompressionMiddleware)
+# The SSE session at /mcp is left out: its tool calls are recorded one by one
+app.add_middleware(log_pipeline.AccessLogMiddleware, exclude_paths=("/healthz", "/mcp"))
+coldstart.install_prebuilt_openapi(app, "mcp_http_bridge")
 
 # Global server instance
 weather_server: WeatherMCPServer = None
@@ -79,12 +103,30 @@ async def startup():
     try:
         api_key = get_api_key()
         weather_server = WeatherMCPServer(api_key)
+        if HTTP_BRIDGE_AVAILABLE:
+            # Share one server (and response cache) with the REST routes
+            http_bridge.set_server(weather_server)
+        if not coldstart.fast_startup_enabled():
+            # Eager mode: build the MCP server (and import mcp) up front
+            weather_server.server
+        if diagnostics.LOOP_MONITOR:
+            diagnostics.monitor.start()
+        coldstart.mark("app_startup")
         logger.info("Weather MCP Server initialized")
     except Exception as e:
         logger.error(f"Failed to initialize server: {e}")
         raise
 
 
+@app.on_event("shutdown")
+async def shutdown():
+    """Persist the warm-start cache snapshot and learned locations"""
+    diagnostics.monitor.stop()
+    if weather_server is not None:
+        weather_server.save_state()
+        await weather_server.providers.close()
+
+
 @app.get("/")
 async def root():
     """Root endpoint"""
@@ -102,6 +144,52 @@ async def healthz():
     return JSONResponse({"status": "ok"})
 
 
+@app.get("/startupz", include_in_schema=False)
+async def startupz():
+    """Import and startup timings for cold-start tracking"""
+    return JSONResponse(coldstart.report())
+
+
+def admin_denied(request: Request) -> Optional[JSONResponse]:
+    """Error response unless the request carries ADMIN_TOKEN (as a bearer
+    token or X-Admin-Token); the endpoints don't exist without a token"""
+    if not diagnostics.ADMIN_TOKEN:
+        return JSONResponse({"error": "Not found"}, status_code=404)
+    authorization = request.headers.get("authorization", "")
+    token = authorization[7:] if authorization.lower().startswith("bearer ") else request.headers.get("x-admin-token")
+    if not diagnostics.check_admin_token(token):
+        return JSONResponse({"error": "Invalid admin token"}, status_code=401)
+    return None
+
+
+@app.get("/admin/profile", include_in_schema=False)
+async def admin_profile(
+    request: Request,
+    seconds: float = Query(5.0, gt=0, le=diagnostics.MAX_PROFILE_SECONDS),
+    mode: str = Query("sample", description="sample (stack sampling) or cprofile"),
+    limit: int = Query(40, ge=1, le=500),
+):
+    """Profile the event loop for a few seconds while it keeps serving"""
+    denied = admin_denied(request)
+    if denied is not None:
+        return denied
+    try:
+        return JSONResponse(await diagnostics.profile(seconds, mode, limit))
+    except ValueError as e:
+        return JSONResponse({"error": str(e)}, status_code=400)
+    except diagnostics.ProfileBusy as e:
+        return JSONResponse({"error": str(e)}, status_code=409)
+
+
+@app.get("/admin/loop", include_in_schema=False)
+async def admin_loop(request: Request):
+    """Event-loop lag percentiles and the stacks of recent stalls"""
+    denied = admin_denied(request)
+    if denied is not None:
+        return denied
+    return JSONResponse(diagnostics.monitor.stats(stacks=True))
+
+
 class MCPASGIApp:
     """ASGI app that exposes the MCP SSE transport at /mcp.
 
@@ -120,7 +208,8 @@ class MCPASGIApp:
             await JSONResponse({"error": "Server not initialized"}, status_code=503)(scope, receive, send)
             return
 
-        if not SSE_AVAILABLE:
+        transport_cls = load_sse_transport()
+        if transport_cls is None:
             await JSONResponse(
                 {"error": "SSE transport not available. Use /mcp/list_tools and /mcp/call_tool endpoints instead."},
                 status_code=501,
@@ -128,9 +217,11 @@ class MCPASGIApp:
             return
 
         try:
-            transport = SseServerTransport(self.transport_path)
+            from mcp.server.models import InitializationOptions
+
+            transport = transport_cls(self.transport_path)
             init_options = InitializationOptions(
-                capabilities={"tools": {}},
+                capabilities=SERVER_CAPABILITIES,
                 server_name="weather-mcp-server",
                 server_version="1.0.0",
             )
@@ -145,19 +236,6 @@ class MCPASGIApp:
             await send({"type": "http.response.body", "body": data, "more_body": False})
 
 
-# Mount the ASGI SSE endpoint at /mcp
-if SSE_AVAILABLE:
-    app.mount("/mcp", MCPASGIApp())
-else:
-    # Keep a plain endpoint to report lack of SSE when not available
-    @app.get("/mcp")
-    async def mcp_not_available():
-        return JSONResponse(
-            {"error": "SSE transport not available. Use /mcp/list_tools and /mcp/call_tool endpoints instead."},
-            status_code=501,
-        )
-
-
 @app.post("/mcp/list_tools")
 async def list_tools():
     """List available tools (REST endpoint for convenience)"""
@@ -169,7 +247,7 @@ async def list_tools():
     
     try:
         # Get tools from the server
-        tools_result = await weather_server.server.list_tools()
+        tools_result = await weather_server.list_tools()
         return JSONResponse({
             "tools": [
                 {
@@ -208,7 +286,7 @@ async def call_tool(request_data: Dict[str, Any]):
             )
         
         # Call the tool
-        result = await weather_server.server.call_tool(tool_name, arguments)
+        result = await weather_server.call_tool(tool_name, arguments)
         
         # Extract text content
         content = []
@@ -232,23 +310,31 @@ async def call_tool(request_data: Dict[str, Any]):
 
 # Include HTTP bridge endpoints for OpenAPI Actions compatibility
 if HTTP_BRIDGE_AVAILABLE:
-    # Mount HTTP bridge routes (but exclude root/healthz to avoid conflicts)
-    from fastapi import APIRouter
-    http_router = APIRouter()
-    
-    # Get routes from http_app that we want to include
+    # Mount HTTP bridge routes (but exclude root/healthz/startupz to avoid conflicts)
+    # Get API routes from http_app that we want to include (its own
+    # docs/openapi routes are skipped, ours are served instead)
     for route in http_app.routes:
-        if hasattr(route, 'path') and route.path not in ['/', '/healthz']:
+        if isinstance(route, APIRoute) and route.path not in ['/', '/healthz', '/startupz']:
             # Add the route to our app
             app.add_api_route(
                 route.path,
                 route.endpoint,
-                methods=route.methods if hasattr(route, 'methods') else ['GET'],
-                name=route.name if hasattr(route, 'name') else None,
-                include_in_schema=True
+                methods=route.methods,
+                name=route.name,
+                summary=route.summary,
+                description=route.description,
+                tags=route.tags,
+                response_description=route.response_description,
+                include_in_schema=route.include_in_schema
             )
 
 
+# Mount the ASGI SSE endpoint at /mcp. This must come after the /mcp/* REST
+# routes, otherwise the mount would shadow them. Whether SSE is actually
+# available is only checked on the first connection.
+app.mount("/mcp", MCPASGIApp())
+
+
 if __name__ == "__main__":
     import uvicorn
     port = int(os.getenv("PORT", 8000))
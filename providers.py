@@ -0,0 +1,550 @@
+#!/usr/bin/env python3
+"""
+Weather data providers
+Every provider answers the same endpoints ("current.json", "forecast.json",
+...) with responses normalized to WeatherAPI.com's schema, which is what the
+cache, the location resolver and the _format_* methods consume. The router
+picks a provider per request from observed latency, error rate and remaining
+quota, and fails over to the next one when a provider errors.
+
+Providers are plain objects with ``name``, ``supports(endpoint, params)``,
+``fetch(endpoint, params)``, ``stats()`` and ``close()``, so tests can pass
+local fakes to ``WeatherMCPServer(providers=[...])``.
+"""
+
+import calendar
+import logging
+import math
+import os
+import time
+from collections import OrderedDict
+from datetime import date, datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+from geo_index import parse_coordinates
+from upstream import UpstreamClient, UpstreamError, UpstreamHTTPError, UpstreamUnavailable
+
+logger = logging.getLogger(__name__)
+
+# Comma-separated providers in order of preference
+WEATHER_PROVIDERS = os.getenv("WEATHER_PROVIDERS", "weatherapi")
+OPEN_METEO_URL = os.getenv("OPEN_METEO_URL", "https://api.open-meteo.com/v1")
+OPEN_METEO_ARCHIVE_URL = os.getenv("OPEN_METEO_ARCHIVE_URL", "https://archive-api.open-meteo.com/v1")
+OPEN_METEO_GEOCODING_URL = os.getenv("OPEN_METEO_GEOCODING_URL", "https://geocoding-api.open-meteo.com/v1")
+
+# Latency assumed for a provider that has not answered yet
+DEFAULT_LATENCY_SECONDS = 0.3
+# Each later provider in WEATHER_PROVIDERS must be this much faster to win
+ORDER_BIAS = 0.25
+ERROR_PENALTY = 10.0
+# Error rate half-life, so a provider that recovered wins traffic back
+ERROR_DECAY_SECONDS = 60.0
+# Circuit breaker: skip a provider for a while when most recent calls failed
+CIRCUIT_ERROR_RATE = 0.5
+CIRCUIT_MIN_CALLS = 5
+CIRCUIT_OPEN_SECONDS = 30.0
+# A provider without a recent latency sample gets one request routed to it
+# this often, so a faster backup is noticed and a recovered one wins back
+PROBE_INTERVAL_SECONDS = 60.0
+# Below this share of quota left a provider is only used when others are worse
+LOW_QUOTA_FRACTION = 0.1
+
+# WeatherAPI's "No matching location found." error code
+NO_MATCHING_LOCATION = 1006
+
+
+def _quota(env_name: str, default: Optional[int] = None) -> Optional[int]:
+    value = os.getenv(env_name)
+    return int(value) if value else default
+
+
+class WeatherAPIProvider:
+    """WeatherAPI.com - the native schema, passed through unchanged"""
+
+    name = "weatherapi"
+    endpoints = {"current.json", "forecast.json", "history.json", "search.json", "astronomy.json", "alerts.json"}
+
+    def __init__(self, api_key: str, base_url: str = "http://api.weatherapi.com/v1",
+                 daily_quota: Optional[int] = None):
+        self.api_key = api_key
+        self.client = UpstreamClient(base_url)
+        self.daily_quota = daily_quota
+
+    def supports(self, endpoint: str, params: Dict[str, Any]) -> bool:
+        return endpoint in self.endpoints
+
+    async def fetch(self, endpoint: str, params: Dict[str, Any]) -> Any:
+        return await self.client.get(endpoint, {**params, "key": self.api_key})
+
+    def stats(self) -> Dict[str, Any]:
+        return self.client.stats()
+
+    async def close(self) -> None:
+        await self.client.close()
+
+
+# WMO weather interpretation code -> (text, closest WeatherAPI condition code)
+WMO_CONDITIONS = {
+    0: ("Clear sky", 1000), 1: ("Mainly clear", 1003), 2: ("Partly cloudy", 1003), 3: ("Overcast", 1009),
+    45: ("Fog", 1135), 48: ("Depositing rime fog", 1147),
+    51: ("Light drizzle", 1153), 53: ("Moderate drizzle", 1153), 55: ("Dense drizzle", 1153),
+    56: ("Light freezing drizzle", 1168), 57: ("Dense freezing drizzle", 1171),
+    61: ("Slight rain", 1183), 63: ("Moderate rain", 1189), 65: ("Heavy rain", 1195),
+    66: ("Light freezing rain", 1198), 67: ("Heavy freezing rain", 1201),
+    71: ("Slight snow fall", 1213), 73: ("Moderate snow fall", 1219), 75: ("Heavy snow fall", 1225),
+    77: ("Snow grains", 1237),
+    80: ("Slight rain showers", 1240), 81: ("Moderate rain showers", 1243), 82: ("Violent rain showers", 1246),
+    85: ("Slight snow showers", 1255), 86: ("Heavy snow showers", 1258),
+    95: ("Thunderstorm", 1276), 96: ("Thunderstorm with slight hail", 1276), 99: ("Thunderstorm with heavy hail", 1276),
+}
+
+COMPASS_POINTS = ("N", "NNE", "NE", "ENE", "E", "ESE", "SE", "SSE",
+                  "S", "SSW", "SW", "WSW", "W", "WNW", "NW", "NNW")
+
+HOURLY_FIELDS = (
+    "temperature_2m,apparent_temperature,relative_humidity_2m,dew_point_2m,precipitation,"
+    "precipitation_probability,snowfall,weather_code,cloud_cover,pressure_msl,visibility,"
+    "wind_speed_10m,wind_direction_10m,wind_gusts_10m,uv_index,is_day"
+)
+DAILY_FIELDS = (
+    "weather_code,temperature_2m_max,temperature_2m_min,precipitation_sum,snowfall_sum,"
+    "precipitation_probability_max,wind_speed_10m_max,uv_index_max,sunrise,sunset"
+)
+CURRENT_FIELDS = (
+    "temperature_2m,apparent_temperature,relative_humidity_2m,precipitation,weather_code,cloud_cover,"
+    "pressure_msl,visibility,wind_speed_10m,wind_direction_10m,wind_gusts_10m,uv_index,is_day"
+)
+
+# Geocoded free-text queries kept per provider
+MAX_GEOCODED = 1000
+
+
+def _round(value: Optional[float], digits: int = 1) -> Optional[float]:
+    return None if value is None else round(value, digits)
+
+
+def _c_to_f(value: Optional[float]) -> Optional[float]:
+    return None if value is None else round(value * 9 / 5 + 32, 1)
+
+
+def _kph_to_mph(value: Optional[float]) -> Optional[float]:
+    return None if value is None else round(value / 1.609344, 1)
+
+
+def _mm_to_in(value: Optional[float]) -> Optional[float]:
+    return None if value is None else round(value / 25.4, 2)
+
+
+def _mb_to_in(value: Optional[float]) -> Optional[float]:
+    return None if value is None else round(value * 0.02953, 2)
+
+
+def _m_to_km(value: Optional[float]) -> Optional[float]:
+    return None if value is None else round(value / 1000, 1)
+
+
+def _km_to_miles(value: Optional[float]) -> Optional[float]:
+    return None if value is None else round(value / 1.609344, 1)
+
+
+def _compass(degrees: Optional[float]) -> Optional[str]:
+    return None if degrees is None else COMPASS_POINTS[int((degrees % 360) / 22.5 + 0.5) % 16]
+
+
+def _condition(code: Optional[int]) -> Dict[str, Any]:
+    text, api_code = WMO_CONDITIONS.get(code, ("Unknown", None))
+    return {"text": text, "icon": None, "code": api_code}
+
+
+def _local_time(iso: Optional[str]) -> Optional[str]:
+    """"2026-10-19T10:00" -> "2026-10-19 10:00" (WeatherAPI's format)"""
+    return None if iso is None else iso.replace("T", " ")
+
+
+def _now_at(data: Dict[str, Any]) -> str:
+    """Current local time at a response's location, from its UTC offset"""
+    offset = data.get("utc_offset_seconds") or 0
+    return (datetime.now(timezone.utc) + timedelta(seconds=offset)).strftime("%Y-%m-%dT%H:%M")
+
+
+def _clock(iso: Optional[str]) -> Optional[str]:
+    """"2026-10-19T07:31" -> "07:31 AM" (WeatherAPI's astro format)"""
+    if not iso:
+        return None
+    return datetime.fromisoformat(iso).strftime("%I:%M %p")
+
+
+def _mean(values: List[Optional[float]]) -> Optional[float]:
+    present = [v for v in values if v is not None]
+    return round(sum(present) / len(present), 1) if present else None
+
+
+class OpenMeteoProvider:
+    """Open-Meteo (no API key), normalized to WeatherAPI's schema.
+
+    Free-text locations are geocoded first; air quality, alerts and
+    astronomy requests are left to other providers.
+    """
+
+    name = "open-meteo"
+    endpoints = {"current.json", "forecast.json", "history.json", "search.json"}
+
+    def __init__(self, base_url: str = OPEN_METEO_URL, archive_url: str = OPEN_METEO_ARCHIVE_URL,
+                 geocoding_url: str = OPEN_METEO_GEOCODING_URL, daily_quota: Optional[int] = None):
+        self.forecast_client = UpstreamClient(base_url)
+        self.archive_client = UpstreamClient(archive_url)
+        self.geocoding_client = UpstreamClient(geocoding_url)
+        self.daily_quota = daily_quota
+        self._geocoded: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+
+    def supports(self, endpoint: str, params: Dict[str, Any]) -> bool:
+        return endpoint in self.endpoints and params.get("aqi") != "yes" and params.get("alerts") != "yes"
+
+    async def fetch(self, endpoint: str, params: Dict[str, Any]) -> Any:
+        if endpoint == "search.json":
+            results = await self._geocode(params["q"], count=10)
+            return [self._search_result(result) for result in results]
+
+        place = await self._place(params["q"])
+        query = {
+            "latitude": place["lat"],
+            "longitude": place["lon"],
+            "timezone": "auto",
+            "hourly": HOURLY_FIELDS,
+            "daily": DAILY_FIELDS,
+        }
+        if endpoint == "current.json":
+            data = await self.forecast_client.get(
+                "forecast", {"latitude": place["lat"], "longitude": place["lon"], "timezone": "auto",
+                             "current": CURRENT_FIELDS, "forecast_days": 1}
+            )
+            return {"location": self._location(place, data, data.get("current", {}).get("time")),
+                    "current": self._current(data.get("current", {}))}
+        if endpoint == "forecast.json":
+            data = await self.forecast_client.get("forecast", {**query, "forecast_days": int(params.get("days", 3))})
+        else:
+            data = await self.archive_client.get(
+                "archive", {**query, "start_date": params["dt"], "end_date": params.get("end_dt", params["dt"])}
+            )
+        return {"location": self._location(place, data, _now_at(data)), "forecast": {"forecastday": self._days(data)}}
+
+    async def _place(self, query: str) -> Dict[str, Any]:
+        coordinates = parse_coordinates(query)
+        if coordinates is not None:
+            # No reverse geocoding: the caller fills in known place names
+            return {"name": None, "region": None, "country": None, "lat": coordinates[0], "lon": coordinates[1]}
+        results = await self._geocode(query, count=1)
+        if not results:
+            raise UpstreamHTTPError(400, "No matching location found.", NO_MATCHING_LOCATION)
+        return self._search_result(results[0])
+
+    async def _geocode(self, query: str, count: int) -> List[Dict[str, Any]]:
+        key = f"{count}:{query.strip().lower()}"
+        cached = self._geocoded.get(key)
+        if cached is not None:
+            self._geocoded.move_to_end(key)
+            return cached
+        # Open-Meteo matches on the place name only, so "London, UK" -> "London"
+        name = query.split(",")[0].strip()
+        data = await self.geocoding_client.get("search", {"name": name, "count": count, "format": "json"})
+        results = data.get("results") or []
+        self._geocoded[key] = results
+        if len(self._geocoded) > MAX_GEOCODED:
+            self._geocoded.popitem(last=False)
+        return results
+
+    @staticmethod
+    def _search_result(result: Dict[str, Any]) -> Dict[str, Any]:
+        if "latitude" not in result:
+            return result
+        return {
+            "id": result.get("id"),
+            "name": result.get("name"),
+            "region": result.get("admin1") or "",
+            "country": result.get("country") or "",
+            "lat": result.get("latitude"),
+            "lon": result.get("longitude"),
+            "url": None,
+            "tz_id": result.get("timezone"),
+        }
+
+    @staticmethod
+    def _location(place: Dict[str, Any], data: Dict[str, Any], local_time: Optional[str]) -> Dict[str, Any]:
+        return {
+            "name": place.get("name"),
+            "region": place.get("region"),
+            "country": place.get("country"),
+            "lat": place.get("lat", data.get("latitude")),
+            "lon": place.get("lon", data.get("longitude")),
+            "tz_id": data.get("timezone") or place.get("tz_id"),
+            "localtime": _local_time(local_time),
+        }
+
+    @staticmethod
+    def _current(current: Dict[str, Any]) -> Dict[str, Any]:
+        visibility_km = _m_to_km(current.get("visibility"))
+        return {
+            "last_updated": _local_time(current.get("time")),
+            "temp_c": current.get("temperature_2m"),
+            "temp_f": _c_to_f(current.get("temperature_2m")),
+            "feelslike_c": current.get("apparent_temperature"),
+            "feelslike_f": _c_to_f(current.get("apparent_temperature")),
+            "is_day": current.get("is_day"),
+            "condition": _condition(current.get("weather_code")),
+            "wind_kph": current.get("wind_speed_10m"),
+            "wind_mph": _kph_to_mph(current.get("wind_speed_10m")),
+            "wind_degree": current.get("wind_direction_10m"),
+            "wind_dir": _compass(current.get("wind_direction_10m")),
+            "gust_kph": current.get("wind_gusts_10m"),
+            "gust_mph": _kph_to_mph(current.get("wind_gusts_10m")),
+            "pressure_mb": current.get("pressure_msl"),
+            "pressure_in": _mb_to_in(current.get("pressure_msl")),
+            "precip_mm": current.get("precipitation"),
+            "precip_in": _mm_to_in(current.get("precipitation")),
+            "humidity": current.get("relative_humidity_2m"),
+            "cloud": current.get("cloud_cover"),
+            "vis_km": visibility_km,
+            "vis_miles": _km_to_miles(visibility_km),
+            "uv": current.get("uv_index"),
+        }
+
+    @classmethod
+    def _days(cls, data: Dict[str, Any]) -> List[Dict[str, Any]]:
+        hourly = data.get("hourly", {})
+        daily = data.get("daily", {})
+
+        def column(block: Dict[str, Any], name: str, i: int) -> Any:
+            values = block.get(name)
+            return values[i] if values and i < len(values) else None
+
+        hours_by_date: Dict[str, List[Dict[str, Any]]] = {}
+        for i, stamp in enumerate(hourly.get("time", [])):
+            hours_by_date.setdefault(stamp[:10], []).append(cls._hour({k: column(hourly, k, i) for k in hourly}))
+
+        days = []
+        for i, day in enumerate(daily.get("time", [])):
+            hours = hours_by_date.get(day, [])
+            max_c, min_c = column(daily, "temperature_2m_max", i), column(daily, "temperature_2m_min", i)
+            avg_c = _mean([h["temp_c"] for h in hours])
+            avg_vis = _mean([h["vis_km"] for h in hours])
+            chance_of_rain = column(daily, "precipitation_probability_max", i)
+            snow_cm = column(daily, "snowfall_sum", i)
+            days.append({
+                "date": day,
+                "date_epoch": calendar.timegm(date.fromisoformat(day).timetuple()),
+                "day": {
+                    "maxtemp_c": max_c, "maxtemp_f": _c_to_f(max_c),
+                    "mintemp_c": min_c, "mintemp_f": _c_to_f(min_c),
+                    "avgtemp_c": avg_c, "avgtemp_f": _c_to_f(avg_c),
+                    "maxwind_kph": column(daily, "wind_speed_10m_max", i),
+                    "maxwind_mph": _kph_to_mph(column(daily, "wind_speed_10m_max", i)),
+                    "totalprecip_mm": column(daily, "precipitation_sum", i),
+                    "totalprecip_in": _mm_to_in(column(daily, "precipitation_sum", i)),
+                    "totalsnow_cm": snow_cm,
+                    "avgvis_km": avg_vis, "avgvis_miles": _km_to_miles(avg_vis),
+                    "avghumidity": _mean([h["humidity"] for h in hours]),
+                    "daily_will_it_rain": int((chance_of_rain or 0) >= 50),
+                    "daily_chance_of_rain": chance_of_rain,
+                    "daily_will_it_snow": int((snow_cm or 0) > 0),
+                    "daily_chance_of_snow": chance_of_rain if (snow_cm or 0) > 0 else 0,
+                    "condition": _condition(column(daily, "weather_code", i)),
+                    "uv": column(daily, "uv_index_max", i),
+                },
+                "astro": {
+                    "sunrise": _clock(column(daily, "sunrise", i)),
+                    "sunset": _clock(column(daily, "sunset", i)),
+                },
+                "hour": hours,
+            })
+        return days
+
+    @staticmethod
+    def _hour(values: Dict[str, Any]) -> Dict[str, Any]:
+        temp_c = values.get("temperature_2m")
+        feels_c = values.get("apparent_temperature")
+        chance = values.get("precipitation_probability")
+        snowing = (values.get("snowfall") or 0) > 0
+        visibility_km = _m_to_km(values.get("visibility"))
+        return {
+            "time": _local_time(values.get("time")),
+            "temp_c": temp_c, "temp_f": _c_to_f(temp_c),
+            "is_day": values.get("is_day"),
+            "condition": _condition(values.get("weather_code")),
+            "wind_kph": values.get("wind_speed_10m"), "wind_mph": _kph_to_mph(values.get("wind_speed_10m")),
+            "wind_degree": values.get("wind_direction_10m"), "wind_dir": _compass(values.get("wind_direction_10m")),
+            "pressure_mb": values.get("pressure_msl"), "pressure_in": _mb_to_in(values.get("pressure_msl")),
+            "precip_mm": values.get("precipitation"), "precip_in": _mm_to_in(values.get("precipitation")),
+            "humidity": values.get("relative_humidity_2m"),
+            "cloud": values.get("cloud_cover"),
+            "feelslike_c": feels_c, "feelslike_f": _c_to_f(feels_c),
+            "dewpoint_c": values.get("dew_point_2m"),
+            "will_it_rain": int((chance or 0) >= 50 and not snowing),
+            "chance_of_rain": chance,
+            "will_it_snow": int(snowing),
+            "chance_of_snow": chance if snowing else 0,
+            "vis_km": visibility_km, "vis_miles": _km_to_miles(visibility_km),
+            "gust_kph": values.get("wind_gusts_10m"), "gust_mph": _kph_to_mph(values.get("wind_gusts_10m")),
+            "uv": _round(values.get("uv_index")),
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "forecast": self.forecast_client.stats(),
+            "archive": self.archive_client.stats(),
+            "geocoding": self.geocoding_client.stats(),
+        }
+
+    async def close(self) -> None:
+        for client in (self.forecast_client, self.archive_client, self.geocoding_client):
+            await client.close()
+
+
+class ProviderHealth:
+    """Observed latency, decaying error rate, circuit state and daily quota use"""
+
+    def __init__(self):
+        self.latency: Optional[float] = None
+        self.error_rate = 0.0
+        self.updated = time.monotonic()
+        self.calls = 0
+        self.failures = 0
+        self.open_until = 0.0
+        self.probed_at = 0.0
+        self.quota_day: Optional[date] = None
+        self.quota_used = 0
+
+    def current_error_rate(self, now: float) -> float:
+        return self.error_rate * math.exp(-(now - self.updated) * math.log(2) / ERROR_DECAY_SECONDS)
+
+    def record(self, ok: bool, elapsed: float) -> None:
+        now = time.monotonic()
+        self.error_rate = 0.8 * self.current_error_rate(now) + (0.0 if ok else 0.2)
+        self.updated = now
+        self.calls += 1
+        if ok:
+            self.latency = elapsed if self.latency is None else self.latency + 0.2 * (elapsed - self.latency)
+        else:
+            self.failures += 1
+            if self.calls >= CIRCUIT_MIN_CALLS and self.error_rate >= CIRCUIT_ERROR_RATE:
+                self.open_until = now + CIRCUIT_OPEN_SECONDS
+
+    def use_quota(self) -> None:
+        today = datetime.now(timezone.utc).date()
+        if self.quota_day != today:
+            self.quota_day, self.quota_used = today, 0
+        self.quota_used += 1
+
+    def quota_left(self, daily_quota: Optional[int]) -> Optional[int]:
+        if daily_quota is None:
+            return None
+        used = self.quota_used if self.quota_day == datetime.now(timezone.utc).date() else 0
+        return max(0, daily_quota - used)
+
+
+class ProviderRouter:
+    """Routes each request to the best-scoring provider, failing over in order.
+
+    Score is smoothed latency, inflated by the (decaying) error rate, by
+    position in the preference list and when quota runs low. Providers with
+    an open circuit or no quota left are only tried when nothing else is.
+    """
+
+    def __init__(self, providers: List[Any]):
+        if not providers:
+            raise ValueError("At least one weather provider is required")
+        self.providers = providers
+        self.health: Dict[str, ProviderHealth] = {provider.name: ProviderHealth() for provider in providers}
+        self.failovers = 0
+        self.probes = 0
+
+    def candidates(self, endpoint: str, params: Dict[str, Any]) -> List[Any]:
+        now = time.monotonic()
+        ranked: List[Tuple[int, float, Any]] = []
+        for index, provider in enumerate(self.providers):
+            if not provider.supports(endpoint, params):
+                continue
+            health = self.health[provider.name]
+            latency = health.latency if health.latency is not None else DEFAULT_LATENCY_SECONDS
+            score = latency * (1 + ERROR_PENALTY * health.current_error_rate(now)) * (1 + ORDER_BIAS * index)
+            daily_quota = getattr(provider, "daily_quota", None)
+            left = health.quota_left(daily_quota)
+            if left is not None and left < daily_quota * LOW_QUOTA_FRACTION:
+                score *= 4
+            unavailable = int(health.open_until > now or left == 0)
+            ranked.append((unavailable, score, provider))
+        ranked.sort(key=lambda item: (item[0], item[1]))
+        providers = [provider for _, _, provider in ranked]
+        for position, (unavailable, _, provider) in enumerate(ranked[1:], start=1):
+            health = self.health[provider.name]
+            stale = health.latency is None or now - health.updated > PROBE_INTERVAL_SECONDS
+            if not unavailable and stale and now - health.probed_at > PROBE_INTERVAL_SECONDS:
+                health.probed_at = now
+                self.probes += 1
+                providers.insert(0, providers.pop(position))
+                break
+        return providers
+
+    async def fetch(self, endpoint: str, params: Dict[str, Any]) -> Any:
+        """Fetch from the best provider, failing over on provider-side errors"""
+        candidates = self.candidates(endpoint, params)
+        if not candidates:
+            raise UpstreamUnavailable(f"No weather provider supports {endpoint}")
+        last_error: Optional[UpstreamError] = None
+        for attempt, provider in enumerate(candidates):
+            health = self.health[provider.name]
+            if attempt:
+                self.failovers += 1
+                logger.warning(f"Failing over {endpoint} to {provider.name} after: {last_error}")
+            start = time.monotonic()
+            health.use_quota()
+            try:
+                data = await provider.fetch(endpoint, params)
+            except UpstreamHTTPError as e:
+                if 400 <= e.status_code < 500 and e.status_code not in (401, 403, 429):
+                    # The request itself is bad (e.g. unknown location); another
+                    # provider would not do better and this one is healthy
+                    health.record(True, time.monotonic() - start)
+                    raise
+                health.record(False, time.monotonic() - start)
+                last_error = e
+                continue
+            except UpstreamError as e:
+                health.record(False, time.monotonic() - start)
+                last_error = e
+                continue
+            health.record(True, time.monotonic() - start)
+            return data
+        raise last_error
+
+    def stats(self) -> Dict[str, Any]:
+        now = time.monotonic()
+        providers = {}
+        for provider in self.providers:
+            health = self.health[provider.name]
+            providers[provider.name] = {
+                "calls": health.calls,
+                "failures": health.failures,
+                "latency_ms": round(health.latency * 1000, 1) if health.latency is not None else None,
+                "error_rate": round(health.current_error_rate(now), 3),
+                "circuit_open": health.open_until > now,
+                "quota_left": health.quota_left(getattr(provider, "daily_quota", None)),
+                "client": provider.stats(),
+            }
+        return {"failovers": self.failovers, "probes": self.probes, "providers": providers}
+
+    async def close(self) -> None:
+        for provider in self.providers:
+            await provider.close()
+
+
+def default_providers(api_key: str, base_url: str) -> List[Any]:
+    """Providers named in WEATHER_PROVIDERS, in order of preference"""
+    providers: List[Any] = []
+    for name in (part.strip().lower() for part in WEATHER_PROVIDERS.split(",")):
+        if name == "weatherapi":
+            providers.append(WeatherAPIProvider(api_key, base_url, _quota("WEATHERAPI_DAILY_QUOTA")))
+        elif name in ("open-meteo", "openmeteo"):
+            providers.append(OpenMeteoProvider(daily_quota=_quota("OPEN_METEO_DAILY_QUOTA", 10000)))
+        elif name:
+            logger.warning(f"Ignoring unknown weather provider: {name}")
+    return providers or [WeatherAPIProvider(api_key, base_url)]
@@ -0,0 +1,406 @@
+#!/usr/bin/env python3
+"""
+Response cache for upstream weather API calls
+TTL cache keyed by endpoint and query parameters, with popularity stats and
+warm-start snapshots that survive restarts and deploys. Entries are
+byte-accounted against a memory budget and evicted by Greedy-Dual-Size-
+Frequency: large, rarely hit entries that are cheap to refetch go first.
+"""
+
+import gzip
+import heapq
+import json
+import logging
+import os
+import sys
+import time
+from collections import Counter
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_VERSION = 2
+
+# How many popularity counters are kept (and written to snapshots)
+MAX_POPULARITY_KEYS = 1000
+
+# Memory the cache may hold: bytes ("64MB", "512k", "1048576"), a percentage
+# of the container's memory limit ("25%"), or "0" for no limit
+CACHE_MEMORY_BUDGET = os.getenv("CACHE_MEMORY_BUDGET", "25%")
+CGROUP_MEMORY_LIMIT_PATHS = (
+    "/sys/fs/cgroup/memory.max",                    # cgroup v2
+    "/sys/fs/cgroup/memory/memory.limit_in_bytes",  # cgroup v1
+)
+# cgroup v1 reports "no limit" as a huge page-aligned number
+UNLIMITED_THRESHOLD = 1 << 60
+SIZE_UNITS = {"": 1, "b": 1, "k": 1 << 10, "kb": 1 << 10, "m": 1 << 20, "mb": 1 << 20, "g": 1 << 30, "gb": 1 << 30}
+
+# Refetch cost (seconds of upstream time) assumed when none is known, e.g.
+# for entries restored from a snapshot
+DEFAULT_REFETCH_COST = 0.3
+# Key, entry object and dict slot, on top of the value itself
+ENTRY_OVERHEAD_BYTES = 200
+
+_MISSING = object()
+
+
+def container_memory_limit() -> Optional[int]:
+    """Memory limit of this container (cgroup), else physical memory, in bytes"""
+    for path in CGROUP_MEMORY_LIMIT_PATHS:
+        try:
+            with open(path, encoding="ascii") as f:
+                raw = f.read().strip()
+        except OSError:
+            continue
+        if raw.isdigit() and int(raw) < UNLIMITED_THRESHOLD:
+            return int(raw)
+    try:
+        return os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_PHYS_PAGES")
+    except (AttributeError, ValueError, OSError):
+        return None
+
+
+def parse_memory_budget(spec: str) -> Optional[int]:
+    """Budget in bytes for a CACHE_MEMORY_BUDGET value (None means unlimited)"""
+    spec = spec.strip().lower()
+    if spec.endswith("%"):
+        limit = container_memory_limit()
+        return (int(limit * float(spec[:-1]) / 100) or None) if limit else None
+    number = spec.rstrip("kmgb")
+    unit = spec[len(number):]
+    if unit not in SIZE_UNITS:
+        raise ValueError(f"Invalid memory budget: {spec!r}")
+    return int(float(number) * SIZE_UNITS[unit]) or None
+
+
+class CacheEntry:
+    __slots__ = ("value", "expires_at", "stored_at", "hits", "size", "cost", "priority", "seq")
+
+    def __init__(self, value: Any, expires_at: float, stored_at: float, hits: int = 0,
+                 size: int = 0, cost: float = DEFAULT_REFETCH_COST):
+        self.value = value
+        self.expires_at = expires_at
+        self.stored_at = stored_at
+        self.hits = hits
+        self.size = size
+        self.cost = cost
+        self.priority = 0.0
+        self.seq = 0
+
+
+class SharedValue:
+    """Accounting for one cached value, which may be stored under several keys"""
+
+    __slots__ = ("size", "keys", "expires_at", "attachments")
+
+    def __init__(self, size: int):
+        self.size = size
+        self.keys: Set[str] = set()
+        self.expires_at = 0.0
+        # name -> (data derived from the value, its bytes)
+        self.attachments: Optional[Dict[Any, Tuple[Any, int]]] = None
+
+
+class ResponseCache:
+    """In-memory TTL cache of upstream responses.
+
+    Expiry uses wall-clock time so entries written to a snapshot stay
+    meaningful in the next process. The snapshot is loaded lazily on first
+    access, dropping anything that expired while the server was down.
+
+    Each entry is charged its approximate size (``sizeof``) plus anything
+    attached to its value; a value stored under several keys is charged once. Over budget, the entry with the
+    lowest GDSF priority ``clock + frequency * cost / size`` is evicted and
+    the clock rises to its priority, so entries that stop being hit age out.
+    """
+
+    def __init__(self, snapshot_path: Optional[str] = None,
+                 restore: Optional[Callable[[Any], Any]] = None,
+                 serialize: Optional[Callable[[Any], Any]] = None,
+                 sizeof: Optional[Callable[[Any], int]] = None,
+                 memory_budget: Optional[int] = None):
+        self.snapshot_path = snapshot_path
+        # Converters between cached values and their JSON snapshot form
+        self.restore = restore
+        self.serialize = serialize
+        self.sizeof = sizeof or sys.getsizeof
+        self.memory_budget = memory_budget if memory_budget is not None else parse_memory_budget(CACHE_MEMORY_BUDGET)
+        self._entries: Dict[str, CacheEntry] = {}
+        self._snapshot_loaded = snapshot_path is None
+        self.popularity: Counter = Counter()
+        self.hits = 0
+        self.misses = 0
+        self.restored = 0
+        # GDSF state: lazily invalidated (priority, seq, key) heap and clock
+        self._heap: List[Tuple[float, int, str]] = []
+        self._seq = 0
+        self.clock = 0.0
+        # id(value) -> its bytes, keys and latest expiry, so aliased values
+        # are charged once
+        self._values: Dict[int, SharedValue] = {}
+        self.used_bytes = 0
+        self.evictions = 0
+        self.evicted_bytes = 0
+
+    @staticmethod
+    def make_key(endpoint: str, params: Dict[str, Any]) -> str:
+        """Cache key for an upstream call (the API key is never part of it)"""
+        query = "&".join(f"{k}={params[k]}" for k in sorted(params) if k != "key")
+        return f"{endpoint}?{query}"
+
+    def get(self, key: str) -> Optional[Any]:
+        """Return a still-valid cached value, or None"""
+        self._ensure_loaded()
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        if entry.expires_at <= time.time():
+            self._remove(key)
+            self.misses += 1
+            return None
+        entry.hits += 1
+        self.hits += 1
+        self.popularity[key] += 1
+        self._prioritize(key, entry)
+        return entry.value
+
+    def peek(self, key: str) -> Optional[Any]:
+        """Like get() but without touching hit/miss or popularity counters"""
+        self._ensure_loaded()
+        entry = self._entries.get(key)
+        if entry is None or entry.expires_at <= time.time():
+            return None
+        return entry.value
+
+    def remaining_ttl(self, value: Any) -> Optional[float]:
+        """Seconds until a value handed out by this cache expires (None if it is not cached)"""
+        shared = self._values.get(id(value))
+        if shared is None:
+            return None
+        return max(0.0, shared.expires_at - time.time())
+
+    def attach(self, value: Any, name: Any, data: Any, size: int) -> bool:
+        """Keep data derived from a cached value (e.g. its rendered body) with it.
+
+        The data is charged to the value's bytes and dropped when the value
+        leaves the cache; attaching under the same name again replaces it.
+        Returns False (and keeps nothing) if the value is not cached.
+        """
+        shared = self._values.get(id(value))
+        if shared is None:
+            return False
+        if shared.attachments is None:
+            shared.attachments = {}
+        previous = shared.attachments.get(name)
+        growth = size - (previous[1] if previous is not None else 0)
+        shared.attachments[name] = (data, size)
+        shared.size += growth
+        self.used_bytes += growth
+        for key in shared.keys:
+            entry = self._entries[key]
+            entry.size = shared.size + ENTRY_OVERHEAD_BYTES
+            self._prioritize(key, entry)
+        self._enforce_budget()
+        return True
+
+    def attachment(self, value: Any, name: Any) -> Optional[Any]:
+        """Data attached to a cached value under name, or None"""
+        shared = self._values.get(id(value))
+        if shared is None or shared.attachments is None:
+            return None
+        attached = shared.attachments.get(name)
+        return attached[0] if attached is not None else None
+
+    def set(self, key: str, value: Any, ttl: float, cost: float = DEFAULT_REFETCH_COST) -> None:
+        """Store a value for ttl seconds; cost is what refetching it takes (seconds)"""
+        self._ensure_loaded()
+        now = time.time()
+        self._store(key, CacheEntry(value, now + ttl, now, cost=cost))
+        self.popularity[key] += 1
+        if len(self.popularity) > MAX_POPULARITY_KEYS * 2:
+            self.popularity = Counter(dict(self.popularity.most_common(MAX_POPULARITY_KEYS)))
+        self._enforce_budget()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _store(self, key: str, entry: CacheEntry) -> None:
+        if key in self._entries:
+            self._remove(key)
+        shared = self._values.get(id(entry.value))
+        if shared is None:
+            shared = self._values[id(entry.value)] = SharedValue(self.sizeof(entry.value))
+            self.used_bytes += shared.size
+        shared.keys.add(key)
+        shared.expires_at = max(shared.expires_at, entry.expires_at)
+        entry.size = shared.size + ENTRY_OVERHEAD_BYTES
+        self.used_bytes += ENTRY_OVERHEAD_BYTES
+        self._entries[key] = entry
+        self._prioritize(key, entry)
+
+    def _remove(self, key: str) -> int:
+        """Drop an entry; returns the bytes released"""
+        entry = self._entries.pop(key)
+        released = ENTRY_OVERHEAD_BYTES
+        shared = self._values[id(entry.value)]
+        shared.keys.discard(key)
+        if not shared.keys:
+            del self._values[id(entry.value)]
+            released += shared.size
+        else:
+            # The value is only as fresh as the keys still holding it
+            shared.expires_at = max(self._entries[k].expires_at for k in shared.keys)
+        self.used_bytes -= released
+        return released
+
+    def _prioritize(self, key: str, entry: CacheEntry) -> None:
+        # Size in KiB keeps priorities readable in /cache output
+        entry.priority = self.clock + (entry.hits + 1) * entry.cost * 1024 / entry.size
+        self._seq += 1
+        entry.seq = self._seq
+        heapq.heappush(self._heap, (entry.priority, entry.seq, key))
+        if len(self._heap) > 2 * len(self._entries) + 64:
+            # Drop superseded heap items left behind by hits and removals
+            self._heap = [(e.priority, e.seq, k) for k, e in self._entries.items()]
+            heapq.heapify(self._heap)
+
+    def _enforce_budget(self) -> None:
+        if self.memory_budget is None:
+            return
+        while self.used_bytes > self.memory_budget and self._heap:
+            priority, seq, key = heapq.heappop(self._heap)
+            entry = self._entries.get(key)
+            if entry is None or entry.seq != seq:
+                continue
+            self.clock = priority
+            self.evicted_bytes += self._remove(key)
+            self.evictions += 1
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters, memory use and the most requested keys"""
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            "restored_from_snapshot": self.restored,
+            "memory": self.memory_stats(),
+            "popular": self.popularity.most_common(10),
+        }
+
+    def memory_stats(self) -> Dict[str, Any]:
+        """Byte accounting against the memory budget"""
+        budget = self.memory_budget
+        return {
+            "budget_bytes": budget,
+            "used_bytes": self.used_bytes,
+            "utilization": round(self.used_bytes / budget, 4) if budget else None,
+            "evictions": self.evictions,
+            "evicted_bytes": self.evicted_bytes,
+            "clock": round(self.clock, 6),
+        }
+
+    def describe(self, limit: int = 20) -> Dict[str, Any]:
+        """Memory use per endpoint plus the largest entries and the next eviction candidates"""
+        self._ensure_loaded()
+        by_endpoint: Dict[str, Dict[str, int]] = {}
+        for key, entry in self._entries.items():
+            usage = by_endpoint.setdefault(key.split("?", 1)[0], {"entries": 0, "bytes": 0})
+            usage["entries"] += 1
+            usage["bytes"] += entry.size
+
+        def summary(key: str, entry: CacheEntry) -> Dict[str, Any]:
+            return {
+                "key": key,
+                "bytes": entry.size,
+                "hits": entry.hits,
+                "cost_ms": round(entry.cost * 1000, 1),
+                "priority": round(entry.priority, 6),
+                "expires_in": round(entry.expires_at - time.time(), 1),
+            }
+
+        items = list(self._entries.items())
+        largest = sorted(items, key=lambda item: item[1].size, reverse=True)[:limit]
+        next_evicted = sorted(items, key=lambda item: item[1].priority)[:limit]
+        return {
+            **self.memory_stats(),
+            "entries": len(self._entries),
+            "endpoints": by_endpoint,
+            "largest": [summary(k, e) for k, e in largest],
+            "next_evictions": [summary(k, e) for k, e in next_evicted],
+        }
+
+    def save_snapshot(self) -> int:
+        """Write still-valid entries and popularity stats; returns entries written"""
+        if not self.snapshot_path:
+            return 0
+        self._ensure_loaded()
+        now = time.time()
+        # A value stored under several keys is written once and referenced
+        # by index, so the restored entries share it again
+        values: List[Any] = []
+        indexes: Dict[int, int] = {}
+        entries: List[List[Any]] = []
+        for key, entry in self._entries.items():
+            if entry.expires_at <= now:
+                continue
+            index = indexes.get(id(entry.value))
+            if index is None:
+                index = indexes[id(entry.value)] = len(values)
+                values.append(entry.value)
+            entries.append([key, entry.expires_at, entry.stored_at, entry.hits, index])
+        snapshot = {
+            "version": SNAPSHOT_VERSION,
+            "saved_at": now,
+            "values": values,
+            "entries": entries,
+            "popularity": dict(self.popularity.most_common(MAX_POPULARITY_KEYS)),
+        }
+
+        directory = os.path.dirname(self.snapshot_path)
+        tmp_path = f"{self.snapshot_path}.tmp"
+        try:
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            with gzip.open(tmp_path, "wt", encoding="utf-8", compresslevel=6) as f:
+                json.dump(snapshot, f, separators=(",", ":"), default=self.serialize)
+            os.replace(tmp_path, self.snapshot_path)
+        except OSError as e:
+            logger.error(f"Failed to write cache snapshot {self.snapshot_path}: {e}")
+            return 0
+        logger.info(f"Saved {len(entries)} cache entries to {self.snapshot_path}")
+        return len(entries)
+
+    def _ensure_loaded(self) -> None:
+        if self._snapshot_loaded:
+            return
+        self._snapshot_loaded = True
+        if not os.path.exists(self.snapshot_path):
+            return
+        try:
+            with gzip.open(self.snapshot_path, "rt", encoding="utf-8") as f:
+                snapshot = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable cache snapshot {self.snapshot_path}: {e}")
+            return
+        if snapshot.get("version") != SNAPSHOT_VERSION:
+            return
+
+        now = time.time()
+        values = snapshot.get("values", [])
+        restored: Dict[int, Any] = {}
+        for key, expires_at, stored_at, hits, index in snapshot.get("entries", []):
+            if expires_at > now and key not in self._entries:
+                value = restored.get(index, _MISSING)
+                if value is _MISSING:
+                    value = values[index]
+                    if self.restore is not None:
+                        value = self.restore(value)
+                    restored[index] = value
+                self._store(key, CacheEntry(value, expires_at, stored_at, hits))
+                self.restored += 1
+        self.popularity.update(snapshot.get("popularity", {}))
+        self._enforce_budget()
+        logger.info(f"Restored {self.restored} cache entries from {self.snapshot_path}")
@@ -0,0 +1,208 @@
+#!/usr/bin/env python3
+"""
+Weather change subscriptions
+One background poller per subscribed location and kind (current conditions
+or alerts) fetches at the endpoint's cache TTL and pushes an update to every
+subscriber only when the formatted data changed, so upstream cost grows with
+the number of locations rather than the number of clients.
+"""
+
+import asyncio
+import contextvars
+import logging
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set, Tuple
+from urllib.parse import quote, unquote, urlsplit
+
+logger = logging.getLogger(__name__)
+
+# Subscription kind -> upstream endpoint it polls
+SUBSCRIPTION_ENDPOINTS = {
+    "current": "current.json",
+    "alerts": "alerts.json",
+}
+
+RESOURCE_SCHEME = "weather"
+
+# Retry delay after a failed poll (capped by the endpoint TTL)
+ERROR_RETRY_SECONDS = 60
+
+Fetcher = Callable[[str, str], Awaitable[Dict[str, Any]]]
+Callback = Callable[[Dict[str, Any]], Awaitable[None]]
+
+
+def default_fingerprint(value: Dict[str, Any]) -> Any:
+    """Part of a payload that counts as a change: everything but the location
+    block, whose local time moves on every fetch"""
+    return {k: v for k, v in value.items() if k != "location"}
+
+
+def resource_uri(kind: str, location: str) -> str:
+    """MCP resource URI of a subscription, e.g. weather://current/London"""
+    return f"{RESOURCE_SCHEME}://{kind}/{quote(location, safe='')}"
+
+
+def parse_resource_uri(uri: str) -> Tuple[str, str]:
+    """(kind, location) of a weather:// resource URI"""
+    parts = urlsplit(str(uri))
+    kind = parts.netloc.lower()
+    location = unquote(parts.path.lstrip("/"))
+    if parts.scheme != RESOURCE_SCHEME or kind not in SUBSCRIPTION_ENDPOINTS or not location:
+        raise ValueError(f"Unknown resource: {uri}")
+    return kind, location
+
+
+class Poller:
+    """Polling task and fan-out list for one (kind, location)"""
+
+    def __init__(self, kind: str, location: str, interval: float):
+        self.kind = kind
+        self.location = location
+        self.interval = interval
+        self.keys: List[Tuple[str, str]] = []
+        self.subscribers: List["Subscription"] = []
+        self.latest: Optional[Dict[str, Any]] = None
+        self.fingerprint: Any = None
+        self.task: Optional[asyncio.Task] = None
+
+
+class Subscription:
+    __slots__ = ("poller", "callback")
+
+    def __init__(self, poller: Poller, callback: Callback):
+        self.poller = poller
+        self.callback = callback
+
+
+class SubscriptionHub:
+    """Shares one poller per (kind, canonical location) between subscribers.
+
+    ``fetch(kind, location)`` returns the formatted payload; it goes through
+    the server's response cache, so a poll that lands inside the TTL of a
+    response fetched by a regular request costs nothing upstream. A location
+    typed before it was ever resolved gets its canonical key as an alias
+    after the first poll, so later subscribers join the same poller.
+    """
+
+    def __init__(self, fetch: Fetcher, intervals: Dict[str, float],
+                 canonical: Callable[[str], str] = lambda location: location,
+                 fingerprint: Callable[[Dict[str, Any]], Any] = default_fingerprint):
+        self.fetch = fetch
+        self.intervals = intervals
+        self.canonical = canonical
+        self.fingerprint = fingerprint
+        self._pollers: Dict[Tuple[str, str], Poller] = {}
+        # Strong references to late-joiner deliveries until they finish
+        self._deliveries: Set[asyncio.Task] = set()
+        self.polls = 0
+        self.updates = 0
+        self.errors = 0
+
+    def key(self, kind: str, location: str) -> Tuple[str, str]:
+        if kind not in SUBSCRIPTION_ENDPOINTS:
+            raise ValueError(f"Unknown subscription kind: {kind}")
+        return kind, self.canonical(location)
+
+    def subscribe(self, kind: str, location: str, callback: Callback) -> Subscription:
+        """Register a callback for changes; starts the location's poller if needed"""
+        key = self.key(kind, location)
+        poller = self._pollers.get(key)
+        if poller is None:
+            interval = self.intervals.get(SUBSCRIPTION_ENDPOINTS[kind], 300)
+            poller = Poller(kind, location, interval)
+            self._add_key(poller, key)
+            # A fresh context: the poller outlives the request that started it
+            # and must not add its polls to that request's access record
+            poller.task = asyncio.create_task(self._run(poller), context=contextvars.Context())
+        subscription = Subscription(poller, callback)
+        poller.subscribers.append(subscription)
+        if poller.latest is not None:
+            # Late joiners get the current state straight away
+            task = asyncio.create_task(self._deliver(poller, [subscription], poller.latest))
+            self._deliveries.add(task)
+            task.add_done_callback(self._deliveries.discard)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        """Drop a subscriber; the poller stops with its last subscriber"""
+        poller = subscription.poller
+        if subscription in poller.subscribers:
+            poller.subscribers.remove(subscription)
+        if poller.subscribers or not poller.keys:
+            return
+        for key in poller.keys:
+            if self._pollers.get(key) is poller:
+                del self._pollers[key]
+        poller.keys.clear()
+        if poller.task is not None:
+            poller.task.cancel()
+
+    def _add_key(self, poller: Poller, key: Tuple[str, str]) -> None:
+        if key not in self._pollers:
+            self._pollers[key] = poller
+            poller.keys.append(key)
+
+    def latest(self, kind: str, location: str) -> Optional[Dict[str, Any]]:
+        """Last value seen by an active poller, if any"""
+        poller = self._pollers.get(self.key(kind, location))
+        return poller.latest if poller is not None else None
+
+    def pollers(self) -> List[Poller]:
+        """Every running poller (once, whatever its number of keys)"""
+        return list({id(poller): poller for poller in self._pollers.values()}.values())
+
+    def active(self) -> List[Tuple[str, str]]:
+        """(kind, location) of every running poller"""
+        return [(poller.kind, poller.location) for poller in self.pollers()]
+
+    def close(self) -> None:
+        """Stop all pollers"""
+        for poller in self.pollers():
+            poller.keys.clear()
+            if poller.task is not None:
+                poller.task.cancel()
+        self._pollers.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        pollers = self.pollers()
+        return {
+            "locations": len(pollers),
+            "subscribers": sum(len(p.subscribers) for p in pollers),
+            "polls": self.polls,
+            "updates_pushed": self.updates,
+            "errors": self.errors,
+        }
+
+    async def _run(self, poller: Poller) -> None:
+        while True:
+            delay = poller.interval
+            try:
+                self.polls += 1
+                value = await self.fetch(poller.kind, poller.location)
+                fingerprint = self.fingerprint(value)
+                first = poller.latest is None
+                poller.latest = value
+                if first:
+                    self._add_key(poller, self.key(poller.kind, poller.location))
+                if first or fingerprint != poller.fingerprint:
+                    poller.fingerprint = fingerprint
+                    await self._deliver(poller, list(poller.subscribers), value)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.errors += 1
+                delay = min(delay, ERROR_RETRY_SECONDS)
+                logger.warning(f"Subscription poll failed for {poller.kind} {poller.location}: {e}")
+            await asyncio.sleep(delay)
+
+    async def _deliver(self, poller: Poller, subscribers: List[Subscription], value: Dict[str, Any]) -> None:
+        results = await asyncio.gather(
+            *(subscription.callback(value) for subscription in subscribers),
+            return_exceptions=True,
+        )
+        for subscription, result in zip(subscribers, results):
+            if isinstance(result, Exception):
+                # Closed session or stream: forget the subscriber
+                logger.info(f"Dropping {poller.kind} subscriber for {poller.location}: {result}")
+                self.unsubscribe(subscription)
+            else:
+                self.updates += 1
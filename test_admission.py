@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Tests for admission control
+"""
+
+import asyncio
+import time
+
+import pytest
+
+import admission
+from admission import BACKOFF_RATIO, AdmissionController, Overloaded
+
+
+def fill(controller, slots):
+    for _ in range(slots):
+        controller._admit(0.0)
+
+
+def test_limit_grows_additively_while_requests_queue():
+    async def main():
+        controller = AdmissionController(limit=4, max_queue=8)
+        fill(controller, 4)
+        waiter = asyncio.create_task(controller.acquire(time.monotonic() + 5))
+        await asyncio.sleep(0)
+        controller.release(0.01, ok=True)
+        await waiter
+        return controller
+
+    controller = asyncio.run(main())
+    assert controller.limit == pytest.approx(4.25)
+    assert controller.inflight == 4
+
+
+def test_limit_does_not_grow_without_a_queue():
+    controller = AdmissionController(limit=4)
+    fill(controller, 1)
+    controller.release(0.01, ok=True)
+    assert controller.limit == 4
+
+
+def test_limit_shrinks_multiplicatively_on_failure_down_to_the_minimum():
+    controller = AdmissionController(limit=10, min_limit=4)
+    fill(controller, 1)
+    controller.release(0.01, ok=False)
+    assert controller.limit == pytest.approx(10 * BACKOFF_RATIO)
+    for _ in range(50):
+        fill(controller, 1)
+        controller.release(0.01, ok=False)
+    assert controller.limit == 4
+    assert controller.overruns == 51
+
+
+def test_full_queue_is_rejected_with_429():
+    async def main():
+        controller = AdmissionController(limit=1, max_queue=1, adaptive=False)
+        fill(controller, 1)
+        queued = asyncio.create_task(controller.acquire(time.monotonic() + 5))
+        await asyncio.sleep(0)
+        with pytest.raises(Overloaded) as excinfo:
+            await controller.acquire(time.monotonic() + 5)
+        queued.cancel()
+        return excinfo.value
+
+    error = asyncio.run(main())
+    assert error.status_code == 429 and error.reason == "queue full"
+
+
+def test_slot_granted_as_the_wait_times_out_is_handed_on(monkeypatch):
+    """A waiter granted a slot in the same tick its timer fires must not leak the slot"""
+    controller = AdmissionController(limit=1, max_queue=4, adaptive=False)
+    real_wait_for = asyncio.wait_for
+    raced = []
+
+    async def grant_then_time_out(awaitable, timeout):
+        if raced:
+            return await real_wait_for(awaitable, timeout)
+        raced.append(True)
+        # The running request finishes and the slot goes to this waiter...
+        controller.inflight -= 1
+        controller._wake()
+        awaitable.cancel()
+        # ...but the timeout wins the race
+        raise asyncio.TimeoutError
+
+    monkeypatch.setattr(admission.asyncio, "wait_for", grant_then_time_out)
+
+    async def main():
+        fill(controller, 1)
+        with pytest.raises(Overloaded):
+            await controller.acquire(time.monotonic() + 5)
+        # The slot was returned, so the next request is admitted immediately
+        await asyncio.wait_for(controller.acquire(time.monotonic() + 5), 1)
+
+    asyncio.run(main())
+    assert controller.inflight == 1
+    assert controller.rejected["expired_in_queue"] == 1
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Tests for date-range astronomy through WeatherMCPServer
+"""
+
+import asyncio
+from datetime import date
+
+from location_resolver import LocationResolver
+from response_cache import ResponseCache
+from weather_mcp_server import WeatherMCPServer
+
+
+class StubProvider:
+    """Answers astronomy.json as WeatherAPI would, resolving to a nearby point"""
+
+    name = "stub"
+
+    def __init__(self):
+        self.calls = []
+
+    def supports(self, endpoint, params):
+        return True
+
+    async def fetch(self, endpoint, params):
+        self.calls.append((endpoint, dict(params)))
+        return {
+            "location": {"name": "Westminster", "region": "London", "country": "United Kingdom",
+                         "lat": 51.5, "lon": -0.12, "tz_id": "Europe/London"},
+            "astronomy": {"astro": {"sunrise": "07:27 AM", "sunset": "06:01 PM", "moonrise": "01:12 PM",
+                                    "moonset": "10:40 PM", "moon_phase": "Waxing Crescent", "moon_illumination": 30}},
+        }
+
+    def stats(self):
+        return {}
+
+    async def close(self):
+        pass
+
+
+def make_server():
+    provider = StubProvider()
+    server = WeatherMCPServer("key", cache=ResponseCache(), resolver=LocationResolver(), providers=[provider])
+    return server, provider
+
+
+def test_coordinate_range_is_computed_from_the_query_point():
+    server, provider = make_server()
+    result = asyncio.run(server._compute_astronomy(
+        {"location": "51.5074,-0.1278", "date": "2026-03-01", "end_date": "2026-03-07"}
+    ))
+    days = result["astronomy_days"]
+    assert [d["date"] for d in days] == [date(2026, 3, n).isoformat() for n in range(1, 8)]
+    assert all(d["sunrise"].endswith("AM") and d["sunset"].endswith("PM") for d in days)
+    assert result["location"]["name"] == "Westminster"
+    assert len(provider.calls) == 1
+
+
+def test_named_range_uses_the_resolved_location():
+    server, provider = make_server()
+    result = asyncio.run(server._compute_astronomy(
+        {"location": "London", "date": "2026-06-01", "end_date": "2026-06-03"}
+    ))
+    assert len(result["astronomy_days"]) == 3
+    # The resolver has now learned the location, so the next range is local only
+    asyncio.run(server._compute_astronomy({"location": "London", "date": "2026-07-01", "end_date": "2026-07-02"}))
+    assert len(provider.calls) == 1
+
+
+def test_single_date_coordinate_queries_are_computed_locally_after_the_first():
+    server, provider = make_server()
+    for day in ("2026-03-01", "2026-03-02", "2026-03-03"):
+        result = asyncio.run(server._compute_astronomy({"location": "51.5074,-0.1278", "date": day}))
+        assert result["location"]["name"] == "Westminster"
+    assert len(provider.calls) == 1
+    assert server.astronomy_stats["local"] == 2
+    # Computed for the point asked for, in the zone upstream reported
+    record = server.resolver.lookup("51.5074,-0.1278")
+    assert (record["lat"], record["lon"], record["tz_id"]) == (51.5074, -0.1278, "Europe/London")
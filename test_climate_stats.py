@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+Tests for the historical climate aggregation
+"""
+
+import math
+
+from climate_stats import summarize
+from weather_model import ForecastDay
+
+
+def hour(temp_c, precip_mm=0.0, wind_kph=10.0):
+    feelslike_c = None if temp_c is None else temp_c - 1.0
+    return {"temp_c": temp_c, "feelslike_c": feelslike_c, "precip_mm": precip_mm, "wind_kph": wind_kph,
+            "gust_kph": wind_kph * 1.5, "humidity": 80, "cloud": 50, "uv": 1.0}
+
+
+def day(date, hours, maxtemp_c, mintemp_c, totalprecip_mm):
+    return {"date": date, "day": {"maxtemp_c": maxtemp_c, "mintemp_c": mintemp_c, "totalprecip_mm": totalprecip_mm},
+            "hour": hours}
+
+
+HISTORY = [
+    day("2026-01-01", [hour(-2.0), hour(0.0), hour(4.0, precip_mm=0.5), hour(6.0, wind_kph=45.0)], 6.0, -2.0, 0.5),
+    day("2026-01-02", [hour(8.0), hour(10.0, precip_mm=2.0), hour(26.0), hour(30.0)], 30.0, 8.0, 2.0),
+]
+
+
+def test_summarize_a_fixed_history():
+    stats = summarize(HISTORY)
+    assert stats["period"] == {"start_date": "2026-01-01", "end_date": "2026-01-02", "days": 2, "hours": 8}
+    temperature = stats["temperature_c"]
+    assert temperature["daily_max_mean"] == 18.0
+    assert temperature["daily_min_mean"] == 3.0
+    hourly = temperature["hourly"]
+    assert (hourly["count"], hourly["min"], hourly["max"], hourly["mean"]) == (8, -2.0, 30.0, 10.25)
+    assert hourly["p50"] == 7.0
+    assert stats["precipitation"]["total_mm"] == 2.5
+    assert stats["precipitation"]["wet_days"] == 1
+    assert stats["hours"]["temp_above"] == 2
+    assert stats["hours"]["temp_below"] == 2
+    assert stats["hours"]["wind_above"] == 1
+    assert stats["hours"]["precip_above"] == 2
+
+
+def test_summarize_skips_none_and_nan_gaps():
+    gappy = [
+        day("2026-01-01", [hour(-2.0), hour(None), hour(math.nan), hour(6.0)], 6.0, None, math.nan),
+        day("2026-01-02", [hour(8.0), hour(math.nan), hour(30.0)], math.nan, 8.0, 2.0),
+    ]
+    stats = summarize(gappy)
+    hourly = stats["temperature_c"]["hourly"]
+    assert (hourly["count"], hourly["min"], hourly["max"], hourly["mean"]) == (4, -2.0, 30.0, 10.5)
+    assert stats["temperature_c"]["daily_max_mean"] == 6.0
+    assert stats["temperature_c"]["daily_min_mean"] == 8.0
+    assert stats["precipitation"]["total_mm"] == 2.0
+    assert stats["period"]["hours"] == 4
+
+
+def test_summarize_compact_days_matches_plain_days():
+    gappy = [day("2026-01-01", [hour(1.0), hour(math.nan), hour(3.0)], 3.0, 1.0, 0.0)]
+    assert summarize([ForecastDay(d) for d in gappy]) == summarize(gappy)
+    assert summarize([ForecastDay(d) for d in HISTORY]) == summarize(HISTORY)
+
+
+def test_summarize_empty_history():
+    stats = summarize([])
+    assert stats["period"]["days"] == 0
+    assert stats["temperature_c"]["hourly"] == {"count": 0}
+    assert stats["temperature_c"]["daily_max_mean"] is None
+    assert stats["precipitation"]["max_daily_mm"] is None
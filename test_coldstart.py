@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+"""
+Tests for the startup-optimized mode and the prebuilt OpenAPI documents
+"""
+
+import json
+import os
+import subprocess
+import sys
+
+from fastapi import FastAPI
+
+import coldstart
+from weather_mcp_server import TOOLS
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+
+def run_python(*args, **env):
+    return subprocess.run([sys.executable, *args], cwd=ROOT, env={**os.environ, **env},
+                          capture_output=True, text=True, timeout=120, check=True)
+
+
+def test_importing_the_bridge_does_not_import_mcp():
+    result = run_python("-c", "import sys, mcp_http_bridge; "
+                              "print(sorted(m for m in sys.modules if m == 'mcp' or m.startswith('mcp.')))",
+                        FAST_STARTUP="1")
+    assert result.stdout.strip() == "[]"
+
+
+def test_prebuilt_openapi_documents_cover_every_tool(tmp_path):
+    run_python("build_openapi.py", str(tmp_path))
+    routes = {f"/{tool['name']}" for tool in TOOLS}
+    rest = json.loads((tmp_path / "http_bridge.json").read_text())
+    assert set(rest["paths"]) == routes
+    assert all("post" in rest["paths"][route] for route in routes)
+    bridge = json.loads((tmp_path / "mcp_http_bridge.json").read_text())
+    assert routes <= set(bridge["paths"])
+    assert {"/mcp/list_tools", "/mcp/call_tool"} <= set(bridge["paths"])
+
+
+def test_prebuilt_document_is_served_without_generating(tmp_path, monkeypatch):
+    (tmp_path / "demo.json").write_text(json.dumps({"openapi": "3.1.0", "paths": {"/prebuilt": {}}}))
+    monkeypatch.setattr(coldstart, "OPENAPI_DIR", str(tmp_path))
+    app = FastAPI()
+    coldstart.install_prebuilt_openapi(app, "demo")
+    assert list(app.openapi()["paths"]) == ["/prebuilt"]
+    # Without a prebuilt file the app generates its document as usual
+    other = FastAPI()
+    coldstart.install_prebuilt_openapi(other, "missing")
+    assert other.openapi()["openapi"].startswith("3.")
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Tests for event-loop lag monitoring and profiling
+"""
+
+import asyncio
+import threading
+import time
+
+import pytest
+
+import diagnostics
+from diagnostics import LoopLagMonitor, ProfileBusy, StackSampler, check_admin_token
+
+
+def test_admin_token(monkeypatch):
+    monkeypatch.setattr(diagnostics, "ADMIN_TOKEN", "")
+    assert not check_admin_token("")
+    monkeypatch.setattr(diagnostics, "ADMIN_TOKEN", "s3cret")
+    assert check_admin_token("s3cret")
+    assert not check_admin_token("s3cre")
+    assert not check_admin_token(None)
+
+
+def block_the_loop():
+    time.sleep(0.3)
+
+
+def test_stall_is_captured_with_the_blocking_call_site():
+    monitor = LoopLagMonitor(interval=0.02, stall=0.1)
+
+    async def main():
+        monitor.start()
+        await asyncio.sleep(0.1)
+        block_the_loop()
+        await asyncio.sleep(0.1)
+        monitor.stop()
+
+    asyncio.run(main())
+    stats = monitor.stats(stacks=True)
+    assert stats["stalls"] == 1
+    stall = stats["recent_stalls"][0]
+    assert any("block_the_loop" in line for line in stall["stack"])
+    # Once the loop ticks again the stall records how long it was blocked
+    assert stall["blocked_ms"] >= 250
+    assert stats["max_lag_ms"] >= 250
+    assert not stats["running"]
+
+
+def test_steady_loop_reports_no_stalls():
+    monitor = LoopLagMonitor(interval=0.01, stall=0.2)
+
+    async def main():
+        monitor.start()
+        await asyncio.sleep(0.15)
+        monitor.stop()
+
+    asyncio.run(main())
+    stats = monitor.stats()
+    assert stats["stalls"] == 0
+    assert stats["samples"] >= 5
+    assert "recent_stalls" not in stats
+
+
+def test_sampler_reports_self_and_total_time():
+    done = threading.Event()
+
+    def busy():
+        while not done.is_set():
+            sum(range(1000))
+
+    worker = threading.Thread(target=busy)
+    worker.start()
+    try:
+        sampler = StackSampler(worker.ident, interval=0.002)
+        sampler.run(0.1)
+    finally:
+        done.set()
+        worker.join()
+    report = sampler.report(limit=5)
+    assert report["samples"] > 0
+    assert any(entry["function"].startswith("busy (") for entry in report["total"])
+    assert all(line.rsplit(" ", 1)[1].isdigit() for line in report["collapsed"])
+
+
+def test_only_one_profile_at_a_time():
+    async def main():
+        first = asyncio.create_task(diagnostics.profile(0.2, "cprofile"))
+        await asyncio.sleep(0.05)
+        with pytest.raises(ProfileBusy):
+            await diagnostics.profile(0.1)
+        return await first
+
+    result = asyncio.run(main())
+    assert result["mode"] == "cprofile"
+    with pytest.raises(ValueError, match="mode must be one of"):
+        asyncio.run(diagnostics.profile(0.1, "perf"))
@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""
+Tests for the local search_locations gazetteer
+"""
+
+from gazetteer import MAX_PREFIX_SCAN, MIN_CONFIDENT_RESULTS, Gazetteer
+
+PARIS_TX = {"id": 1, "name": "Paris", "region": "Texas", "country": "United States of America", "lat": 33.66, "lon": -95.56}
+
+
+def test_bare_name_matching_one_record_goes_upstream():
+    gazetteer = Gazetteer()
+    gazetteer.add([PARIS_TX])
+    results, confident = gazetteer.search("Paris")
+    assert [r["region"] for r in results] == ["Texas"]
+    assert not confident
+
+
+def test_fully_qualified_name_is_answered_locally():
+    gazetteer = Gazetteer()
+    gazetteer.add([PARIS_TX])
+    assert gazetteer.search("paris,  TEXAS")[1]
+    assert gazetteer.search("Paris, United States of America")[1]
+    assert not gazetteer.search("Paris, Tex")[1]
+
+
+def test_enough_prefix_matches_are_confident():
+    gazetteer = Gazetteer()
+    gazetteer.add([{"id": n, "name": f"Lon{n}", "country": "X"} for n in range(MIN_CONFIDENT_RESULTS)])
+    results, confident = gazetteer.search("lon")
+    assert len(results) == MIN_CONFIDENT_RESULTS
+    assert confident
+
+
+def test_prefix_scan_stops_at_end_of_run():
+    gazetteer = Gazetteer()
+    gazetteer.add([{"id": 1, "name": "Lima", "country": "Peru"}, {"id": 2, "name": "London", "country": "UK"},
+                   {"id": 3, "name": "Londrina", "country": "Brazil"}, {"id": 4, "name": "Lyon", "country": "France"}])
+    assert [r["name"] for r in gazetteer.search("lond")[0]] == ["London", "Londrina"]
+    assert gazetteer.search("zz")[0] == []
+
+
+def test_bulk_and_incremental_adds_keep_terms_sorted():
+    gazetteer = Gazetteer()
+    gazetteer.add([{"id": n, "name": f"Town{(n * 37) % 100:03d}", "country": "C"} for n in range(100)])
+    gazetteer.add([{"id": 1000, "name": "Aachen", "country": "Germany"}])
+    # Re-adding a known record refreshes it without duplicating terms
+    gazetteer.add([{"id": 1000, "name": "Aachen", "country": "Germany", "lat": 50.77}])
+    assert gazetteer._terms == sorted(gazetteer._terms)
+    assert len(gazetteer) == 101
+    assert gazetteer.search("aachen")[0] == [{"id": 1000, "name": "Aachen", "region": None, "country": "Germany",
+                                             "lat": 50.77, "lon": None, "url": None}]
+
+
+def test_broad_prefix_scans_a_bounded_run():
+    gazetteer = Gazetteer()
+    gazetteer.add([{"id": n, "name": f"A{n:05d}"} for n in range(MAX_PREFIX_SCAN * 3)])
+    results, confident = gazetteer.search("a", limit=5)
+    assert confident and len(results) == 5
+    # Only the first MAX_PREFIX_SCAN terms of the run were scored
+    assert max(r["id"] for r in results) < MAX_PREFIX_SCAN
+
+
+def test_misspelled_names_are_left_to_upstream():
+    gazetteer = Gazetteer()
+    gazetteer.add([{"id": n, "name": "London", "region": f"R{n}", "country": "UK"} for n in range(5)])
+    assert gazetteer.search("Lodnon") == ([], False)
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Tests for the geospatial proximity index
+"""
+
+import time
+
+from geo_index import ProximityIndex, haversine_km, parse_coordinates
+
+VARIANT = "current.json?aqi=no"
+
+
+def test_parse_coordinates():
+    assert parse_coordinates("51.52,-0.11") == (51.52, -0.11)
+    assert parse_coordinates(" -33.87 , 151.21 ") == (-33.87, 151.21)
+    assert parse_coordinates("London") is None
+    assert parse_coordinates("91,0") is None
+    assert parse_coordinates("0,181") is None
+    assert parse_coordinates(None) is None
+
+
+def test_haversine_km_london_to_paris():
+    assert 340 < haversine_km(51.5074, -0.1278, 48.8566, 2.3522) < 345
+
+
+def test_candidate_within_the_radius_is_found():
+    index = ProximityIndex(radius_km=5, max_age=600)
+    index.add(VARIANT, 51.52, -0.11, "current.json?q=london")
+    found = index.candidates(VARIANT, 51.53, -0.12)
+    assert [key for _, key in found] == ["current.json?q=london"]
+    assert found[0][0] < 5
+
+
+def test_candidate_outside_the_radius_is_missed():
+    index = ProximityIndex(radius_km=5, max_age=600)
+    index.add(VARIANT, 51.52, -0.11, "current.json?q=london")
+    # About 5.6 km north: in a neighbouring cell, but too far
+    assert index.candidates(VARIANT, 51.57, -0.11) == []
+
+
+def test_candidate_across_a_cell_boundary_is_found():
+    index = ProximityIndex(radius_km=5, max_age=600)
+    edge = 1000 * index.cell_deg
+    index.add(VARIANT, edge - 0.001, 10.0, "south")
+    index.add(VARIANT, edge - 0.01, edge - 0.001, "west")
+    assert index._cell(edge - 0.001, 10.0)[1] != index._cell(edge + 0.001, 10.0)[1]
+    assert index._cell(edge - 0.01, edge - 0.001)[0] != index._cell(edge - 0.01, edge + 0.001)[0]
+    assert [key for _, key in index.candidates(VARIANT, edge + 0.001, 10.0)] == ["south"]
+    assert [key for _, key in index.candidates(VARIANT, edge - 0.01, edge + 0.001)] == ["west"]
+
+
+def test_candidates_near_the_pole_scan_enough_longitude_cells():
+    index = ProximityIndex(radius_km=5, max_age=600)
+    # At 80°N a 4 km step east crosses several radius-wide longitude cells
+    index.add(VARIANT, 80.0, 20.0, "svalbard")
+    assert [key for _, key in index.candidates(VARIANT, 80.0, 20.2)] == ["svalbard"]
+
+
+def test_candidates_are_nearest_first():
+    index = ProximityIndex(radius_km=10, max_age=600)
+    index.add(VARIANT, 51.56, -0.11, "far")
+    index.add(VARIANT, 51.521, -0.11, "near")
+    assert [key for _, key in index.candidates(VARIANT, 51.52, -0.11)] == ["near", "far"]
+
+
+def test_candidates_are_separated_by_variant():
+    index = ProximityIndex(radius_km=5, max_age=600)
+    index.add("forecast.json?days=3", 51.52, -0.11, "three-day")
+    assert index.candidates("forecast.json?days=7", 51.52, -0.11) == []
+
+
+def test_old_points_are_not_candidates(monkeypatch):
+    index = ProximityIndex(radius_km=5, max_age=600)
+    added = time.time()
+    monkeypatch.setattr(time, "time", lambda: added)
+    index.add(VARIANT, 51.52, -0.11, "current.json?q=london")
+    monkeypatch.setattr(time, "time", lambda: added + 601)
+    assert index.candidates(VARIANT, 51.52, -0.11) == []
+
+
+def test_disabled_index_stores_nothing():
+    index = ProximityIndex(radius_km=0, max_age=600)
+    index.add(VARIANT, 51.52, -0.11, "current.json?q=london")
+    assert not index.enabled
+    assert index.candidates(VARIANT, 51.52, -0.11) == []
+    assert index.stats()["indexed_points"] == 0
+
+
+def test_discard_and_stats():
+    index = ProximityIndex(radius_km=5, max_age=600)
+    index.add(VARIANT, 51.52, -0.11, "current.json?q=london")
+    index.add(VARIANT, 48.86, 2.35, "current.json?q=paris")
+    distance, _ = index.candidates(VARIANT, 51.53, -0.11)[0]
+    index.record_hit(distance)
+    index.candidates(VARIANT, 40.0, 0.0)
+    stats = index.stats()
+    assert stats["indexed_points"] == 2
+    assert stats["coordinate_lookups"] == 2
+    assert stats["hits"] == 1 and stats["hit_ratio"] == 0.5
+    assert stats["avg_hit_distance_km"] == round(distance, 3)
+
+    index.discard("current.json?q=london")
+    assert index.candidates(VARIANT, 51.52, -0.11) == []
+    assert index.stats()["indexed_points"] == 1
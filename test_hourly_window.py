@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Tests for hourly time-window queries
+"""
+
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from hourly_window import MAX_POINTS, format_local_time, local_now, parse_local_time, window
+from weather_model import compact
+
+
+def day(iso, temps):
+    return {
+        "date": iso,
+        "hour": [{"time": f"{iso} {h:02d}:00", "temp_c": float(t), "precip_mm": 0.0, "chance_of_rain": h,
+                  "wind_kph": 10.0, "condition": {"text": "Sunny" if h < 12 else "Cloudy", "icon": "", "code": h}}
+                 for h, t in enumerate(temps)],
+    }
+
+
+DAYS = [day("2026-10-19", range(24)), day("2026-10-20", range(100, 124))]
+FIRST, LAST = parse_local_time("2026-10-19 00:00"), parse_local_time("2026-10-20 23:00")
+
+
+def test_local_time_round_trips():
+    assert format_local_time(parse_local_time("2026-10-19 15:30")) == "2026-10-19 15:30"
+    assert LAST - FIRST == 47 * 3600
+
+
+def test_window_may_start_and_end_on_the_forecast_edges():
+    result = window(DAYS, FIRST, LAST, fields=["temp_c"])
+    points = result["points"]
+    assert len(points) == 48
+    assert points[0] == {"time": "2026-10-19 00:00", "temp_c": 0.0}
+    assert points[-1] == {"time": "2026-10-20 23:00", "temp_c": 123.0}
+    assert not result["interpolated"]
+    # A single instant at the last hour needs no next hour to interpolate with
+    assert window(DAYS, LAST, LAST, fields=["temp_c"])["points"] == [{"time": "2026-10-20 23:00", "temp_c": 123.0}]
+
+
+def test_window_outside_the_forecast_is_rejected():
+    with pytest.raises(ValueError, match="within the forecast"):
+        window(DAYS, FIRST - 60, FIRST + 3600)
+    with pytest.raises(ValueError, match="within the forecast"):
+        window(DAYS, LAST - 3600, LAST + 60)
+    with pytest.raises(ValueError, match="before start"):
+        window(DAYS, FIRST + 3600, FIRST)
+    with pytest.raises(ValueError, match="No hourly forecast"):
+        window([], FIRST, FIRST)
+
+
+def test_single_instant_is_interpolated_between_hours():
+    result = window(DAYS, parse_local_time("2026-10-19 15:30"), parse_local_time("2026-10-19 15:30"))
+    assert result["interpolated"]
+    point = result["points"][0]
+    assert point["temp_c"] == 15.5
+    # Categorical fields take the nearest hour (ties go to the later one)
+    assert point["condition"] == "Cloudy"
+
+
+def test_hours_inside_the_window_and_stepped_points():
+    start, end = parse_local_time("2026-10-19 10:30"), parse_local_time("2026-10-19 13:00")
+    assert [p["time"] for p in window(DAYS, start, end)["points"]] == ["2026-10-19 11:00", "2026-10-19 12:00",
+                                                                       "2026-10-19 13:00"]
+    stepped = window(DAYS, start, end, fields=["temp_c"], step_minutes=30)["points"]
+    assert [p["temp_c"] for p in stepped] == [10.5, 11.0, 11.5, 12.0, 12.5, 13.0]
+    # Crossing midnight interpolates across the day boundary
+    crossing = window(DAYS, parse_local_time("2026-10-19 23:30"), parse_local_time("2026-10-19 23:30"), ["temp_c"])
+    assert crossing["points"][0]["temp_c"] == 61.5
+
+
+def test_point_limit_and_unknown_fields():
+    with pytest.raises(ValueError, match=f"at most {MAX_POINTS}"):
+        window(DAYS, FIRST, LAST, step_minutes=10)
+    with pytest.raises(ValueError, match="Unknown hourly fields: ozone"):
+        window(DAYS, FIRST, LAST, fields=["temp_c", "ozone"])
+
+
+def test_compact_forecast_days_give_the_same_window():
+    compact_days = compact({"forecast": {"forecastday": DAYS}})["forecast"]["forecastday"]
+    start, end = parse_local_time("2026-10-19 22:15"), parse_local_time("2026-10-20 01:45")
+    assert window(compact_days, start, end, step_minutes=15) == window(DAYS, start, end, step_minutes=15)
+
+
+def test_local_now_prefers_the_time_zone_over_a_stale_localtime():
+    stale = {"tz_id": "Asia/Tehran", "localtime": "2020-01-01 00:00"}
+    tehran = datetime.now(timezone.utc) + timedelta(hours=3, minutes=30)
+    assert abs(local_now(stale) - parse_local_time(tehran.strftime("%Y-%m-%d %H:%M"))) <= 60
+    assert local_now({"tz_id": "Nowhere/Nothing", "localtime": "2026-10-19 9:05"}) == parse_local_time(
+        "2026-10-19 09:05")
+    with pytest.raises(ValueError, match="local time is unknown"):
+        local_now({"tz_id": None, "localtime": None})
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Tests for conditional responses and CompressionMiddleware
+"""
+
+import asyncio
+import gzip
+
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+
+from http_responses import CompressionMiddleware, ResponseRenderer, conditional_response
+from response_cache import ResponseCache
+
+
+def run_app(app, sent=None, accept_encoding=b"gzip"):
+    """Drive an ASGI app once through the middleware; returns the messages sent"""
+    sent = [] if sent is None else sent
+    scope = {"type": "http", "path": "/", "headers": [(b"accept-encoding", accept_encoding)]}
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        sent.append(message)
+
+    asyncio.run(CompressionMiddleware(app, minimum_size=10)(scope, receive, send))
+    return sent
+
+
+def test_event_stream_headers_are_not_held_back():
+    seen_before_first_event = []
+
+    async def app(scope, receive, send):
+        await send({"type": "http.response.start", "status": 200,
+                    "headers": [(b"content-type", b"text/event-stream; charset=utf-8")]})
+        # The client must already have the headers while we wait for an event
+        seen_before_first_event.extend(message["type"] for message in sent)
+        await send({"type": "http.response.body", "body": b"data: {}\n\n" * 20, "more_body": True})
+        await send({"type": "http.response.body", "body": b"", "more_body": False})
+
+    sent = []
+    run_app(app, sent)
+    assert seen_before_first_event == ["http.response.start"]
+    assert b"content-encoding" not in dict(sent[0]["headers"])
+    assert sent[1]["body"] == b"data: {}\n\n" * 20
+
+
+def test_complete_json_body_is_compressed():
+    body = b'{"temp_c": 12.0}' * 20
+
+    async def app(scope, receive, send):
+        await send({"type": "http.response.start", "status": 200,
+                    "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())]})
+        await send({"type": "http.response.body", "body": body, "more_body": False})
+
+    sent = run_app(app)
+    headers = dict(sent[0]["headers"])
+    assert headers[b"content-encoding"] == b"gzip"
+    assert gzip.decompress(sent[1]["body"]) == body
+
+
+def conditional_app():
+    """App serving one cached value through the renderer, as the weather routes do"""
+    cache = ResponseCache(memory_budget=1 << 30)
+    renderer = ResponseRenderer()
+    value = {"location": {"name": "London"}, "hours": [{"temp_c": float(n)} for n in range(200)]}
+    cache.set("forecast.json?q=london", value, ttl=600)
+    app = FastAPI()
+
+    @app.get("/forecast")
+    async def forecast(request: Request):
+        data = cache.get("forecast.json?q=london")
+        rendered = renderer.render(cache, "forecast", data, lambda source: source)
+        return conditional_response(request, rendered, cache.remaining_ttl(data))
+
+    return TestClient(app), cache, renderer
+
+
+def test_matching_etag_gets_304_without_a_body():
+    client, _, renderer = conditional_app()
+    first = client.get("/forecast", headers={"Accept-Encoding": "identity"})
+    assert first.status_code == 200
+    etag = first.headers["etag"]
+    again = client.get("/forecast", headers={"Accept-Encoding": "identity", "If-None-Match": etag})
+    assert again.status_code == 304
+    assert again.content == b""
+    assert again.headers["etag"] == etag
+    assert again.headers["cache-control"].startswith("public, max-age=")
+    # The compressed variant's ETag matches too
+    gzipped = client.get("/forecast", headers={"Accept-Encoding": "gzip"})
+    assert gzipped.headers["etag"] != etag
+    assert client.get("/forecast", headers={"Accept-Encoding": "identity",
+                                            "If-None-Match": gzipped.headers["etag"]}).status_code == 304
+    assert (renderer.misses, renderer.hits) == (1, 3)
+
+
+def test_stale_etag_gets_the_full_body():
+    client, _, _ = conditional_app()
+    response = client.get("/forecast", headers={"Accept-Encoding": "identity", "If-None-Match": '"0123abcd"'})
+    assert response.status_code == 200
+    assert response.json()["location"] == {"name": "London"}
+
+
+def test_rendered_bodies_are_charged_to_the_cache_and_evicted_with_it():
+    client, cache, renderer = conditional_app()
+    before = cache.used_bytes
+    client.get("/forecast", headers={"Accept-Encoding": "identity"})
+    rendered = cache.attachment(cache.peek("forecast.json?q=london"), "forecast")
+    assert cache.used_bytes - before == rendered.nbytes()
+    client.get("/forecast", headers={"Accept-Encoding": "gzip"})
+    assert "gzip" in rendered.encodings
+    assert cache.used_bytes - before == rendered.nbytes()
+    # A new value under the key drops the old body with the old value
+    cache.set("forecast.json?q=london", {"location": {"name": "Paris"}}, ttl=600)
+    assert cache.attachment(cache.peek("forecast.json?q=london"), "forecast") is None
+    assert client.get("/forecast").json() == {"location": {"name": "Paris"}}
+    assert renderer.misses == 2
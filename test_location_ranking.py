@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+Tests for multi-location window metrics and ranking
+"""
+
+import pytest
+
+from hourly_window import parse_local_time
+from location_ranking import rank, window_metrics
+
+
+def metrics(precip=0.0, chance=0.0, deviation=0.0, wind=10.0, gust=20.0, uv=3.0):
+    return {"total_precip_mm": precip, "mean_chance_of_rain": chance, "comfort_deviation_c": deviation,
+            "mean_wind_kph": wind, "max_gust_kph": gust, "max_uv": uv}
+
+
+def result(name, **kwargs):
+    return {"location": name, "metrics": metrics(**kwargs)}
+
+
+def test_identical_forecasts_tie_at_the_top():
+    ranked = rank([result("a"), result("b"), result("c")])
+    assert [r["score"] for r in ranked] == [100.0, 100.0, 100.0]
+    assert [r["rank"] for r in ranked] == [1, 1, 1]
+    assert [r["location"] for r in ranked] == ["a", "b", "c"]
+
+
+def test_ties_share_a_rank_and_the_next_rank_is_skipped():
+    ranked = rank([result("wet", precip=5.0), result("dry1"), result("dry2")], ["precipitation"])
+    assert [(r["location"], r["rank"], r["score"]) for r in ranked] == [
+        ("dry1", 1, 100.0), ("dry2", 1, 100.0), ("wet", 3, 0.0)]
+
+
+def test_criteria_are_normalized_and_averaged():
+    ranked = rank([result("windy", wind=40.0), result("wet", precip=2.0)], ["precipitation", "wind"])
+    # Each is worst on one criterion and best on the other
+    assert [r["score"] for r in ranked] == [50.0, 50.0]
+    assert [r["rank"] for r in ranked] == [1, 1]
+    ranked = rank([result("windy", wind=40.0), result("wet", precip=2.0)], ["precipitation"])
+    assert [r["location"] for r in ranked] == ["windy", "wet"]
+    assert [r["rank"] for r in ranked] == [1, 2]
+
+
+def test_chance_of_rain_breaks_ties_between_dry_forecasts():
+    ranked = rank([result("cloudy", chance=60.0), result("clear", chance=5.0)], ["precipitation"])
+    assert [r["location"] for r in ranked] == ["clear", "cloudy"]
+
+
+def test_unknown_criteria_are_rejected():
+    with pytest.raises(ValueError, match="Unknown criteria: sunshine"):
+        rank([result("a")], ["precipitation", "sunshine"])
+
+
+def test_window_metrics_only_count_selected_hours():
+    hours = [{"temp_c": float(h), "precip_mm": 1.0 if h >= 18 else 0.0, "chance_of_rain": 0, "wind_kph": 5.0,
+              "gust_kph": 9.0, "uv": 1.0} for h in range(24)]
+    days = [{"date": "2026-10-19", "hour": hours}]
+    start, end = parse_local_time("2026-10-19 00:00"), parse_local_time("2026-10-19 23:00")
+    daytime = window_metrics(days, start, end, from_hour=9, to_hour=17)
+    assert daytime["hours"] == 9
+    assert daytime["total_precip_mm"] == 0.0
+    assert (daytime["min_temp_c"], daytime["max_temp_c"]) == (9.0, 17.0)
+    assert window_metrics(days, start, end)["total_precip_mm"] == 6.0
+    with pytest.raises(ValueError, match="No forecast hours"):
+        window_metrics(days, start, end, from_hour=5, to_hour=4)
@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Tests for location aliases and the cache keys they produce
+"""
+
+import asyncio
+
+from location_resolver import LocationResolver
+from response_cache import ResponseCache
+from weather_mcp_server import WeatherMCPServer
+
+SPRINGFIELD_IL = {"name": "Springfield", "region": "Illinois", "country": "United States of America",
+                  "lat": 39.8, "lon": -89.64}
+SPRINGFIELD_MO = {"name": "Springfield", "region": "Missouri", "country": "United States of America",
+                  "lat": 37.22, "lon": -93.3}
+
+
+def test_search_only_learns_aliases_that_name_one_location():
+    resolver = LocationResolver()
+    resolver.learn_search([SPRINGFIELD_IL, SPRINGFIELD_MO])
+    assert resolver.canonical("Springfield, United States of America") == "Springfield, United States of America"
+    assert resolver.canonical("springfield, illinois, united states of america") == "39.8000,-89.6400"
+    assert resolver.canonical("Springfield, Missouri, United States of America") == "37.2200,-93.3000"
+
+
+def test_search_drops_an_alias_that_turns_out_ambiguous():
+    resolver = LocationResolver()
+    resolver.learn_search([SPRINGFIELD_IL])
+    assert resolver.canonical("Springfield, United States of America") == "39.8000,-89.6400"
+    resolver.learn_search([SPRINGFIELD_MO])
+    assert resolver.canonical("Springfield, United States of America") == "Springfield, United States of America"
+
+
+class StubProvider:
+    """current.json answering for a fixed place per query"""
+
+    name = "stub"
+
+    def __init__(self, places):
+        self.places = places
+        self.calls = []
+
+    def supports(self, endpoint, params):
+        return True
+
+    async def fetch(self, endpoint, params):
+        self.calls.append(params["q"])
+        place = self.places[params["q"]]
+        return {"location": dict(place, tz_id="America/Chicago"), "current": {"temp_c": place["lat"]}}
+
+    def stats(self):
+        return {}
+
+    async def close(self):
+        pass
+
+
+def test_response_is_cached_under_the_location_upstream_returned():
+    provider = StubProvider({"Springfield": SPRINGFIELD_MO, "39.8,-89.64": SPRINGFIELD_IL})
+    resolver = LocationResolver()
+    server = WeatherMCPServer("key", cache=ResponseCache(), resolver=resolver, providers=[provider])
+    # A stale alias sends "springfield" to Illinois, but upstream answers Missouri
+    resolver.learn("Springfield", SPRINGFIELD_IL)
+    data = asyncio.run(server._make_api_request("current.json", {"q": "Springfield"}))
+    assert data["location"]["region"] == "Missouri"
+    assert server.cache.peek("current.json?q=39.8000,-89.6400") is None
+    assert server.cache.peek("current.json?q=37.2200,-93.3000") is data
+    # The alias now follows upstream, and Illinois' coordinates still get Illinois
+    assert resolver.canonical("Springfield") == "37.2200,-93.3000"
+    illinois = asyncio.run(server._make_api_request("current.json", {"q": "39.8,-89.64"}))
+    assert illinois["location"]["region"] == "Illinois"
+    assert provider.calls == ["Springfield", "39.8,-89.64"]
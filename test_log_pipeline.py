@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Tests for the queued logging pipeline and access records
+"""
+
+import asyncio
+import io
+import logging
+import queue
+
+import pytest
+
+import log_pipeline
+from log_pipeline import BatchingStreamHandler, DroppingQueueHandler, request_record, write_access
+
+
+@pytest.fixture
+def counters(monkeypatch):
+    fresh = dict.fromkeys(log_pipeline._counters, 0)
+    monkeypatch.setattr(log_pipeline, "_counters", fresh)
+    return fresh
+
+
+@pytest.fixture
+def access(caplog):
+    caplog.set_level(logging.INFO, logger="access")
+    return lambda: [record.fields for record in caplog.records if record.name == "access"]
+
+
+def test_sampling_keeps_errors_and_slow_requests(monkeypatch, counters, access):
+    monkeypatch.setattr(log_pipeline, "ACCESS_LOG_SAMPLE_RATE", 0.0)
+    monkeypatch.setattr(log_pipeline, "ACCESS_LOG_SLOW_MS", 1000.0)
+    kept = [
+        {"path": "/a", "status": 500, "duration_ms": 3.0},
+        {"path": "/b", "status": 404, "duration_ms": 3.0},
+        {"tool": "get_current_weather", "status": "error", "duration_ms": 3.0},
+        {"tool": "get_current_weather", "error": "UpstreamTimeout", "duration_ms": 3.0},
+        {"path": "/c", "status": 200, "duration_ms": 1000.0},
+    ]
+    for record in kept + [{"path": "/fast", "status": 200, "duration_ms": 3.0}, {"tool": "t", "duration_ms": 1.0}]:
+        write_access(record)
+    assert access() == kept
+    assert counters["access_records"] == 5
+    assert counters["sampled_out"] == 2
+
+
+def test_full_sample_rate_writes_every_record(monkeypatch, counters, access):
+    monkeypatch.setattr(log_pipeline, "ACCESS_LOG_SAMPLE_RATE", 1.0)
+    write_access({"path": "/fast", "status": 200, "duration_ms": 1.0})
+    assert len(access()) == 1
+    assert counters["sampled_out"] == 0
+
+
+def test_full_queue_drops_and_counts(monkeypatch, counters):
+    monkeypatch.setattr(log_pipeline, "LOG_QUEUE_SIZE", 3)
+    log_queue = queue.SimpleQueue()
+    handler = DroppingQueueHandler(log_queue)
+    logger = logging.getLogger("test_log_pipeline.drops")
+    logger.propagate = False
+    logger.addHandler(handler)
+    try:
+        for n in range(5):
+            logger.warning("line %d", n)
+    finally:
+        logger.removeHandler(handler)
+    assert log_queue.qsize() == 3
+    assert counters["dropped"] == 2
+    # Arguments are merged before queueing; formatting is left to the listener
+    first = log_queue.get_nowait()
+    assert first.msg == "line 0" and first.args is None
+
+
+def test_batching_handler_writes_full_batches(counters):
+    stream = io.StringIO()
+    handler = BatchingStreamHandler(stream, batch_size=2)
+    handler.setFormatter(logging.Formatter("%(message)s"))
+    for n in range(3):
+        handler.emit(logging.makeLogRecord({"msg": f"line {n}"}))
+    assert stream.getvalue() == "line 0\nline 1\n"
+    handler.flush()
+    assert stream.getvalue().endswith("line 2\n")
+    assert (counters["batches"], counters["lines"]) == (2, 3)
+
+
+def test_nested_records_write_once(counters, access):
+    async def tool_call():
+        with request_record(tool="get_current_weather"):
+            log_pipeline.note_cache("miss", "current.json?q=51.52,-0.11")
+            log_pipeline.note_cache("hit", "forecast.json?q=51.52,-0.11")
+            log_pipeline.note_upstream(0.25)
+
+    async def main():
+        with request_record(method="POST", path="/current_weather") as record:
+            await tool_call()
+            record["status"] = 200
+
+    asyncio.run(main())
+    (record,) = access()
+    assert record["tool"] == "get_current_weather" and record["status"] == 200
+    assert record["location"] == "current.json?q=51.52,-0.11"
+    assert record["cache"] == {"miss": 1, "hit": 1}
+    assert record["upstream_ms"] == 250.0
+    assert "duration_ms" in record
+    # Outside a request the note helpers do nothing
+    log_pipeline.note(status=500)
+    assert len(access()) == 1
+
+
+def test_failed_request_is_marked_as_error(monkeypatch, counters, access):
+    monkeypatch.setattr(log_pipeline, "ACCESS_LOG_SAMPLE_RATE", 0.0)
+    with pytest.raises(RuntimeError):
+        with request_record(tool="get_weather_history"):
+            raise RuntimeError("boom")
+    assert access()[0]["status"] == "error"
@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""
+Tests for provider routing and failover
+"""
+
+import asyncio
+import time
+from datetime import datetime, timedelta, timezone
+
+import httpx
+import pytest
+
+from location_resolver import LocationResolver
+from providers import CIRCUIT_MIN_CALLS, OpenMeteoProvider, ProviderRouter
+from response_cache import ResponseCache
+from upstream import UpstreamHTTPError, UpstreamTimeout
+from weather_mcp_server import WeatherMCPServer
+
+
+class StubProvider:
+    def __init__(self, name, failure=None, endpoints=("current.json", "forecast.json")):
+        self.name = name
+        self.failure = failure
+        self.endpoints = endpoints
+        self.calls = 0
+
+    def supports(self, endpoint, params):
+        return endpoint in self.endpoints
+
+    async def fetch(self, endpoint, params):
+        self.calls += 1
+        if self.failure is not None:
+            raise self.failure
+        return {"provider": self.name}
+
+    def stats(self):
+        return {}
+
+    async def close(self):
+        pass
+
+
+def router_for(*providers):
+    """Router whose backups were just probed, so requests follow preference order"""
+    router = ProviderRouter(list(providers))
+    for health in router.health.values():
+        health.probed_at = time.monotonic()
+    return router
+
+
+def fetch(router, endpoint="current.json"):
+    return asyncio.run(router.fetch(endpoint, {"q": "London"}))
+
+
+def test_fails_over_to_the_next_provider_on_upstream_errors():
+    primary = StubProvider("primary", UpstreamTimeout("timed out"))
+    backup = StubProvider("backup")
+    router = router_for(primary, backup)
+    assert fetch(router) == {"provider": "backup"}
+    assert router.failovers == 1
+    assert router.health["primary"].failures == 1
+
+
+def test_fails_over_on_server_errors_but_not_on_bad_requests():
+    router = router_for(StubProvider("primary", UpstreamHTTPError(503, "down")), StubProvider("backup"))
+    assert fetch(router) == {"provider": "backup"}
+
+    backup = StubProvider("backup")
+    router = router_for(StubProvider("primary", UpstreamHTTPError(400, "No matching location", 1006)), backup)
+    with pytest.raises(UpstreamHTTPError):
+        fetch(router)
+    # The request was bad, not the provider: nothing else is tried
+    assert backup.calls == 0
+    assert router.health["primary"].failures == 0
+
+
+def test_raises_the_last_error_when_every_provider_fails():
+    router = router_for(StubProvider("a", UpstreamTimeout("a timed out")),
+                        StubProvider("b", UpstreamHTTPError(502, "bad gateway")))
+    with pytest.raises(UpstreamHTTPError):
+        fetch(router)
+
+
+def test_unsupported_endpoints_skip_the_provider():
+    limited = StubProvider("limited", endpoints=("current.json",))
+    full = StubProvider("full", endpoints=("current.json", "alerts.json"))
+    router = router_for(limited, full)
+    assert fetch(router, "alerts.json") == {"provider": "full"}
+    assert limited.calls == 0
+
+
+def test_open_circuit_moves_traffic_to_the_backup():
+    primary = StubProvider("primary")
+    backup = StubProvider("backup")
+    router = router_for(primary, backup)
+    for _ in range(CIRCUIT_MIN_CALLS):
+        router.health["primary"].record(False, 0.1)
+    assert router.stats()["providers"]["primary"]["circuit_open"]
+    assert fetch(router) == {"provider": "backup"}
+    assert primary.calls == 0
+
+
+def test_unmeasured_providers_are_probed_then_preference_order_wins():
+    primary = StubProvider("primary")
+    backup = StubProvider("backup")
+    router = ProviderRouter([primary, backup])
+    fetch(router)
+    fetch(router)
+    assert (primary.calls, backup.calls) == (1, 1)
+    assert router.probes == 2
+    # Equally fast once measured: the preferred provider wins
+    for health in router.health.values():
+        health.latency = 0.1
+    assert fetch(router) == {"provider": "primary"}
+
+
+def open_meteo_forecast(request):
+    """Open-Meteo /forecast answer for the requested days, starting today at UTC+2"""
+    offset = 2 * 3600
+    today = (datetime.now(timezone.utc) + timedelta(seconds=offset)).date()
+    days = int(request.url.params.get("forecast_days", 3))
+    dates = [(today + timedelta(days=n)).isoformat() for n in range(days)]
+    hours = [f"{d}T{h:02d}:00" for d in dates for h in range(24)]
+    return httpx.Response(200, json={
+        "latitude": 52.52, "longitude": 13.41, "timezone": "Europe/Berlin", "utc_offset_seconds": offset,
+        "hourly": {"time": hours, "temperature_2m": [10.0 + n % 24 for n in range(len(hours))],
+                   "precipitation": [0.0] * len(hours), "precipitation_probability": [10] * len(hours),
+                   "wind_speed_10m": [12.0] * len(hours), "wind_gusts_10m": [20.0] * len(hours),
+                   "uv_index": [1.0] * len(hours), "weather_code": [0] * len(hours)},
+        "daily": {"time": dates, "temperature_2m_max": [20.0] * days, "temperature_2m_min": [5.0] * days,
+                  "weather_code": [0] * days},
+    })
+
+
+def open_meteo_server():
+    provider = OpenMeteoProvider()
+    provider.forecast_client.transport = httpx.MockTransport(open_meteo_forecast)
+    return WeatherMCPServer("key", cache=ResponseCache(), resolver=LocationResolver(), providers=[provider])
+
+
+def test_open_meteo_forecast_has_a_local_time():
+    server = open_meteo_server()
+    data = asyncio.run(server._make_api_request("forecast.json", {"q": "52.52,13.41", "days": 3}))
+    localtime = datetime.strptime(data["location"]["localtime"], "%Y-%m-%d %H:%M")
+    expected = datetime.now(timezone.utc).replace(tzinfo=None) + timedelta(hours=2)
+    assert abs(localtime - expected) < timedelta(minutes=2)
+
+
+def test_hourly_window_and_comparison_default_to_now_through_open_meteo():
+    server = open_meteo_server()
+    window = asyncio.run(server._compute_hourly_window({"location": "52.52,13.41", "hours": 2, "fields": ["temp_c"]}))
+    assert window["location"]["timezone"] == "Europe/Berlin"
+    assert len(window["points"]) >= 2
+    comparison = asyncio.run(server._compute_comparison({"locations": ["52.52,13.41", "48.14,11.58"]}))
+    assert len(comparison["ranking"]) == 2
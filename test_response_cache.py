@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Tests for the in-memory response cache
+"""
+
+import time
+
+from response_cache import ENTRY_OVERHEAD_BYTES, ResponseCache
+
+
+def blob(n, size=1000):
+    """A distinct value of the given size (sizeof=len)"""
+    return bytes([n]) * size
+
+
+def test_remaining_ttl_counts_down_from_when_the_value_was_stored(monkeypatch):
+    cache = ResponseCache()
+    value = {"temp_c": 12.0}
+    stored = time.time()
+    cache.set("current.json?q=london", value, ttl=1800)
+    # 29 minutes later only one minute of freshness is left to hand out
+    monkeypatch.setattr(time, "time", lambda: stored + 29 * 60)
+    assert 59 <= cache.remaining_ttl(cache.get("current.json?q=london")) <= 61
+
+
+def test_remaining_ttl_of_aliased_value_is_its_latest_expiry():
+    cache = ResponseCache()
+    value = {"temp_c": 12.0}
+    cache.set("a", value, ttl=60)
+    cache.set("b", value, ttl=600)
+    assert cache.remaining_ttl(value) > 590
+    assert cache.remaining_ttl({"temp_c": 12.0}) is None
+
+
+def test_remaining_ttl_drops_when_the_longer_lived_alias_goes():
+    cache = ResponseCache()
+    value = {"temp_c": 12.0}
+    cache.set("a", value, ttl=600)
+    cache.set("b", value, ttl=60)
+    cache.set("a", {"temp_c": 13.0}, ttl=600)
+    assert cache.remaining_ttl(value) <= 60
+
+
+def test_aliased_value_is_charged_once():
+    cache = ResponseCache(sizeof=len, memory_budget=1 << 30)
+    value = blob(1)
+    cache.set("a", value, ttl=60)
+    cache.set("b", value, ttl=60)
+    assert cache.used_bytes == 1000 + 2 * ENTRY_OVERHEAD_BYTES
+    cache.set("a", blob(2, 500), ttl=60)
+    assert cache.used_bytes == 1000 + 500 + 2 * ENTRY_OVERHEAD_BYTES
+
+
+def test_budget_evicts_the_least_hit_entry_first():
+    entry = 1000 + ENTRY_OVERHEAD_BYTES
+    cache = ResponseCache(sizeof=len, memory_budget=3 * entry)
+    for n, key in enumerate("abc"):
+        cache.set(key, blob(n), ttl=60)
+    cache.get("a")
+    cache.get("c")
+    cache.set("d", blob(3), ttl=60)
+    # b was never hit, so it goes first
+    assert cache.get("b") is None
+    assert [k for k in "acd" if cache.get(k) is not None] == ["a", "c", "d"]
+    assert cache.used_bytes == 3 * entry <= cache.memory_budget
+    assert (cache.evictions, cache.evicted_bytes) == (1, entry)
+    assert cache.clock > 0
+
+
+def test_budget_evicts_large_cheap_entries_before_small_or_costly_ones():
+    cache = ResponseCache(sizeof=len, memory_budget=8000)
+    cache.set("small", blob(1, 500), ttl=60, cost=0.3)
+    cache.set("costly", blob(2, 3000), ttl=60, cost=3.0)
+    cache.set("large", blob(3, 3000), ttl=60, cost=0.3)
+    cache.set("new", blob(4, 1000), ttl=60, cost=0.3)
+    assert cache.peek("large") is None
+    assert all(cache.peek(key) is not None for key in ("small", "costly", "new"))
+    assert cache.used_bytes == 500 + 3000 + 1000 + 3 * ENTRY_OVERHEAD_BYTES
+    assert cache.memory_stats()["evicted_bytes"] == 3000 + ENTRY_OVERHEAD_BYTES
+
+
+def test_snapshot_restores_aliased_values_shared(tmp_path):
+    path = str(tmp_path / "cache.json.gz")
+    cache = ResponseCache(snapshot_path=path, sizeof=lambda value: 1000)
+    value = {"location": {"name": "London"}, "current": {"temp_c": 12.0}}
+    cache.set("current.json?q=london", value, ttl=600)
+    cache.set("current.json?q=51.52,-0.11", value, ttl=600)
+    assert cache.save_snapshot() == 2
+
+    restored = ResponseCache(snapshot_path=path, sizeof=lambda value: 1000)
+    a = restored.get("current.json?q=london")
+    b = restored.get("current.json?q=51.52,-0.11")
+    assert a == value and a is b
+    assert restored.used_bytes == cache.used_bytes
+
+
+def test_snapshot_round_trip_drops_expired_entries_and_keeps_ttls(tmp_path, monkeypatch):
+    path = str(tmp_path / "cache.json.gz")
+    saved = time.time()
+    monkeypatch.setattr(time, "time", lambda: saved)
+    cache = ResponseCache(snapshot_path=path)
+    cache.set("current.json?q=paris", {"temp_c": 15.0}, ttl=60)
+    cache.set("forecast.json?q=paris&days=3", {"days": 3}, ttl=600)
+    cache.set("astronomy.json?q=paris", {"sunrise": "07:30"}, ttl=0)
+    cache.get("forecast.json?q=paris&days=3")
+    # The already-expired entry is not written at all
+    assert cache.save_snapshot() == 2
+
+    # Two minutes later the 60 s entry has expired while the server was down
+    monkeypatch.setattr(time, "time", lambda: saved + 120)
+    restored = ResponseCache(snapshot_path=path)
+    assert restored.get("current.json?q=paris") is None
+    assert restored.get("astronomy.json?q=paris") is None
+    forecast = restored.get("forecast.json?q=paris&days=3")
+    assert forecast == {"days": 3}
+    assert restored.remaining_ttl(forecast) == 480
+    assert restored.restored == 1
+    assert len(restored) == 1
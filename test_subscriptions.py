@@ -0,0 +1,37 @@
+#!/usr/bin/env python3
+"""
+Tests for the subscription hub
+"""
+
+import asyncio
+
+import log_pipeline
+from subscriptions import SubscriptionHub
+
+
+def test_poller_does_not_write_into_the_subscribing_request_record():
+    async def fetch(kind, location):
+        log_pipeline.note_cache("miss", location)
+        return {"temp_c": 12.0}
+
+    async def main():
+        hub = SubscriptionHub(fetch, {"current.json": 0.01})
+        received = []
+
+        async def callback(value):
+            received.append(value)
+
+        with log_pipeline.request_record(path="/subscribe") as record:
+            hub.subscribe("current", "London", callback)
+        await asyncio.sleep(0.05)
+        # A second subscriber joins after the first value is known
+        hub.subscribe("current", "London", callback)
+        await asyncio.sleep(0.01)
+        hub.close()
+        return record, received, hub
+
+    record, received, hub = asyncio.run(main())
+    assert "cache" not in record
+    assert hub.polls >= 2
+    assert len(received) == 2
+    assert not hub._deliveries
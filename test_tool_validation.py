@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""
+Tests for local tool argument validation
+"""
+
+import pytest
+
+from tool_validation import InvalidArguments, ToolValidator, published_schema
+from weather_mcp_server import PUBLISHED_TOOLS, TOOL_DATE_RANGES, TOOLS
+
+
+@pytest.fixture
+def validator():
+    return ToolValidator(TOOLS, TOOL_DATE_RANGES)
+
+
+def test_history_end_date_may_be_30_days_after_date(validator):
+    validator.validate("get_weather_history", {"location": "London", "date": "2024-01-01", "end_date": "2024-01-31"})
+    with pytest.raises(InvalidArguments, match="at most 30 days after date"):
+        validator.validate("get_weather_history", {"location": "London", "date": "2024-01-01", "end_date": "2024-02-01"})
+
+
+def test_range_limits_count_days_after_the_start(validator):
+    validator.validate("get_weather_statistics",
+                       {"location": "London", "start_date": "2024-01-01", "end_date": "2025-01-01"})
+    validator.validate("get_astronomy_data", {"location": "London", "date": "2025-01-01", "end_date": "2026-01-02"})
+    validator.validate("compare_locations",
+                       {"locations": ["London", "Paris"], "start_date": "2026-10-19", "end_date": "2026-10-29"})
+    with pytest.raises(InvalidArguments):
+        validator.validate("get_weather_statistics",
+                           {"location": "London", "start_date": "2024-01-01", "end_date": "2025-01-02"})
+    with pytest.raises(InvalidArguments):
+        validator.validate("compare_locations",
+                           {"locations": ["London", "Paris"], "start_date": "2026-10-19", "end_date": "2026-10-30"})
+    with pytest.raises(InvalidArguments, match="must not be before"):
+        validator.validate("get_weather_history", {"location": "London", "date": "2024-01-02", "end_date": "2024-01-01"})
+    assert validator.rejected == 3
+
+
+def test_formats_are_checked(validator):
+    with pytest.raises(InvalidArguments, match="Invalid location"):
+        validator.validate("get_current_weather", {"location": "95.0,10.0"})
+    with pytest.raises(InvalidArguments, match="Invalid date"):
+        validator.validate("get_weather_history", {"location": "London", "date": "2024-02-30"})
+    with pytest.raises(InvalidArguments, match="Invalid start"):
+        validator.validate("get_hourly_window", {"location": "London", "start": "2026-10-19 25:00"})
+    with pytest.raises(InvalidArguments, match="Invalid locations"):
+        validator.validate("compare_locations", {"locations": ["London", " "]})
+    validator.validate("get_hourly_window", {"location": "51.5,-0.12", "start": "2026-10-19 15:30", "end": None})
+
+
+def test_published_schemas_only_use_standard_formats():
+    def formats(schema):
+        found = [schema["format"]] if "format" in schema else []
+        for prop in schema.get("properties", {}).values():
+            found += formats(prop)
+        if "items" in schema:
+            found += formats(schema["items"])
+        return found
+
+    assert {f for tool in PUBLISHED_TOOLS for f in formats(tool["inputSchema"])} == {"date"}
+    hourly = next(tool for tool in PUBLISHED_TOOLS if tool["name"] == "get_hourly_window")
+    assert "pattern" in hourly["inputSchema"]["properties"]["start"]
+    # The validator's own copy keeps them
+    assert published_schema({"type": "string", "format": "location"}) == {"type": "string"}
+    assert any("location" in formats(tool["inputSchema"]) for tool in TOOLS)
@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Tests for the upstream client's retries, retry budget and hedging
+"""
+
+import asyncio
+import time
+
+import httpx
+import pytest
+
+from upstream import (
+    HEDGE_MIN_SAMPLES,
+    LatencyTracker,
+    RetryBudget,
+    UpstreamBadResponse,
+    UpstreamClient,
+    UpstreamHTTPError,
+)
+
+OK = {"location": {"name": "London"}, "current": {"temp_c": 12.0}}
+
+
+def client_for(handler, **kwargs) -> UpstreamClient:
+    return UpstreamClient("http://upstream.test", transport=httpx.MockTransport(handler), **kwargs)
+
+
+def test_retries_stop_when_the_budget_is_spent():
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        return httpx.Response(503, json={"error": {"code": 9999, "message": "down"}})
+
+    client = client_for(handler, retries=5)
+    # One token: a single retry, then the budget denies the rest
+    client.budget = RetryBudget(ratio=0.0, min_tokens=1.0)
+    with pytest.raises(UpstreamHTTPError) as excinfo:
+        asyncio.run(client.get("current.json", {"q": "London"}))
+    assert excinfo.value.status_code == 503
+    assert len(calls) == 2
+    assert client.counters["retries"] == 1
+    assert client.counters["retries_denied"] == 1
+
+
+def test_retry_recovers_from_a_transient_503():
+    responses = [httpx.Response(503, text="busy"), httpx.Response(200, json=OK)]
+
+    client = client_for(lambda request: responses.pop(0), retries=2)
+    assert asyncio.run(client.get("current.json", {"q": "London"})) == OK
+    assert client.counters["retries"] == 1
+
+
+def test_non_retryable_error_is_raised_at_once():
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        return httpx.Response(400, json={"error": {"code": 1006, "message": "No matching location found."}})
+
+    client = client_for(handler, retries=2)
+    with pytest.raises(UpstreamHTTPError) as excinfo:
+        asyncio.run(client.get("current.json", {"q": "Nowhere"}))
+    assert excinfo.value.code == 1006
+    assert len(calls) == 1
+
+
+def hedging_client(handler, p95: float) -> UpstreamClient:
+    client = client_for(handler, retries=0, hedging=True)
+    tracker = client.latency.setdefault("current.json", LatencyTracker())
+    for _ in range(HEDGE_MIN_SAMPLES):
+        tracker.add(p95)
+    return client
+
+
+def test_hedge_fires_after_the_p95_delay_and_the_loser_is_cancelled():
+    started = []
+    cancelled = []
+
+    async def handler(request):
+        attempt = len(started)
+        started.append(time.monotonic())
+        if attempt == 0:
+            try:
+                await asyncio.sleep(5)
+            except asyncio.CancelledError:
+                cancelled.append(attempt)
+                raise
+        return httpx.Response(200, json=OK)
+
+    client = hedging_client(handler, p95=0.1)
+
+    async def main():
+        start = time.monotonic()
+        result = await client.get("current.json", {"q": "London"})
+        elapsed = time.monotonic() - start
+        # Let the cancelled attempt unwind
+        await asyncio.sleep(0.01)
+        return result, elapsed
+
+    result, elapsed = asyncio.run(main())
+    assert result == OK
+    assert len(started) == 2
+    assert 0.09 <= started[1] - started[0] < 0.5
+    assert elapsed < 1
+    assert cancelled == [0]
+    assert client.counters["hedges"] == 1 and client.counters["hedge_wins"] == 1
+
+
+def test_no_hedge_when_the_first_attempt_answers_in_time():
+    async def handler(request):
+        await asyncio.sleep(0.01)
+        return httpx.Response(200, json=OK)
+
+    client = hedging_client(handler, p95=0.2)
+    assert asyncio.run(client.get("current.json", {"q": "London"})) == OK
+    assert client.counters["attempts"] == 1
+    assert client.counters["hedges"] == 0
+
+
+def test_non_json_success_body_is_an_upstream_error():
+    client = client_for(lambda request: httpx.Response(200, text="<html>Proxy login</html>"), retries=0)
+    with pytest.raises(UpstreamBadResponse):
+        asyncio.run(client.get("current.json", {"q": "London"}))
+    assert "current.json" not in client.latency
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Tests for the compact in-memory weather model
+"""
+
+import copy
+from array import array
+
+from weather_model import Condition, HourlySeries, WeatherResponse, compact, nbytes, plain
+
+SUNNY = {"text": "Sunny", "icon": "//cdn.weatherapi.com/weather/64x64/day/113.png", "code": 1000}
+
+
+def hour(n, condition=SUNNY):
+    return {"time_epoch": 1760000000 + n * 3600, "time": f"2026-10-19 {n:02d}:00", "temp_c": 10.0 + n / 2,
+            "chance_of_rain": n % 3, "condition": dict(condition)}
+
+
+FORECAST = {
+    "location": {"name": "London", "region": "City of London, Greater London", "country": "United Kingdom",
+                 "lat": 51.52, "lon": -0.11, "tz_id": "Europe/London", "localtime_epoch": 1760860800,
+                 "localtime": "2026-10-19 9:00"},
+    "current": {"temp_c": 12.0, "is_day": 1, "condition": dict(SUNNY), "wind_kph": 11.2, "air_quality": {"pm2_5": 4.1}},
+    "forecast": {"forecastday": [{
+        "date": "2026-10-19",
+        "date_epoch": 1760832000,
+        "day": {"maxtemp_c": 15.1, "mintemp_c": 8.2, "condition": dict(SUNNY)},
+        "astro": {"sunrise": "07:27 AM", "sunset": "06:01 PM"},
+        "hour": [hour(n) for n in range(24)],
+    }]},
+}
+
+
+def test_compact_round_trips_to_the_upstream_json():
+    original = copy.deepcopy(FORECAST)
+    model = compact(FORECAST)
+    assert isinstance(model, WeatherResponse)
+    assert plain(model) == original
+    # Values that are not weather responses are left alone
+    assert compact([1, 2]) == [1, 2]
+
+
+def test_records_read_like_the_upstream_dicts():
+    model = compact(FORECAST)
+    assert model["location"]["name"] == "London"
+    assert model["current"]["condition"] == SUNNY
+    # Unknown upstream keys are kept in the overflow dict
+    assert model["current"]["air_quality"] == {"pm2_5": 4.1}
+    assert "feelslike_c" not in model["current"]
+    assert model["current"].get("feelslike_c") is None
+    assert set(model["location"]) == set(FORECAST["location"])
+
+
+def test_hourly_rows_are_stored_column_wise():
+    hours = compact(FORECAST)["forecast"]["forecastday"][0]["hour"]
+    assert isinstance(hours, HourlySeries)
+    assert len(hours) == 24
+    assert hours[3] == hour(3)
+    assert hours[-1] == hour(23)
+    assert hours[1:3] == [hour(1), hour(2)]
+    temps = hours.column("temp_c")
+    assert isinstance(temps, array) and temps.typecode == "d"
+    assert hours.column("chance_of_rain").typecode == "q"
+    assert hours.column("missing") is None
+    # Every hour shares one condition object
+    conditions = hours.column("condition")
+    assert all(c is conditions[0] for c in conditions)
+    assert conditions[0] is Condition.of(SUNNY)
+
+
+def test_rows_with_differing_keys_are_kept_as_they_are():
+    rows = [hour(0), {"time": "2026-10-19 01:00", "temp_c": 11.0}]
+    series = HourlySeries(rows)
+    assert series.column("temp_c") is None
+    assert list(series) == rows
+
+
+def test_only_strings_from_the_intern_table_are_free():
+    model = compact(FORECAST)
+    name = model.location.name
+    assert nbytes(name) == 0
+    # An equal string that did not come through the model is charged
+    copied = "".join(["Lon", "don"])
+    assert copied == name and copied is not name
+    assert nbytes(copied) > 0
+    assert nbytes({"name": copied}) > nbytes({"name": name})
@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+"""
+Local validation of tool arguments
+Compiles the tools' JSON Schemas (the subset they use: types, arrays with
+item schemas and minItems/maxItems, required, minimum/maximum, minLength,
+enum and the "date", "local-datetime" and "location" formats) into checker
+functions once, plus cross-field date range rules, so malformed calls are
+rejected before they reach the upstream API. "local-datetime" and
+"location" are not standard JSON Schema formats, so published_schema()
+removes them from what list_tools serves.
+"""
+
+import re
+from datetime import date, datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from geo_index import parse_coordinates
+
+# Anything shaped like "lat,lon" is treated as coordinates and range-checked
+# rather than sent upstream as a place name
+COORDINATE_LIKE = re.compile(r"^\s*[-+]?\d+(?:\.\d*)?\s*,\s*[-+]?\d+(?:\.\d*)?\s*$")
+DATE_PATTERN = re.compile(r"^\d{4}-\d{2}-\d{2}$")
+LOCAL_DATETIME_PATTERN = re.compile(r"^\d{4}-\d{2}-\d{2} \d{2}:\d{2}$")
+
+Checker = Callable[[Any], None]
+
+
+class InvalidArguments(ValueError):
+    """Tool arguments that do not satisfy the tool's schema"""
+
+
+def _check_date(value: str) -> None:
+    if not DATE_PATTERN.match(value):
+        raise ValueError("must be a date in YYYY-MM-DD format")
+    try:
+        date.fromisoformat(value)
+    except ValueError:
+        raise ValueError(f"{value} is not a valid date")
+
+
+def _check_local_datetime(value: str) -> None:
+    if not LOCAL_DATETIME_PATTERN.match(value):
+        raise ValueError("must be a local time in YYYY-MM-DD HH:MM format")
+    try:
+        datetime.strptime(value, "%Y-%m-%d %H:%M")
+    except ValueError:
+        raise ValueError(f"{value} is not a valid time")
+
+
+def _check_location(value: str) -> None:
+    if not value.strip():
+        raise ValueError("must not be empty")
+    if COORDINATE_LIKE.match(value) and parse_coordinates(value) is None:
+        raise ValueError("coordinates must be lat,lon with latitude in [-90, 90] and longitude in [-180, 180]")
+
+
+FORMATS: Dict[str, Callable[[str], None]] = {
+    "date": _check_date,
+    "local-datetime": _check_local_datetime,
+    "location": _check_location,
+}
+
+# Formats only these checks understand, and the pattern published in their
+# place (None: nothing is published)
+PRIVATE_FORMATS: Dict[str, Optional[str]] = {
+    "local-datetime": LOCAL_DATETIME_PATTERN.pattern,
+    "location": None,
+}
+
+TYPES: Dict[str, Tuple[type, ...]] = {
+    "string": (str,),
+    "integer": (int,),
+    "number": (int, float),
+    "boolean": (bool,),
+    "array": (list, tuple),
+}
+
+
+def _compile_property(schema: Dict[str, Any]) -> Checker:
+    types = TYPES.get(schema.get("type", ""), (object,))
+    expected = schema.get("type")
+    minimum, maximum = schema.get("minimum"), schema.get("maximum")
+    min_length = schema.get("minLength")
+    min_items, max_items = schema.get("minItems"), schema.get("maxItems")
+    enum = schema.get("enum")
+    fmt = FORMATS.get(schema.get("format", ""))
+    items = _compile_property(schema["items"]) if "items" in schema else None
+
+    def check(value: Any) -> None:
+        # bool is an int subclass but never a valid number here
+        if not isinstance(value, types) or (isinstance(value, bool) and expected != "boolean"):
+            raise ValueError(f"must be of type {expected}")
+        if minimum is not None and value < minimum:
+            raise ValueError(f"must be at least {minimum}")
+        if maximum is not None and value > maximum:
+            raise ValueError(f"must be at most {maximum}")
+        if min_length is not None and len(value) < min_length:
+            raise ValueError(f"must be at least {min_length} characters")
+        if min_items is not None and len(value) < min_items:
+            raise ValueError(f"must have at least {min_items} items")
+        if max_items is not None and len(value) > max_items:
+            raise ValueError(f"must have at most {max_items} items")
+        if enum is not None and value not in enum:
+            raise ValueError(f"must be one of {', '.join(map(str, enum))}")
+        if fmt is not None:
+            fmt(value)
+        if items is not None:
+            for item in value:
+                items(item)
+
+    return check
+
+
+def published_schema(schema: Dict[str, Any]) -> Dict[str, Any]:
+    """Copy of a schema for clients, with private formats replaced by patterns"""
+    published: Dict[str, Any] = {}
+    for keyword, value in schema.items():
+        if keyword == "format" and value in PRIVATE_FORMATS:
+            pattern = PRIVATE_FORMATS[value]
+            if pattern is not None:
+                published["pattern"] = pattern
+        elif keyword == "properties":
+            published[keyword] = {name: published_schema(prop) for name, prop in value.items()}
+        elif keyword == "items":
+            published[keyword] = published_schema(value)
+        else:
+            published[keyword] = value
+    return published
+
+
+def compile_schema(schema: Dict[str, Any]) -> Callable[[Dict[str, Any]], None]:
+    """Checker for an object schema; raises InvalidArguments on the first problem"""
+    required = tuple(schema.get("required", ()))
+    properties = {name: _compile_property(prop) for name, prop in schema.get("properties", {}).items()}
+
+    def validate(arguments: Dict[str, Any]) -> None:
+        if not isinstance(arguments, dict):
+            raise InvalidArguments("Arguments must be an object")
+        for name in required:
+            if arguments.get(name) is None:
+                raise InvalidArguments(f"Missing required argument: {name}")
+        for name, value in arguments.items():
+            check = properties.get(name)
+            # Optional arguments may be sent as null
+            if check is None or value is None:
+                continue
+            try:
+                check(value)
+            except ValueError as e:
+                raise InvalidArguments(f"Invalid {name}: {e}")
+
+    return validate
+
+
+class ToolValidator:
+    """Compiled argument checks for a set of tools.
+
+    ``date_ranges`` maps a tool to (start field, end field, max days): the
+    end may not precede the start nor be more than max days after it.
+    """
+
+    def __init__(self, tools: List[Dict[str, Any]],
+                 date_ranges: Optional[Dict[str, Tuple[str, str, int]]] = None):
+        self._validators = {tool["name"]: compile_schema(tool["inputSchema"]) for tool in tools}
+        self.date_ranges = date_ranges or {}
+        self.rejected = 0
+
+    def validate(self, name: str, arguments: Dict[str, Any]) -> None:
+        """Raise InvalidArguments if the call cannot succeed (unknown tools pass through)"""
+        validate = self._validators.get(name)
+        if validate is None:
+            return
+        try:
+            validate(arguments)
+            self._check_range(name, arguments)
+        except InvalidArguments:
+            self.rejected += 1
+            raise
+
+    def _check_range(self, name: str, arguments: Dict[str, Any]) -> None:
+        rule = self.date_ranges.get(name)
+        if rule is None:
+            return
+        start_field, end_field, max_days = rule
+        if not arguments.get(start_field) or not arguments.get(end_field):
+            return
+        start = date.fromisoformat(arguments[start_field])
+        end = date.fromisoformat(arguments[end_field])
+        if end < start:
+            raise InvalidArguments(f"{end_field} must not be before {start_field}")
+        if (end - start).days > max_days:
+            raise InvalidArguments(f"{end_field} must be at most {max_days} days after {start_field}")
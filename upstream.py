@@ -0,0 +1,275 @@
+#!/usr/bin/env python3
+"""
+Upstream HTTP client for the weather API
+One pooled httpx client with per-endpoint connect/read timeout budgets,
+jittered retries for idempotent GETs limited by a retry budget, optional
+hedged requests after the endpoint's p95 latency, and outcome metrics.
+"""
+
+import asyncio
+import logging
+import os
+import random
+import time
+from collections import Counter, deque
+from typing import Any, Deque, Dict, Optional, Tuple
+
+import httpx
+
+from admission import check_deadline, remaining_time
+
+logger = logging.getLogger(__name__)
+
+# (connect, read) timeout in seconds per endpoint; ranges of history make
+# for much bigger responses than current conditions
+ENDPOINT_TIMEOUTS: Dict[str, Tuple[float, float]] = {
+    "current.json": (2.0, 4.0),
+    "forecast.json": (2.0, 6.0),
+    "history.json": (2.0, 10.0),
+    "search.json": (2.0, 3.0),
+    "astronomy.json": (2.0, 4.0),
+    "alerts.json": (2.0, 4.0),
+}
+DEFAULT_TIMEOUT = (2.0, 5.0)
+
+# Extra attempts after the first, and the share of requests that may be
+# retried (token bucket: each request earns RETRY_BUDGET_RATIO tokens, each
+# retry costs one)
+UPSTREAM_RETRIES = int(os.getenv("UPSTREAM_RETRIES", "2"))
+RETRY_BUDGET_RATIO = float(os.getenv("UPSTREAM_RETRY_BUDGET", "0.1"))
+RETRY_BUDGET_MIN_TOKENS = 5.0
+RETRY_BACKOFF_SECONDS = 0.1
+RETRY_BACKOFF_MAX_SECONDS = 2.0
+
+# Send a second copy of a request still unanswered after the endpoint's p95
+UPSTREAM_HEDGING = os.getenv("UPSTREAM_HEDGING", "0").lower() in ("1", "true", "yes")
+HEDGE_MIN_SAMPLES = 20
+HEDGE_MIN_DELAY_SECONDS = 0.05
+
+# Latency samples kept per endpoint for percentiles
+LATENCY_SAMPLES = 512
+
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+
+
+class UpstreamError(Exception):
+    """Base class for failed upstream calls"""
+
+    retryable = False
+
+
+class UpstreamHTTPError(UpstreamError):
+    """The API answered with an error status; ``code`` is the API's own error code"""
+
+    def __init__(self, status_code: int, text: str, code: Optional[int] = None):
+        super().__init__(f"API request failed: {status_code} - {text}")
+        self.status_code = status_code
+        self.text = text
+        self.code = code
+        self.retryable = status_code in RETRYABLE_STATUS
+
+
+class UpstreamTimeout(UpstreamError):
+    retryable = True
+
+
+class UpstreamUnavailable(UpstreamError):
+    """Connection-level failure (DNS, refused, reset, ...)"""
+
+    retryable = True
+
+
+class UpstreamBadResponse(UpstreamError):
+    """A success status with a body that is not JSON (e.g. a proxy's HTML page)"""
+
+    retryable = True
+
+
+class RetryBudget:
+    """Caps retries at a fraction of recent traffic so retries cannot
+    multiply load on an upstream that is already failing"""
+
+    def __init__(self, ratio: float = RETRY_BUDGET_RATIO, min_tokens: float = RETRY_BUDGET_MIN_TOKENS):
+        self.ratio = ratio
+        self.max_tokens = max(min_tokens, 100 * ratio)
+        self.tokens = min_tokens
+
+    def deposit(self) -> None:
+        self.tokens = min(self.max_tokens, self.tokens + self.ratio)
+
+    def withdraw(self) -> bool:
+        if self.tokens < 1.0:
+            return False
+        self.tokens -= 1.0
+        return True
+
+
+class LatencyTracker:
+    """Recent successful latencies of one endpoint"""
+
+    def __init__(self, size: int = LATENCY_SAMPLES):
+        self.samples: Deque[float] = deque(maxlen=size)
+
+    def add(self, seconds: float) -> None:
+        self.samples.append(seconds)
+
+    def percentile(self, q: float) -> Optional[float]:
+        if not self.samples:
+            return None
+        ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+class UpstreamClient:
+    """GET-only client for the weather API"""
+
+    def __init__(self, base_url: str, retries: int = UPSTREAM_RETRIES, hedging: bool = UPSTREAM_HEDGING,
+                 timeouts: Optional[Dict[str, Tuple[float, float]]] = None,
+                 transport: Optional[httpx.AsyncBaseTransport] = None):
+        self.base_url = base_url
+        self.retries = retries
+        self.hedging = hedging
+        self.timeouts = timeouts or ENDPOINT_TIMEOUTS
+        self.budget = RetryBudget()
+        self.latency: Dict[str, LatencyTracker] = {}
+        self.counters: Counter = Counter()
+        # Replaces the network for benchmarks and tests
+        self.transport = transport
+        self._client: Optional[httpx.AsyncClient] = None
+        self._client_loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def _http(self) -> httpx.AsyncClient:
+        # Connections belong to an event loop; a new loop (tests, stdio
+        # restarts) gets a fresh pool
+        loop = asyncio.get_running_loop()
+        if self._client is None or self._client_loop is not loop:
+            # Don't read proxy settings from the environment: SOCKS proxies
+            # (ALL_PROXY=socks://...) inherited by containers break httpx
+            self._client = httpx.AsyncClient(trust_env=False, transport=self.transport)
+            self._client_loop = loop
+        return self._client
+
+    async def close(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    def _timeout(self, endpoint: str) -> httpx.Timeout:
+        connect, read = self.timeouts.get(endpoint, DEFAULT_TIMEOUT)
+        remaining = remaining_time()
+        if remaining is not None:
+            connect, read = min(connect, remaining), min(read, remaining)
+        return httpx.Timeout(read, connect=connect)
+
+    async def get(self, endpoint: str, params: Dict[str, Any]) -> Any:
+        """GET an endpoint's JSON, retrying transient failures within budget"""
+        self.counters["requests"] += 1
+        self.budget.deposit()
+        attempt = 0
+        while True:
+            check_deadline(f"calling {endpoint}")
+            try:
+                result = await self._hedged(endpoint, params)
+                self.counters["successes"] += 1
+                return result
+            except UpstreamError as e:
+                self.counters[f"errors.{type(e).__name__}"] += 1
+                if not e.retryable or attempt >= self.retries:
+                    self.counters["failures"] += 1
+                    raise
+                delay = random.uniform(0, min(RETRY_BACKOFF_MAX_SECONDS, RETRY_BACKOFF_SECONDS * 2 ** attempt))
+                remaining = remaining_time()
+                if remaining is not None and delay >= remaining:
+                    self.counters["retries_skipped_deadline"] += 1
+                    self.counters["failures"] += 1
+                    raise
+                if not self.budget.withdraw():
+                    self.counters["retries_denied"] += 1
+                    self.counters["failures"] += 1
+                    raise
+                attempt += 1
+                self.counters["retries"] += 1
+                logger.info(f"Retrying {endpoint} in {delay:.2f}s after: {e}")
+                await asyncio.sleep(delay)
+
+    async def _hedged(self, endpoint: str, params: Dict[str, Any]) -> Any:
+        delay = self._hedge_delay(endpoint)
+        if delay is None:
+            return await self._attempt(endpoint, params)
+
+        tasks = [asyncio.create_task(self._attempt(endpoint, params))]
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=delay)
+            if done:
+                return tasks[0].result()
+
+            self.counters["hedges"] += 1
+            tasks.append(asyncio.create_task(self._attempt(endpoint, params)))
+            pending = set(tasks)
+            error: Optional[BaseException] = None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is tasks[1]:
+                            self.counters["hedge_wins"] += 1
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+
+    def _hedge_delay(self, endpoint: str) -> Optional[float]:
+        if not self.hedging:
+            return None
+        tracker = self.latency.get(endpoint)
+        if tracker is None or len(tracker.samples) < HEDGE_MIN_SAMPLES:
+            return None
+        delay = max(HEDGE_MIN_DELAY_SECONDS, tracker.percentile(0.95))
+        remaining = remaining_time()
+        if remaining is not None and delay >= remaining:
+            return None
+        return delay
+
+    async def _attempt(self, endpoint: str, params: Dict[str, Any]) -> Any:
+        self.counters["attempts"] += 1
+        start = time.monotonic()
+        try:
+            response = await self._http().get(
+                f"{self.base_url}/{endpoint}", params=params, timeout=self._timeout(endpoint)
+            )
+        except httpx.TimeoutException as e:
+            raise UpstreamTimeout(f"Request to {endpoint} timed out: {e!r}")
+        except httpx.RequestError as e:
+            raise UpstreamUnavailable(f"Request error: {str(e)}")
+        if response.status_code >= 400:
+            raise UpstreamHTTPError(response.status_code, response.text, _error_code(response))
+        try:
+            data = response.json()
+        except ValueError:
+            raise UpstreamBadResponse(f"{endpoint} returned {response.status_code} with a non-JSON body")
+        self.latency.setdefault(endpoint, LatencyTracker()).add(time.monotonic() - start)
+        return data
+
+    def stats(self) -> Dict[str, Any]:
+        latency = {}
+        for endpoint, tracker in self.latency.items():
+            latency[endpoint] = {
+                f"p{int(q * 100)}_ms": round(tracker.percentile(q) * 1000, 1) for q in (0.5, 0.95, 0.99)
+            }
+        return {
+            **dict(self.counters),
+            "retry_tokens": round(self.budget.tokens, 2),
+            "hedging": self.hedging,
+            "latency": latency,
+        }
+
+
+def _error_code(response: httpx.Response) -> Optional[int]:
+    """WeatherAPI's error code from an error body ({"error": {"code": 1006, ...}})"""
+    try:
+        return response.json().get("error", {}).get("code")
+    except (ValueError, AttributeError):
+        return None
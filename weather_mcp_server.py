@@ -4,188 +4,619 @@ Weather MCP Server
 A Model Context Protocol server for weather data retrieval
 """
 
+from __future__ import annotations
+
 import asyncio
 import json
 import logging
-from typing import Any, Dict, List, Optional, Union
-from datetime import datetime
-import httpx
-from mcp.server import Server
-from mcp.server.models import InitializationOptions
-from mcp.server.stdio import stdio_server
-from mcp.types import (
-    CallToolRequest,
-    CallToolResult,
-    ListToolsRequest,
-    ListToolsResult,
-    Tool,
-    TextContent,
-    ImageContent,
-    EmbeddedResource,
+import os
+import time
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Union
+from datetime import datetime, timedelta, timezone
+
+import astronomy
+import climate_stats
+import hourly_window
+import location_ranking
+import log_pipeline
+from geo_index import ProximityIndex, parse_coordinates
+from gazetteer import Gazetteer
+from location_resolver import LocationResolver, format_coordinates, normalize_query
+from response_cache import ResponseCache
+from tool_validation import ToolValidator, published_schema
+from upstream import UpstreamHTTPError
+from weather_model import compact, nbytes, plain
+from providers import NO_MATCHING_LOCATION, ProviderRouter, default_providers
+from subscriptions import (
+    SUBSCRIPTION_ENDPOINTS,
+    Subscription,
+    SubscriptionHub,
+    parse_resource_uri,
+    resource_uri,
 )
 
+# The mcp package is comparatively slow to import, so it is loaded lazily the
+# first time the MCP server object or a tool result is needed. This keeps the
+# HTTP bridges' cold start fast on scale-to-zero deployments.
+if TYPE_CHECKING:
+    from mcp.server import Server
+    from mcp.types import CallToolResult, ListToolsResult, Resource, ResourceTemplate
+
 # Configure logging
-logging.basicConfig(level=logging.INFO)
+log_pipeline.configure_logging()
 logger = logging.getLogger(__name__)
 
+# Seconds an upstream response stays fresh, per endpoint
+CACHE_TTLS = {
+    "current.json": 300,
+    "forecast.json": 1800,
+    "history.json": 86400,
+    "search.json": 86400,
+    "astronomy.json": 21600,
+    "alerts.json": 300,
+}
+
+# Capabilities announced by every MCP transport
+SERVER_CAPABILITIES = {"tools": {}, "resources": {"subscribe": True}}
+
+# Endpoints whose coordinate queries may be answered from a nearby cached
+# response, and how near/fresh that response must be
+PROXIMITY_ENDPOINTS = {"current.json", "forecast.json", "history.json", "astronomy.json"}
+PROXIMITY_RADIUS_KM = float(os.getenv("PROXIMITY_RADIUS_KM", "1.5"))
+PROXIMITY_MAX_AGE_SECONDS = float(os.getenv("PROXIMITY_MAX_AGE_SECONDS", "600"))
+
+# Longest range get_weather_statistics accepts, and the span of each
+# history.json request it is split into
+MAX_STATISTICS_RANGE_DAYS = 366
+HISTORY_CHUNK_DAYS = 30
+
+# get_hourly_window fetches at least the default forecast length (so it
+# shares get_weather_forecast's cache entry) and at most the API's maximum
+DEFAULT_FORECAST_DAYS = 3
+MAX_FORECAST_DAYS = 10
+
+# compare_locations: most locations per call and concurrent forecast fetches
+MAX_COMPARE_LOCATIONS = 50
+COMPARE_CONCURRENCY = int(os.getenv("COMPARE_CONCURRENCY", "8"))
+
+# Upstream "no matching location" answers are remembered this long, so
+# repeated unknown place names are rejected without another round trip
+UNKNOWN_LOCATION_TTL = float(os.getenv("UNKNOWN_LOCATION_TTL", "120"))
+UNKNOWN_LOCATION_CACHE_BYTES = 1 << 20
+
+# How get_astronomy_data is answered: "local" computes it whenever the
+# location (coordinates and time zone) is known, "verify" also fetches
+# upstream and logs differences, "upstream" always calls the API
+ASTRONOMY_MODE = os.getenv("ASTRONOMY_MODE", "local").lower()
+ASTRONOMY_VERIFY_TOLERANCE_MINUTES = 5
+MAX_ASTRONOMY_RANGE_DAYS = 366
+
+# Where the warm-start cache snapshot and learned location index live; set
+# CACHE_SNAPSHOT_PATH / LOCATION_INDEX_PATH to "" to disable persistence
+STATE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache")
+DEFAULT_SNAPSHOT_PATH = os.path.join(STATE_DIR, "weather_cache.json.gz")
+DEFAULT_LOCATION_INDEX_PATH = os.path.join(STATE_DIR, "locations.json")
+DEFAULT_GAZETTEER_PATH = os.path.join(STATE_DIR, "gazetteer.json")
+
+# Tool definitions: the schemas are compiled into the local argument checks
+# ("format" is "date", "local-datetime" or "location") and served by
+# list_tools without the non-standard formats (PUBLISHED_TOOLS)
+TOOLS: List[Dict[str, Any]] = [
+    {
+        "name": "get_current_weather",
+        "description": "Get current weather conditions for a location",
+        "inputSchema": {
+            "type": "object",
+            "properties": {
+                "location": {
+                    "type": "string",
+                    "description": "City name, coordinates (lat,lon), or postal code",
+                    "format": "location"
+                },
+                "include_air_quality": {
+                    "type": "boolean",
+                    "description": "Include air quality data",
+                    "default": False
+                }
+            },
+            "required": ["location"]
+        }
+    },
+    {
+        "name": "get_weather_forecast",
+        "description": "Get weather forecast for a location",
+        "inputSchema": {
+            "type": "object",
+            "properties": {
+                "location": {
+                    "type": "string",
+                    "description": "City name, coordinates (lat,lon), or postal code",
+                    "format": "location"
+                },
+                "days": {
+                    "type": "integer",
+                    "description": "Number of forecast days (1-10)",
+                    "default": 3,
+                    "minimum": 1,
+                    "maximum": 10
+                },
+                "include_air_quality": {
+                    "type": "boolean",
+                    "description": "Include air quality data",
+                    "default": False
+                }
+            },
+            "required": ["location"]
+        }
+    },
+    {
+        "name": "get_weather_history",
+        "description": "Get historical weather data for a location",
+        "inputSchema": {
+            "type": "object",
+            "properties": {
+                "location": {
+                    "type": "string",
+                    "description": "City name, coordinates (lat,lon), or postal code",
+                    "format": "location"
+                },
+                "date": {
+                    "type": "string",
+                    "description": "Date in YYYY-MM-DD format",
+                    "format": "date"
+                },
+                "end_date": {
+                    "type": "string",
+                    "description": "End date in YYYY-MM-DD format (optional, at most 30 days after date)",
+                    "format": "date"
+                }
+            },
+            "required": ["location", "date"]
+        }
+    },
+    {
+        "name": "get_weather_statistics",
+        "description": "Get aggregated climate statistics (temperature percentiles, precipitation totals, hours above thresholds) for a location over a date range",
+        "inputSchema": {
+            "type": "object",
+            "properties": {
+                "location": {
+                    "type": "string",
+                    "description": "City name, coordinates (lat,lon), or postal code",
+                    "format": "location"
+                },
+                "start_date": {
+                    "type": "string",
+                    "description": "Start date in YYYY-MM-DD format",
+                    "format": "date"
+                },
+                "end_date": {
+                    "type": "string",
+                    "description": "End date in YYYY-MM-DD format (inclusive, at most 366 days after start_date)",
+                    "format": "date"
+                },
+                "temp_above_c": {
+                    "type": "number",
+                    "description": "Count hours with temperature at or above this value (default 25)"
+                },
+                "temp_below_c": {
+                    "type": "number",
+                    "description": "Count hours with temperature at or below this value (default 0)"
+                },
+                "wind_above_kph": {
+                    "type": "number",
+                    "description": "Count hours with wind speed at or above this value (default 40)"
+                },
+                "precip_above_mm": {
+                    "type": "number",
+                    "description": "Count hours with precipitation at or above this value (default 0.1)"
+                }
+            },
+            "required": ["location", "start_date", "end_date"]
+        }
+    },
+    {
+        "name": "search_locations",
+        "description": "Search for locations by name",
+        "inputSchema": {
+            "type": "object",
+            "properties": {
+                "query": {
+                    "type": "string",
+                    "description": "Location name to search for",
+                    "minLength": 1
+                }
+            },
+            "required": ["query"]
+        }
+    },
+    {
+        "name": "get_astronomy_data",
+        "description": "Get astronomy data (sunrise, sunset, moon phase) for a location",
+        "inputSchema": {
+            "type": "object",
+            "properties": {
+                "location": {
+                    "type": "string",
+                    "description": "City name, coordinates (lat,lon), or postal code",
+                    "format": "location"
+                },
+                "date": {
+                    "type": "string",
+                    "description": "Date in YYYY-MM-DD format (optional, defaults to today)",
+                    "format": "date"
+                },
+                "end_date": {
+                    "type": "string",
+                    "description": "End date in YYYY-MM-DD format to get every day from date to end_date (optional, at most 366 days after date)",
+                    "format": "date"
+                }
+            },
+            "required": ["location"]
+        }
+    },
+    {
+        "name": "get_hourly_window",
+        "description": "Get selected hourly forecast values at a local time or over a time window (e.g. 15:30 tomorrow, the next 6 hours), interpolated between forecast hours when needed",
+        "inputSchema": {
+            "type": "object",
+            "properties": {
+                "location": {
+                    "type": "string",
+                    "description": "City name, coordinates (lat,lon), or postal code",
+                    "format": "location"
+                },
+                "start": {
+                    "type": "string",
+                    "description": "Local time at the location in YYYY-MM-DD HH:MM format (optional, defaults to now)",
+                    "format": "local-datetime"
+                },
+                "end": {
+                    "type": "string",
+                    "description": "End of the window, local time in YYYY-MM-DD HH:MM format (optional; without end or hours a single time is returned)",
+                    "format": "local-datetime"
+                },
+                "hours": {
+                    "type": "integer",
+                    "description": "Window length in hours from start (alternative to end)",
+                    "minimum": 1,
+                    "maximum": 240
+                },
+                "step_minutes": {
+                    "type": "integer",
+                    "description": "Return a point every N minutes, interpolated, instead of the forecast's own hours (optional)",
+                    "minimum": 10,
+                    "maximum": 360
+                },
+                "fields": {
+                    "type": "array",
+                    "items": {"type": "string", "enum": list(hourly_window.FIELDS)},
+                    "description": "Hourly fields to return (default temp_c, precip_mm, chance_of_rain, wind_kph, condition)"
+                }
+            },
+            "required": ["location"]
+        }
+    },
+    {
+        "name": "compare_locations",
+        "description": "Rank several locations by their forecast over a time window (e.g. which venue is driest this weekend) and return only the ranked summary",
+        "inputSchema": {
+            "type": "object",
+            "properties": {
+                "locations": {
+                    "type": "array",
+                    "items": {"type": "string", "format": "location"},
+                    "description": f"Locations to compare: city names, coordinates (lat,lon) or postal codes (2-{MAX_COMPARE_LOCATIONS})",
+                    "minItems": 2,
+                    "maxItems": MAX_COMPARE_LOCATIONS
+                },
+                "start_date": {
+                    "type": "string",
+                    "description": "First local date of the window in YYYY-MM-DD format (optional, defaults to now through the end of the 3-day forecast)",
+                    "format": "date"
+                },
+                "end_date": {
+                    "type": "string",
+                    "description": f"Last local date of the window in YYYY-MM-DD format (optional, defaults to start_date, at most {MAX_FORECAST_DAYS} days after it)",
+                    "format": "date"
+                },
+                "from_hour": {
+                    "type": "integer",
+                    "description": "Only count hours of the day from this hour (0-23, optional)",
+                    "minimum": 0,
+                    "maximum": 23
+                },
+                "to_hour": {
+                    "type": "integer",
+                    "description": "Only count hours of the day up to this hour (0-23, optional)",
+                    "minimum": 0,
+                    "maximum": 23
+                },
+                "criteria": {
+                    "type": "array",
+                    "items": {"type": "string", "enum": list(location_ranking.CRITERIA)},
+                    "description": "What to rank on: precipitation (driest first), temperature (closest to the comfort band), wind (calmest), uv (lowest); default precipitation, temperature, wind"
+                },
+                "comfort_min_c": {
+                    "type": "number",
+                    "description": "Lower end of the comfortable temperature band (default 18)"
+                },
+                "comfort_max_c": {
+                    "type": "number",
+                    "description": "Upper end of the comfortable temperature band (default 26)"
+                }
+            },
+            "required": ["locations"]
+        }
+    }
+]
+
+PUBLISHED_TOOLS = [{**tool, "inputSchema": published_schema(tool["inputSchema"])} for tool in TOOLS]
+
+# (start field, end field, most days the end may be after the start) checked
+# before a call
+TOOL_DATE_RANGES = {
+    "get_weather_history": ("date", "end_date", HISTORY_CHUNK_DAYS),
+    "get_weather_statistics": ("start_date", "end_date", MAX_STATISTICS_RANGE_DAYS),
+    "get_astronomy_data": ("date", "end_date", MAX_ASTRONOMY_RANGE_DAYS),
+    "compare_locations": ("start_date", "end_date", MAX_FORECAST_DAYS),
+}
+
+
 class WeatherMCPServer:
-    def __init__(self, api_key: str, base_url: str = "http://api.weatherapi.com/v1"):
+    def __init__(self, api_key: str, base_url: str = "http://api.weatherapi.com/v1",
+                 cache: Optional[ResponseCache] = None,
+                 resolver: Optional[LocationResolver] = None,
+                 providers: Optional[List[Any]] = None):
         self.api_key = api_key
         self.base_url = base_url
-        self.server = Server("weather-mcp-server")
-        self.setup_handlers()
-        
+        self.cache = cache or ResponseCache(
+            snapshot_path=os.getenv("CACHE_SNAPSHOT_PATH", DEFAULT_SNAPSHOT_PATH) or None,
+            restore=compact,
+            serialize=plain,
+            sizeof=nbytes,
+        )
+        self.resolver = resolver or LocationResolver(
+            path=os.getenv("LOCATION_INDEX_PATH", DEFAULT_LOCATION_INDEX_PATH) or None
+        )
+        self.gazetteer = Gazetteer(
+            path=os.getenv("GAZETTEER_PATH", DEFAULT_GAZETTEER_PATH) or None,
+            bundled_path=os.getenv("GAZETTEER_DATA_PATH") or None,
+        )
+        self.proximity = ProximityIndex(PROXIMITY_RADIUS_KM, PROXIMITY_MAX_AGE_SECONDS)
+        self.providers = ProviderRouter(providers or default_providers(api_key, base_url))
+        self.validator = ToolValidator(TOOLS, TOOL_DATE_RANGES)
+        # Queries the upstream had no location for: normalized query -> error text
+        self.unknown_locations = ResponseCache(memory_budget=UNKNOWN_LOCATION_CACHE_BYTES)
+        self.upstream_calls = 0
+        self.astronomy_stats = {"local": 0, "upstream": 0, "verified": 0, "mismatches": 0}
+        self.subscriptions = SubscriptionHub(self._fetch_subscription, CACHE_TTLS, self._subscription_key)
+        # (session id, resource uri) -> hub subscription for MCP clients
+        self._resource_subscriptions: Dict[tuple, Subscription] = {}
+        self._server: Optional[Server] = None
+
+    @property
+    def server(self) -> Server:
+        """MCP server object, created (and mcp imported) on first access"""
+        if self._server is None:
+            from mcp.server import Server
+
+            self._server = Server("weather-mcp-server")
+            self.setup_handlers()
+        return self._server
+
     def setup_handlers(self):
         """Setup MCP server handlers"""
-        
+
         @self.server.list_tools()
         async def list_tools() -> ListToolsResult:
             """List available weather tools"""
-            return ListToolsResult(
-                tools=[
-                    Tool(
-                        name="get_current_weather",
-                        description="Get current weather conditions for a location",
-                        inputSchema={
-                            "type": "object",
-                            "properties": {
-                                "location": {
-                                    "type": "string",
-                                    "description": "City name, coordinates (lat,lon), or postal code"
-                                },
-                                "include_air_quality": {
-                                    "type": "boolean",
-                                    "description": "Include air quality data",
-                                    "default": False
-                                }
-                            },
-                            "required": ["location"]
-                        }
-                    ),
-                    Tool(
-                        name="get_weather_forecast",
-                        description="Get weather forecast for a location",
-                        inputSchema={
-                            "type": "object",
-                            "properties": {
-                                "location": {
-                                    "type": "string",
-                                    "description": "City name, coordinates (lat,lon), or postal code"
-                                },
-                                "days": {
-                                    "type": "integer",
-                                    "description": "Number of forecast days (1-10)",
-                                    "default": 3,
-                                    "minimum": 1,
-                                    "maximum": 10
-                                },
-                                "include_air_quality": {
-                                    "type": "boolean",
-                                    "description": "Include air quality data",
-                                    "default": False
-                                }
-                            },
-                            "required": ["location"]
-                        }
-                    ),
-                    Tool(
-                        name="get_weather_history",
-                        description="Get historical weather data for a location",
-                        inputSchema={
-                            "type": "object",
-                            "properties": {
-                                "location": {
-                                    "type": "string",
-                                    "description": "City name, coordinates (lat,lon), or postal code"
-                                },
-                                "date": {
-                                    "type": "string",
-                                    "description": "Date in YYYY-MM-DD format"
-                                },
-                                "end_date": {
-                                    "type": "string",
-                                    "description": "End date in YYYY-MM-DD format (optional)"
-                                }
-                            },
-                            "required": ["location", "date"]
-                        }
-                    ),
-                    Tool(
-                        name="search_locations",
-                        description="Search for locations by name",
-                        inputSchema={
-                            "type": "object",
-                            "properties": {
-                                "query": {
-                                    "type": "string",
-                                    "description": "Location name to search for"
-                                }
-                            },
-                            "required": ["query"]
-                        }
-                    ),
-                    Tool(
-                        name="get_astronomy_data",
-                        description="Get astronomy data (sunrise, sunset, moon phase) for a location",
-                        inputSchema={
-                            "type": "object",
-                            "properties": {
-                                "location": {
-                                    "type": "string",
-                                    "description": "City name, coordinates (lat,lon), or postal code"
-                                },
-                                "date": {
-                                    "type": "string",
-                                    "description": "Date in YYYY-MM-DD format (optional, defaults to today)"
-                                }
-                            },
-                            "required": ["location"]
-                        }
-                    )
-                ]
-            )
-        
+            return await self.list_tools()
+
         @self.server.call_tool()
         async def call_tool(name: str, arguments: Dict[str, Any]) -> CallToolResult:
             """Handle tool calls"""
-            try:
-                if name == "get_current_weather":
-                    return await self._get_current_weather(arguments)
-                elif name == "get_weather_forecast":
-                    return await self._get_weather_forecast(arguments)
-                elif name == "get_weather_history":
-                    return await self._get_weather_history(arguments)
-                elif name == "search_locations":
-                    return await self._search_locations(arguments)
-                elif name == "get_astronomy_data":
-                    return await self._get_astronomy_data(arguments)
-                else:
-                    return CallToolResult(
-                        content=[TextContent(type="text", text=f"Unknown tool: {name}")]
-                    )
-            except Exception as e:
-                logger.error(f"Error calling tool {name}: {str(e)}")
-                return CallToolResult(
-                    content=[TextContent(type="text", text=f"Error: {str(e)}")]
-                )
+            return await self.call_tool(name, arguments)
+
+        @self.server.list_resources()
+        async def list_resources() -> List[Resource]:
+            """Locations that currently have a subscription poller"""
+            from mcp.types import Resource
+
+            return [
+                Resource(uri=resource_uri(kind, location), name=f"{kind} weather for {location}",
+                         mimeType="application/json")
+                for kind, location in self.subscriptions.active()
+            ]
+
+        @self.server.list_resource_templates()
+        async def list_resource_templates() -> List[ResourceTemplate]:
+            """Subscribable weather resources"""
+            from mcp.types import ResourceTemplate
+
+            return [
+                ResourceTemplate(uriTemplate="weather://current/{location}", name="Current weather",
+                                 description="Current conditions for a location; subscribe to get notified of changes",
+                                 mimeType="application/json"),
+                ResourceTemplate(uriTemplate="weather://alerts/{location}", name="Weather alerts",
+                                 description="Active weather alerts for a location; subscribe to get notified of changes",
+                                 mimeType="application/json"),
+            ]
+
+        @self.server.read_resource()
+        async def read_resource(uri):
+            """Current value of a weather resource"""
+            from mcp.server.lowlevel.helper_types import ReadResourceContents
+
+            kind, location = parse_resource_uri(str(uri))
+            value = self.subscriptions.latest(kind, location) or await self._fetch_subscription(kind, location)
+            return [ReadResourceContents(content=json.dumps(value, indent=2), mime_type="application/json")]
+
+        @self.server.subscribe_resource()
+        async def subscribe_resource(uri) -> None:
+            """Notify this session whenever the resource changes"""
+            kind, location = parse_resource_uri(str(uri))
+            session = self.server.request_context.session
+            key = (id(session), str(uri))
+            if key in self._resource_subscriptions:
+                return
+
+            async def notify(value: Dict[str, Any]) -> None:
+                try:
+                    await session.send_resource_updated(uri)
+                except Exception:
+                    self._resource_subscriptions.pop(key, None)
+                    raise
+
+            self._resource_subscriptions[key] = self.subscriptions.subscribe(kind, location, notify)
+
+        @self.server.unsubscribe_resource()
+        async def unsubscribe_resource(uri) -> None:
+            """Stop notifying this session about the resource"""
+            session = self.server.request_context.session
+            subscription = self._resource_subscriptions.pop((id(session), str(uri)), None)
+            if subscription is not None:
+                self.subscriptions.unsubscribe(subscription)
+
+    async def list_tools(self) -> ListToolsResult:
+        """List available weather tools"""
+        from mcp.types import ListToolsResult, Tool
+
+        return ListToolsResult(tools=[Tool(**tool) for tool in PUBLISHED_TOOLS])
+
+    async def call_tool(self, name: str, arguments: Dict[str, Any]) -> CallToolResult:
+        """Dispatch a tool call by name, recording it in the access log"""
+        with log_pipeline.request_record(tool=name) as record:
+            result = await self._dispatch_tool(name, arguments)
+            # HTTP requests get their status from the response instead
+            record.setdefault("status", "error" if record.get("error") else "ok")
+            return result
+
+    async def _dispatch_tool(self, name: str, arguments: Dict[str, Any]) -> CallToolResult:
+        try:
+            self.validator.validate(name, arguments)
+            if name == "get_current_weather":
+                return await self._get_current_weather(arguments)
+            elif name == "get_weather_forecast":
+                return await self._get_weather_forecast(arguments)
+            elif name == "get_weather_history":
+                return await self._get_weather_history(arguments)
+            elif name == "get_weather_statistics":
+                return await self._get_weather_statistics(arguments)
+            elif name == "search_locations":
+                return await self._search_locations(arguments)
+            elif name == "get_astronomy_data":
+                return await self._get_astronomy_data(arguments)
+            elif name == "get_hourly_window":
+                return await self._get_hourly_window(arguments)
+            elif name == "compare_locations":
+                return await self._compare_locations(arguments)
+            else:
+                return self._text_result(f"Unknown tool: {name}")
+        except Exception as e:
+            logger.error(f"Error calling tool {name}: {str(e)}")
+            log_pipeline.note(error=True)
+            return self._text_result(f"Error: {str(e)}")
+
+    def _text_result(self, payload: Any) -> CallToolResult:
+        """Wrap a payload (JSON-encoded unless already text) in a tool result"""
+        from mcp.types import CallToolResult, TextContent
+
+        text = payload if isinstance(payload, str) else json.dumps(payload, indent=2)
+        return CallToolResult(content=[TextContent(type="text", text=text)])
     
     async def _make_api_request(self, endpoint: str, params: Dict[str, Any]) -> Dict[str, Any]:
         """Make API request to weather service"""
-        params["key"] = self.api_key
-        
-        # Disable reading proxy settings from environment to avoid errors when
-        # SOCKS proxies are configured (e.g., ALL_PROXY=socks://...). OpenAI Agent
-        # Builder/containers may inherit such env vars.
-        async with httpx.AsyncClient(trust_env=False) as client:
-            try:
-                response = await client.get(f"{self.base_url}/{endpoint}", params=params)
-                response.raise_for_status()
-                return response.json()
-            except httpx.HTTPStatusError as e:
-                raise Exception(f"API request failed: {e.response.status_code} - {e.response.text}")
-            except httpx.RequestError as e:
-                raise Exception(f"Request error: {str(e)}")
-    
+        # Look the query up under its canonical location (search queries are
+        # free text by definition and stay as typed). Upstream still gets the
+        # query as the user wrote it, so it resolves to the same named place.
+        query = params.get("q")
+        key_params = params
+        if query is not None and endpoint != "search.json":
+            key_params = {**params, "q": self.resolver.canonical(query)}
+        # Resolved through a learned alias: only a guess until upstream answers
+        guessed = key_params.get("q") != query and parse_coordinates(query) is None
+
+        cache_key = self.cache.make_key(endpoint, key_params)
+        location_key = key_params.get("q")
+        cached = self.cache.get(cache_key)
+        if cached is not None:
+            log_pipeline.note_cache("hit", location_key)
+            return cached
+        unknown_key = normalize_query(str(query)) if query is not None and endpoint != "search.json" else None
+        if unknown_key is not None:
+            error_text = self.unknown_locations.get(unknown_key)
+            if error_text is not None:
+                log_pipeline.note_cache("unknown", location_key)
+                raise UpstreamHTTPError(400, error_text, NO_MATCHING_LOCATION)
+
+        variant = None
+        if endpoint in PROXIMITY_ENDPOINTS:
+            variant = self.cache.make_key(endpoint, {k: v for k, v in params.items() if k != "q"})
+            coordinates = parse_coordinates(params.get("q"))
+            if coordinates is not None:
+                nearby = self._nearby_cached(variant, *coordinates)
+                if nearby is not None:
+                    log_pipeline.note_cache("nearby", location_key)
+                    return nearby
+
+        # Cached (and returned) in the compact model; it reads like the dict
+        log_pipeline.note_cache("miss", location_key)
+        start = time.monotonic()
+        try:
+            data = compact(await self._fetch_upstream(endpoint, params))
+        except UpstreamHTTPError as e:
+            if unknown_key is not None and e.code == NO_MATCHING_LOCATION:
+                self.unknown_locations.set(unknown_key, e.text, UNKNOWN_LOCATION_TTL)
+            raise
+        finally:
+            log_pipeline.note_upstream(time.monotonic() - start)
+        # What refetching costs, for the cache's eviction order
+        cost = time.monotonic() - start
+        ttl = CACHE_TTLS.get(endpoint, 300)
+        if isinstance(data, list):
+            self.cache.set(cache_key, data, ttl, cost)
+            self.resolver.learn_search(data)
+            return data
+        # Stored under the location upstream actually answered for, not the
+        # pre-fetch guess: a stale or wrong alias must not file one place's
+        # weather under another's key
+        location = data.get("location") or {}
+        canonical = self.resolver.learn(query, location)
+        response_key = self.cache.make_key(endpoint, {**params, "q": canonical}) if canonical is not None else None
+        if response_key is not None:
+            self.cache.set(response_key, data, ttl, cost)
+        if response_key != cache_key and not guessed:
+            # The query's own form (its text or coordinates) maps to this answer
+            self.cache.set(cache_key, data, ttl, cost)
+        if variant is not None and response_key is not None:
+            self.proximity.add(variant, location["lat"], location["lon"], response_key)
+        return data
+
+    def _nearby_cached(self, variant: str, lat: float, lon: float) -> Optional[Dict[str, Any]]:
+        """Serve a coordinate query from the nearest fresh cached response"""
+        for distance, cache_key in self.proximity.candidates(variant, lat, lon):
+            data = self.cache.peek(cache_key)
+            if data is None:
+                self.proximity.discard(cache_key)
+                continue
+            self.proximity.record_hit(distance)
+            return data
+        return None
+
+    async def _fetch_upstream(self, endpoint: str, params: Dict[str, Any]) -> Dict[str, Any]:
+        """Call the best available weather provider, bypassing the cache"""
+        self.upstream_calls += 1
+        data = await self.providers.fetch(endpoint, dict(params))
+        location = data.get("location") if isinstance(data, dict) else None
+        if location is not None and not location.get("name"):
+            # Providers without reverse geocoding leave coordinate queries
+            # unnamed; use what an earlier response taught the resolver
+            known = self.resolver.lookup(str(params.get("q"))) or {}
+            for field in ("name", "region", "country"):
+                location[field] = location.get(field) or known.get(field) or ("" if field != "name" else params.get("q"))
+        return data
+
     async def _get_current_weather(self, args: Dict[str, Any]) -> CallToolResult:
         """Get current weather conditions"""
         location = args["location"]
@@ -200,14 +631,7 @@ class WeatherMCPServer:
         # Format the response
         weather_info = self._format_current_weather(data)
         
-        return CallToolResult(
-            content=[
-                TextContent(
-                    type="text",
-                    text=json.dumps(weather_info, indent=2)
-                )
-            ]
-        )
+        return self._text_result(weather_info)
     
     async def _get_weather_forecast(self, args: Dict[str, Any]) -> CallToolResult:
         """Get weather forecast"""
@@ -224,14 +648,7 @@ class WeatherMCPServer:
         # Format the response
         forecast_info = self._format_forecast(data)
         
-        return CallToolResult(
-            content=[
-                TextContent(
-                    type="text",
-                    text=json.dumps(forecast_info, indent=2)
-                )
-            ]
-        )
+        return self._text_result(forecast_info)
     
     async def _get_weather_history(self, args: Dict[str, Any]) -> CallToolResult:
         """Get historical weather data"""
@@ -248,19 +665,63 @@ class WeatherMCPServer:
         # Format the response
         history_info = self._format_history(data)
         
-        return CallToolResult(
-            content=[
-                TextContent(
-                    type="text",
-                    text=json.dumps(history_info, indent=2)
-                )
-            ]
-        )
+        return self._text_result(history_info)
     
+    async def _get_weather_statistics(self, args: Dict[str, Any]) -> CallToolResult:
+        """Get aggregated climate statistics over a date range"""
+        return self._text_result(await self._compute_weather_statistics(args))
+
+    async def _compute_weather_statistics(self, args: Dict[str, Any]) -> Dict[str, Any]:
+        """Fetch history for the range (in chunks) and reduce it to aggregates"""
+        location = args["location"]
+        start = datetime.strptime(args["start_date"], "%Y-%m-%d").date()
+        end = datetime.strptime(args["end_date"], "%Y-%m-%d").date()
+        if end < start:
+            raise ValueError("end_date must not be before start_date")
+        if (end - start).days > MAX_STATISTICS_RANGE_DAYS:
+            raise ValueError(f"end_date must be at most {MAX_STATISTICS_RANGE_DAYS} days after start_date")
+
+        requests = []
+        chunk_start = start
+        while chunk_start <= end:
+            chunk_end = min(chunk_start + timedelta(days=HISTORY_CHUNK_DAYS - 1), end)
+            params = {"q": location, "dt": chunk_start.isoformat()}
+            if chunk_end > chunk_start:
+                params["end_dt"] = chunk_end.isoformat()
+            requests.append(self._make_api_request("history.json", params))
+            chunk_start = chunk_end + timedelta(days=1)
+        responses = await asyncio.gather(*requests)
+
+        days = [
+            day
+            for data in responses
+            for day in data.get("forecast", {}).get("forecastday", [])
+        ]
+        location_info = responses[0].get("location", {})
+        thresholds = {key: args.get(key) for key in climate_stats.DEFAULT_THRESHOLDS}
+
+        return {
+            "location": {
+                "name": location_info.get("name"),
+                "region": location_info.get("region"),
+                "country": location_info.get("country")
+            },
+            "statistics": climate_stats.summarize(days, thresholds)
+        }
+
     async def _search_locations(self, args: Dict[str, Any]) -> CallToolResult:
         """Search for locations"""
-        query = args["query"]
-        
+        locations = await self._find_locations(args["query"])
+        return self._text_result({"locations": locations})
+
+    async def _find_locations(self, query: str) -> List[Dict[str, Any]]:
+        """Answer from the local gazetteer, going upstream only when unsure"""
+        local, confident = self.gazetteer.search(query)
+        if confident:
+            self.gazetteer.local_answers += 1
+            return local
+        self.gazetteer.upstream_fallbacks += 1
+
         params = {"q": query}
         data = await self._make_api_request("search.json", params)
         
@@ -276,36 +737,242 @@ class WeatherMCPServer:
                 "lon": location.get("lon"),
                 "url": location.get("url")
             })
-        
-        return CallToolResult(
-            content=[
-                TextContent(
-                    type="text",
-                    text=json.dumps({"locations": locations}, indent=2)
-                )
-            ]
-        )
+        self.gazetteer.add(locations)
+        return locations
     
+    async def _get_hourly_window(self, args: Dict[str, Any]) -> CallToolResult:
+        """Get hourly forecast values at a time or over a window"""
+        return self._text_result(await self._compute_hourly_window(args))
+
+    async def _compute_hourly_window(self, args: Dict[str, Any]) -> Dict[str, Any]:
+        """Slice (and interpolate) the hourly rows of a cached forecast"""
+        location = args["location"]
+        if args.get("end") and args.get("hours"):
+            raise ValueError("Give either end or hours, not both")
+        start = hourly_window.parse_local_time(args["start"]) if args.get("start") else None
+        end = hourly_window.parse_local_time(args["end"]) if args.get("end") else None
+
+        if end is not None:
+            days = self._forecast_days(end)
+        else:
+            days = self._forecast_days(start, args.get("hours") or 0)
+        data = await self._make_api_request("forecast.json", {"q": location, "days": days})
+
+        location_info = data.get("location", {})
+        if start is None:
+            start = hourly_window.local_now(location_info)
+        if end is None:
+            end = start + (args.get("hours") or 0) * 3600
+        result = hourly_window.window(
+            data.get("forecast", {}).get("forecastday", []), start, end,
+            args.get("fields"), args.get("step_minutes"),
+        )
+        return {
+            "location": {
+                "name": location_info.get("name"),
+                "region": location_info.get("region"),
+                "country": location_info.get("country"),
+                "timezone": location_info.get("tz_id"),
+            },
+            **result,
+        }
+
+    @staticmethod
+    def _forecast_days(last: Optional[int] = None, hours: int = 0) -> int:
+        """forecast.json days to fetch so the forecast covers ``hours`` past
+        local time ``last`` (now if None).
+
+        Counted from today in UTC plus a day for locations already in
+        tomorrow; at least the default forecast so the fetch shares its
+        cache entry with get_weather_forecast.
+        """
+        now_utc = hourly_window.parse_local_time(datetime.now(timezone.utc).strftime(hourly_window.TIME_FORMAT))
+        last = (now_utc if last is None else last) + hours * 3600
+        needed = (last - now_utc) // 86400 + 2
+        if needed > MAX_FORECAST_DAYS + 1:
+            raise ValueError(f"The forecast only reaches {MAX_FORECAST_DAYS} days ahead")
+        return min(MAX_FORECAST_DAYS, max(DEFAULT_FORECAST_DAYS, needed))
+
+    async def _compare_locations(self, args: Dict[str, Any]) -> CallToolResult:
+        """Rank locations by their forecast over a window"""
+        return self._text_result(await self._compute_comparison(args))
+
+    async def _compute_comparison(self, args: Dict[str, Any]) -> Dict[str, Any]:
+        """Fetch every location's forecast concurrently and rank them"""
+        # Same place typed twice is compared once
+        queries: Dict[str, str] = {}
+        for query in args["locations"]:
+            queries.setdefault(normalize_query(query), query)
+        if len(queries) < 2:
+            raise ValueError("Give at least two different locations")
+
+        first = hourly_window.parse_local_time(f"{args['start_date']} 00:00") if args.get("start_date") else None
+        last_date = args.get("end_date") or args.get("start_date")
+        last = hourly_window.parse_local_time(f"{last_date} 23:00") if last_date else None
+        from_hour = args.get("from_hour") or 0
+        to_hour = 23 if args.get("to_hour") is None else args["to_hour"]
+        if to_hour < from_hour:
+            raise ValueError("to_hour must not be before from_hour")
+        comfort = (
+            location_ranking.DEFAULT_COMFORT_C[0] if args.get("comfort_min_c") is None else args["comfort_min_c"],
+            location_ranking.DEFAULT_COMFORT_C[1] if args.get("comfort_max_c") is None else args["comfort_max_c"],
+        )
+        days = self._forecast_days(last)
+        limit = asyncio.Semaphore(COMPARE_CONCURRENCY)
+
+        async def evaluate(query: str) -> Dict[str, Any]:
+            async with limit:
+                data = await self._make_api_request("forecast.json", {"q": query, "days": days})
+            location = data.get("location", {})
+            if first is None:
+                # Default window: from the current local hour to the end of
+                # the default forecast
+                now = hourly_window.local_now(location)
+                start = now - now % 3600
+                end = now - now % 86400 + DEFAULT_FORECAST_DAYS * 86400 - 3600
+            else:
+                start, end = first, last
+            metrics = location_ranking.window_metrics(
+                data.get("forecast", {}).get("forecastday", []), start, end, from_hour, to_hour, comfort
+            )
+            return {
+                "query": query,
+                "name": location.get("name"),
+                "region": location.get("region"),
+                "country": location.get("country"),
+                "metrics": metrics,
+            }
+
+        outcomes = await asyncio.gather(*(evaluate(q) for q in queries.values()), return_exceptions=True)
+        results, failed = [], []
+        for query, outcome in zip(queries.values(), outcomes):
+            if isinstance(outcome, Exception):
+                failed.append({"query": query, "error": str(outcome)})
+            elif isinstance(outcome, BaseException):
+                raise outcome
+            else:
+                results.append(outcome)
+        if not results:
+            raise ValueError(f"None of the locations could be compared: {failed[0]['error']}")
+
+        criteria = args.get("criteria") or list(location_ranking.DEFAULT_CRITERIA)
+        return {
+            "criteria": criteria,
+            "window": {
+                "start_date": args.get("start_date"),
+                "end_date": last_date,
+                "hours_of_day": [from_hour, to_hour],
+                "comfort_c": list(comfort),
+            },
+            "ranking": location_ranking.rank(results, criteria),
+            "failed": failed,
+        }
+
     async def _get_astronomy_data(self, args: Dict[str, Any]) -> CallToolResult:
         """Get astronomy data"""
+        astronomy_info = await self._compute_astronomy(args)
+        return self._text_result(astronomy_info)
+
+    async def _compute_astronomy(self, args: Dict[str, Any]) -> Dict[str, Any]:
+        """Astronomy for one date or a date range, computed locally when possible"""
         location = args["location"]
-        date = args.get("date", datetime.now().strftime("%Y-%m-%d"))
-        
-        params = {"q": location, "dt": date}
-        data = await self._make_api_request("astronomy.json", params)
-        
-        # Format the response
-        astronomy_info = self._format_astronomy(data)
-        
-        return CallToolResult(
-            content=[
-                TextContent(
-                    type="text",
-                    text=json.dumps(astronomy_info, indent=2)
-                )
-            ]
-        )
-    
+        date = args.get("date") or datetime.now().strftime("%Y-%m-%d")
+        start = datetime.strptime(date, "%Y-%m-%d").date()
+        end = datetime.strptime(args["end_date"], "%Y-%m-%d").date() if args.get("end_date") else None
+        if end is not None:
+            if end < start:
+                raise ValueError("end_date must not be before date")
+            if (end - start).days > MAX_ASTRONOMY_RANGE_DAYS:
+                raise ValueError(f"end_date must be at most {MAX_ASTRONOMY_RANGE_DAYS} days after date")
+
+        upstream_info = None
+        record = self.resolver.lookup(location)
+        if ASTRONOMY_MODE == "upstream" or not self._has_astronomy_fields(record):
+            # Fetch the first date upstream; this also teaches the resolver the
+            # location's coordinates and time zone for subsequent local calls
+            params = {"q": location, "dt": start.isoformat()}
+            data = await self._make_api_request("astronomy.json", params)
+            upstream_info = self._format_astronomy(data)
+            self.astronomy_stats["upstream"] += 1
+            if end is None or end == start:
+                return upstream_info
+            record = self._astronomy_record(location, data.get("location") or {})
+            if not self._has_astronomy_fields(record):
+                raise ValueError("Location could not be resolved for a date range")
+
+        try:
+            # A year of days takes ~0.1 s of pure computation; keep it off the loop
+            days = await asyncio.to_thread(
+                astronomy.compute_range, record["lat"], record["lon"], record["tz_id"], start, end or start
+            )
+        except astronomy.AstronomyUnavailable as e:
+            if end is not None and end != start:
+                raise ValueError(str(e))
+            logger.warning(f"Local astronomy unavailable, using upstream: {e}")
+            params = {"q": location, "dt": start.isoformat()}
+            return self._format_astronomy(await self._make_api_request("astronomy.json", params))
+        self.astronomy_stats["local"] += 1
+
+        location_info = {
+            "name": record.get("name"),
+            "region": record.get("region"),
+            "country": record.get("country")
+        }
+        if end is not None and end != start:
+            return {"location": location_info, "astronomy_days": days}
+
+        local_astro = {k: v for k, v in days[0].items() if k != "date"}
+        if ASTRONOMY_MODE == "verify":
+            params = {"q": location, "dt": start.isoformat()}
+            upstream_info = self._format_astronomy(await self._make_api_request("astronomy.json", params))
+            self._verify_astronomy(location, date, local_astro, upstream_info["astronomy"])
+            return upstream_info
+        return {"location": location_info, "astronomy": local_astro}
+
+    def _astronomy_record(self, location: str, resolved: Dict[str, Any]) -> Dict[str, Any]:
+        """Coordinates and time zone to compute a query's astronomy from, given the upstream location block"""
+        coordinates = parse_coordinates(location)
+        if coordinates is not None:
+            # Compute for the exact point asked for; upstream only supplies the zone
+            lat, lon = coordinates
+            return {**{k: resolved.get(k) for k in ("name", "region", "country", "tz_id")}, "lat": lat, "lon": lon}
+        if resolved.get("lat") is None or resolved.get("lon") is None:
+            return {}
+        record = self.resolver.record(format_coordinates(resolved["lat"], resolved["lon"]))
+        return record or {k: resolved.get(k) for k in ("name", "region", "country", "lat", "lon", "tz_id")}
+
+    @staticmethod
+    def _has_astronomy_fields(record: Optional[Dict[str, Any]]) -> bool:
+        return bool(record) and all(record.get(k) is not None for k in ("lat", "lon", "tz_id"))
+
+    def _verify_astronomy(self, location: str, date: str, local: Dict[str, Any], upstream: Dict[str, Any]) -> None:
+        """Compare a local computation against upstream and log differences"""
+        self.astronomy_stats["verified"] += 1
+        differences = []
+        for field in ("sunrise", "sunset", "moonrise", "moonset"):
+            try:
+                delta = abs(datetime.strptime(local[field], "%I:%M %p") - datetime.strptime(upstream[field], "%I:%M %p"))
+                if delta.total_seconds() / 60 > ASTRONOMY_VERIFY_TOLERANCE_MINUTES:
+                    differences.append(f"{field} {local[field]} != {upstream[field]}")
+            except (TypeError, ValueError):
+                if local[field] != upstream[field]:
+                    differences.append(f"{field} {local[field]} != {upstream[field]}")
+        if differences:
+            self.astronomy_stats["mismatches"] += 1
+            logger.warning(f"Astronomy mismatch for {location} on {date}: {', '.join(differences)}")
+
+    def _subscription_key(self, location: str) -> str:
+        """Canonical location if known, otherwise the normalized query"""
+        canonical = self.resolver.canonical(location)
+        return canonical if canonical != location else normalize_query(location)
+
+    async def _fetch_subscription(self, kind: str, location: str) -> Dict[str, Any]:
+        """Formatted payload pushed to subscribers of a location"""
+        data = await self._make_api_request(SUBSCRIPTION_ENDPOINTS[kind], {"q": location})
+        if kind == "alerts":
+            return self._format_alerts(data)
+        return self._format_current_weather(data)
+
     def _format_current_weather(self, data: Dict[str, Any]) -> Dict[str, Any]:
         """Format current weather data"""
         location = data.get("location", {})
@@ -446,7 +1113,7 @@ class WeatherMCPServer:
                 "region": location.get("region"),
                 "country": location.get("country")
             },
-            "historical_data": forecast.get("forecastday", [])
+            "historical_data": plain(forecast.get("forecastday", []))
         }
     
     def _format_astronomy(self, data: Dict[str, Any]) -> Dict[str, Any]:
@@ -471,23 +1138,80 @@ class WeatherMCPServer:
             }
         }
     
+    def _format_alerts(self, data: Dict[str, Any]) -> Dict[str, Any]:
+        """Format weather alerts data"""
+        location = data.get("location", {})
+        alerts = (data.get("alerts") or {}).get("alert", [])
+
+        return {
+            "location": {
+                "name": location.get("name"),
+                "region": location.get("region"),
+                "country": location.get("country"),
+                "local_time": location.get("localtime")
+            },
+            "alerts": [
+                {
+                    "headline": alert.get("headline"),
+                    "event": alert.get("event"),
+                    "severity": alert.get("severity"),
+                    "urgency": alert.get("urgency"),
+                    "areas": alert.get("areas"),
+                    "effective": alert.get("effective"),
+                    "expires": alert.get("expires"),
+                    "description": alert.get("desc")
+                }
+                for alert in alerts
+            ]
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        """Runtime statistics for introspection endpoints"""
+        return {
+            "upstream_calls": self.upstream_calls,
+            "upstream": self.providers.stats(),
+            "cache": self.cache.stats(),
+            "unknown_locations": {
+                "entries": len(self.unknown_locations),
+                "rejected": self.unknown_locations.hits,
+            },
+            "invalid_arguments": self.validator.rejected,
+            "proximity": self.proximity.stats(),
+            "locations": self.resolver.stats(),
+            "gazetteer": self.gazetteer.stats(),
+            "astronomy": dict(self.astronomy_stats, mode=ASTRONOMY_MODE),
+            "subscriptions": self.subscriptions.stats(),
+        }
+
+    def save_state(self) -> None:
+        """Stop subscription pollers and persist the response cache and learned locations (called on shutdown)"""
+        self.subscriptions.close()
+        self.cache.save_snapshot()
+        self.resolver.save()
+        self.gazetteer.save()
+
     async def run(self):
         """Run the MCP server"""
-        async with stdio_server() as (read_stream, write_stream):
-            await self.server.run(
-                read_stream,
-                write_stream,
-                InitializationOptions(
-                    capabilities={"tools": {}},
-                    server_name="weather-mcp-server",
-                    server_version="1.0.0"
+        from mcp.server.models import InitializationOptions
+        from mcp.server.stdio import stdio_server
+
+        try:
+            async with stdio_server() as (read_stream, write_stream):
+                await self.server.run(
+                    read_stream,
+                    write_stream,
+                    InitializationOptions(
+                        capabilities=SERVER_CAPABILITIES,
+                        server_name="weather-mcp-server",
+                        server_version="1.0.0"
+                    )
                 )
-            )
+        finally:
+            self.save_state()
+            await self.providers.close()
 
 async def main():
     """Main entry point"""
-    import os
-    
     # Get API key from environment variable
     api_key = os.getenv("WEATHER_API_KEY")
     if not api_key:
@@ -0,0 +1,293 @@
+#!/usr/bin/env python3
+"""
+Compact in-memory model of cached weather responses
+Upstream responses are converted once, when they are cached: location,
+current conditions and per-day summaries become ``__slots__`` records, and
+each day's hourly rows become typed columns (``array('d')`` / ``array('q')``)
+with interned strings and shared condition objects.
+
+The records are read-only Mappings, so the ``_format_*`` methods and the
+statistics code read them exactly like the upstream dicts; hourly rows are
+rebuilt as plain dicts on demand. ``plain()`` turns a model back into the
+original JSON structure (used for snapshots and raw history output).
+"""
+
+import sys
+from array import array
+from collections.abc import Mapping, Sequence
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+_MISSING = object()
+
+# Strings longer than this are kept as they are rather than interned
+MAX_INTERNED_LENGTH = 64
+# The intern table is reset when it grows past this many strings (hourly
+# timestamps keep adding new ones); strings already shared stay shared
+MAX_INTERNED_STRINGS = 100_000
+
+_strings: Dict[str, str] = {}
+
+
+def _intern(value: str) -> str:
+    interned = _strings.get(value)
+    if interned is None:
+        if len(_strings) >= MAX_INTERNED_STRINGS:
+            _strings.clear()
+        interned = _strings[value] = value
+    return interned
+
+
+class Condition(tuple):
+    """(text, icon, code) shared by every hour/day with the same condition"""
+
+    __slots__ = ()
+    _table: Dict[Tuple[Any, Any, Any], "Condition"] = {}
+
+    @classmethod
+    def of(cls, data: Dict[str, Any]) -> "Condition":
+        key = (data.get("text"), data.get("icon"), data.get("code"))
+        condition = cls._table.get(key)
+        if condition is None:
+            condition = cls._table[key] = cls(key)
+        return condition
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"text": self[0], "icon": self[1], "code": self[2]}
+
+
+def _pack(value: Any) -> Any:
+    if isinstance(value, str):
+        return _intern(value) if len(value) <= MAX_INTERNED_LENGTH else value
+    if isinstance(value, dict) and value.keys() == {"text", "icon", "code"}:
+        return Condition.of(value)
+    return value
+
+
+def _unpack(value: Any) -> Any:
+    if isinstance(value, Condition):
+        return value.to_dict()
+    return value
+
+
+def nbytes(value: Any) -> int:
+    """Approximate deep size of a cached value in bytes"""
+    if value is _MISSING or value is None or isinstance(value, (bool, Condition)):
+        return 0
+    if hasattr(value, "nbytes") and callable(value.nbytes):
+        return value.nbytes()
+    if isinstance(value, str):
+        # Strings interned by _pack are shared between entries; equal
+        # strings from anywhere else are not
+        return 0 if _strings.get(value) is value else sys.getsizeof(value)
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(nbytes(k) + nbytes(v) for k, v in value.items())
+    if isinstance(value, (list, tuple)):
+        return sys.getsizeof(value) + sum(nbytes(v) for v in value)
+    return sys.getsizeof(value)
+
+
+def plain(value: Any) -> Any:
+    """JSON-ready copy of a model (or of anything containing one)"""
+    if isinstance(value, (Record, HourlySeries)):
+        return value.to_plain()
+    if isinstance(value, dict):
+        return {k: plain(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)) and not isinstance(value, Condition):
+        return [plain(v) for v in value]
+    return _unpack(value)
+
+
+class Record(Mapping):
+    """Read-only mapping over ``__slots__`` fields plus an overflow dict.
+
+    Subclasses list their known keys in FIELDS (which are also their
+    __slots__) and may map fields to nested record types in NESTED.
+    """
+
+    __slots__ = ("_extra",)
+    FIELDS: Tuple[str, ...] = ()
+    NESTED: Dict[str, Any] = {}
+
+    def __init__(self, data: Dict[str, Any]):
+        for field in self.FIELDS:
+            value = data.get(field, _MISSING)
+            if value is not _MISSING:
+                nested = self.NESTED.get(field)
+                value = nested(value) if nested is not None and value is not None else _pack(value)
+            object.__setattr__(self, field, value)
+        extra = {k: v for k, v in data.items() if k not in self._field_set()}
+        object.__setattr__(self, "_extra", extra or None)
+
+    @classmethod
+    def _field_set(cls) -> frozenset:
+        fields = cls.__dict__.get("_fields")
+        if fields is None:
+            fields = frozenset(cls.FIELDS)
+            setattr(cls, "_fields", fields)
+        return fields
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        raise AttributeError(f"{type(self).__name__} is read-only")
+
+    def __getitem__(self, key: str) -> Any:
+        if key in self._field_set():
+            value = getattr(self, key)
+            if value is _MISSING:
+                raise KeyError(key)
+            return _unpack(value)
+        if self._extra is not None and key in self._extra:
+            return self._extra[key]
+        raise KeyError(key)
+
+    def __iter__(self) -> Iterator[str]:
+        for field in self.FIELDS:
+            if getattr(self, field) is not _MISSING:
+                yield field
+        if self._extra is not None:
+            yield from self._extra
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self)
+
+    def to_plain(self) -> Dict[str, Any]:
+        return {key: plain(self[key]) for key in self}
+
+    def nbytes(self) -> int:
+        """Approximate memory held by this record (shared conditions and
+        interned strings not included)"""
+        size = sys.getsizeof(self)
+        for field in self.FIELDS:
+            size += nbytes(getattr(self, field))
+        if self._extra is not None:
+            size += nbytes(self._extra)
+        return size
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({self.to_plain()!r})"
+
+
+class HourlySeries(Sequence):
+    """A day's hourly rows stored column-wise.
+
+    All-float columns become array('d'), all-int columns array('q'), other
+    columns lists of (interned) values. Rows with differing key sets are
+    kept as they are.
+    """
+
+    __slots__ = ("keys", "columns", "length", "rows")
+
+    def __init__(self, rows: List[Dict[str, Any]]):
+        self.rows: Optional[List[Dict[str, Any]]] = None
+        self.length = len(rows)
+        self.keys: Tuple[str, ...] = tuple(rows[0]) if rows else ()
+        if any(tuple(row) != self.keys for row in rows):
+            self.rows = rows
+            self.keys, self.columns = (), ()
+            return
+        self.keys = tuple(_intern(k) for k in self.keys)
+        self.columns = tuple(self._column([row[key] for row in rows]) for key in self.keys)
+
+    @staticmethod
+    def _column(values: List[Any]) -> Any:
+        if all(type(v) is float for v in values):
+            return array("d", values)
+        if all(type(v) is int for v in values):
+            try:
+                return array("q", values)
+            except OverflowError:
+                return values
+        return [_pack(v) for v in values]
+
+    def __len__(self) -> int:
+        return self.length
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(self.length))]
+        if self.rows is not None:
+            return self.rows[index]
+        if index < 0:
+            index += self.length
+        if not 0 <= index < self.length:
+            raise IndexError(index)
+        return {key: _unpack(column[index]) for key, column in zip(self.keys, self.columns)}
+
+    def column(self, key: str) -> Optional[Sequence]:
+        """Raw column for one field (None if absent or not stored column-wise)"""
+        if self.rows is not None or key not in self.keys:
+            return None
+        return self.columns[self.keys.index(key)]
+
+    def to_plain(self) -> List[Dict[str, Any]]:
+        return [plain(row) for row in self]
+
+    def nbytes(self) -> int:
+        if self.rows is not None:
+            return sys.getsizeof(self) + nbytes(self.rows)
+        size = sys.getsizeof(self) + sys.getsizeof(self.columns)
+        for column in self.columns:
+            size += sys.getsizeof(column)
+            if isinstance(column, list):
+                size += sum(nbytes(v) for v in column)
+        return size
+
+
+class Location(Record):
+    FIELDS = ("name", "region", "country", "lat", "lon", "tz_id", "localtime_epoch", "localtime")
+    __slots__ = FIELDS
+
+
+class Current(Record):
+    FIELDS = (
+        "last_updated_epoch", "last_updated", "temp_c", "temp_f", "is_day", "condition",
+        "wind_mph", "wind_kph", "wind_degree", "wind_dir", "pressure_mb", "pressure_in",
+        "precip_mm", "precip_in", "humidity", "cloud", "feelslike_c", "feelslike_f",
+        "windchill_c", "windchill_f", "heatindex_c", "heatindex_f", "dewpoint_c", "dewpoint_f",
+        "vis_km", "vis_miles", "uv", "gust_mph", "gust_kph",
+    )
+    __slots__ = FIELDS
+
+
+class DaySummary(Record):
+    FIELDS = (
+        "maxtemp_c", "maxtemp_f", "mintemp_c", "mintemp_f", "avgtemp_c", "avgtemp_f",
+        "maxwind_mph", "maxwind_kph", "totalprecip_mm", "totalprecip_in", "totalsnow_cm",
+        "avgvis_km", "avgvis_miles", "avghumidity", "daily_will_it_rain", "daily_chance_of_rain",
+        "daily_will_it_snow", "daily_chance_of_snow", "condition", "uv",
+    )
+    __slots__ = FIELDS
+
+
+class Astro(Record):
+    FIELDS = ("sunrise", "sunset", "moonrise", "moonset", "moon_phase", "moon_illumination",
+              "is_moon_up", "is_sun_up")
+    __slots__ = FIELDS
+
+
+class ForecastDay(Record):
+    FIELDS = ("date", "date_epoch", "day", "astro", "hour")
+    __slots__ = FIELDS
+    NESTED = {"day": DaySummary, "astro": Astro, "hour": HourlySeries}
+
+
+def _days(days: List[Dict[str, Any]]) -> Tuple[ForecastDay, ...]:
+    return tuple(ForecastDay(day) for day in days)
+
+
+class Forecast(Record):
+    FIELDS = ("forecastday",)
+    __slots__ = FIELDS
+    NESTED = {"forecastday": _days}
+
+
+class WeatherResponse(Record):
+    FIELDS = ("location", "current", "forecast")
+    __slots__ = FIELDS
+    NESTED = {"location": Location, "current": Current, "forecast": Forecast}
+
+
+def compact(data: Any) -> Any:
+    """Compact form of an upstream response (other values are returned as-is)"""
+    if isinstance(data, dict) and ("location" in data or "forecast" in data):
+        return WeatherResponse(data)
+    return data